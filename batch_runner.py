@@ -0,0 +1,211 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from contextlib import AsyncExitStack
+from notebook_automator import NEW_CHAT_SELECTORS, PROFILE_DIR, PersistentBrowser
+from resource_blocker import ResourceBlocker
+from study_guide_generator import GUIDE_TITLE, PROMPT_INSTRUCTIONS, generate_study_guide
+
+REPORT_FILE = "batch_report.json"
+DEFAULT_MAX_PARALLEL_JOBS = 2
+DEFAULT_MAX_TABS = 1  # Per notebook, unless the config says otherwise.
+
+# generate_study_guide options a job (or the config's "defaults") may set.
+JOB_OPTIONS = (
+    "concurrency", "refresh", "cache_ttl", "max_attempts", "rotate_every", "prune_dom",
+    "capture_pattern", "batch_chars", "batch_sections", "resume", "diff", "primed",
+)
+
+# Example config (JSON):
+# {
+#   "max_parallel_jobs": 2,
+#   "notebooks": {"https://notebooklm.google.com/notebook/<id>": {"max_tabs": 2}},
+#   "defaults": {"primed": true, "concurrency": 2},
+#   "jobs": [
+#     {"name": "ece301", "notebook_url": "https://notebooklm.google.com/notebook/<id>",
+#      "topics": "courses/ece301/topics.md", "instructions": "courses/ece301/instructions.txt",
+#      "title": "ECE 301 Quiz 1 Study Guide", "output": "courses/ece301/final_study_guide.md"}
+#   ]
+# }
+
+
+def load_config(path):
+    """Reads and validates a batch config; relative paths are taken from the config's directory."""
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    defaults = config.get("defaults", {})
+    jobs = []
+    for n, job in enumerate(config.get("jobs", [])):
+        name = job.get("name") or f"job{n + 1}"
+        missing = [key for key in ("notebook_url", "topics", "output") if not job.get(key)]
+        if missing:
+            raise ValueError(f"Job '{name}' is missing {', '.join(missing)}.")
+        unknown = set(job) - set(JOB_OPTIONS) - {"name", "notebook_url", "topics", "instructions", "title", "output"}
+        unknown |= set(defaults) - set(JOB_OPTIONS)
+        if unknown:
+            raise ValueError(f"Job '{name}' has unknown option(s): {', '.join(sorted(unknown))}.")
+
+        instructions = PROMPT_INSTRUCTIONS
+        if job.get("instructions"):
+            with open(os.path.join(base, job["instructions"]), "r", encoding="utf-8") as f:
+                instructions = "\n" + f.read().strip() + "\n"
+        options = {**defaults, **{key: job[key] for key in JOB_OPTIONS if key in job}}
+        if options.get("rotate_every") and not NEW_CHAT_SELECTORS:
+            raise ValueError(f"Job '{name}' uses rotate_every, which needs NEW_CHAT_SELECTORS in notebook_automator.py.")
+        jobs.append({
+            "name": name,
+            "notebook_url": job["notebook_url"],
+            "topics_file": os.path.join(base, job["topics"]),
+            "output_file": os.path.join(base, job["output"]),
+            "instructions": instructions,
+            "title": job.get("title", GUIDE_TITLE),
+            "options": options,
+        })
+
+    outputs = [job["output_file"] for job in jobs]
+    if len(set(outputs)) != len(outputs):
+        raise ValueError("Two jobs write the same output file.")
+    return {
+        "max_parallel_jobs": config.get("max_parallel_jobs", DEFAULT_MAX_PARALLEL_JOBS),
+        "notebooks": config.get("notebooks", {}),
+        "jobs": jobs,
+    }
+
+
+class NotebookTabPool:
+    """
+    Hands out tab indices per notebook, at most max_tabs at a time, so jobs on
+    the same notebook never drive the same tab and never exceed its limit.
+    A job takes all of its tabs at once (under the notebook's lock) so two
+    jobs can't each hold half of what they need.
+    """
+
+    def __init__(self, limits):
+        self.limits = limits
+        self._free = {}
+        self._locks = {}
+
+    def max_tabs(self, notebook_url):
+        return max(1, self.limits.get(notebook_url, {}).get("max_tabs", DEFAULT_MAX_TABS))
+
+    async def acquire(self, notebook_url, wanted):
+        if notebook_url not in self._free:
+            self._free[notebook_url] = asyncio.Queue()
+            for tab_index in range(self.max_tabs(notebook_url)):
+                self._free[notebook_url].put_nowait(tab_index)
+            self._locks[notebook_url] = asyncio.Lock()
+        count = max(1, min(wanted, self.max_tabs(notebook_url)))
+        async with self._locks[notebook_url]:
+            return sorted([await self._free[notebook_url].get() for _ in range(count)])
+
+    def release(self, notebook_url, tab_indices):
+        for tab_index in tab_indices:
+            self._free[notebook_url].put_nowait(tab_index)
+
+
+def print_report(report):
+    print("\n=== Batch report ===")
+    print(f"{'job':<20}{'status':<28}{'written':>9}{'asked':>7}{'cached':>8}{'failed':>8}{'time':>9}{'sect/min':>10}")
+    for job in report["jobs"]:
+        print(f"{job['name']:<20}{job['status']:<28}{job.get('written', 0):>4}/{job.get('sections', 0):<4}"
+              f"{job.get('asked', 0):>7}{job.get('from_cache', 0):>8}{len(job.get('dead_letters', [])):>8}"
+              f"{job.get('seconds', 0):>8.0f}s{job.get('sections_per_minute', 0):>10.1f}")
+        if job.get("dead_letters"):
+            print(f"    dead letters: {', '.join(job['dead_letters'])}")
+        if job.get("error"):
+            print(f"    error: {job['error']}")
+    totals = report["totals"]
+    print(f"Total: {totals['written']} sections written ({totals['asked']} asked) by "
+          f"{totals['jobs_ok']}/{len(report['jobs'])} jobs in {totals['seconds']:.0f}s "
+          f"({totals['sections_per_minute']:.1f} sections/min); {totals['failed_sections']} section(s) failed.")
+
+
+async def run_batch(config, launch=False, profile_dir=PROFILE_DIR, headless=False, channel=None,
+                    block_rules=None, report_file=REPORT_FILE):
+    """
+    Runs every job in the config, at most max_parallel_jobs at a time, and
+    within each notebook's max_tabs. With launch=True all jobs share one
+    launched browser; otherwise each job attaches over CDP. Writes a JSON
+    report (per-job summaries, throughput and failures) and returns it.
+    """
+    started = time.monotonic()
+    jobs = config["jobs"]
+    job_slots = asyncio.Semaphore(max(1, config["max_parallel_jobs"]))
+    tabs = NotebookTabPool(config["notebooks"])
+    summaries = [None] * len(jobs)
+
+    async def run_job(n, job, browser):
+        async with job_slots:
+            options = dict(job["options"])
+            tab_indices = await tabs.acquire(job["notebook_url"], options.pop("concurrency", 1))
+            print(f"\n### {job['name']}: {job['topics_file']} -> {job['output_file']} (tabs {tab_indices})")
+            try:
+                summary = await generate_study_guide(
+                    notebook_url=job["notebook_url"], topics_file=job["topics_file"],
+                    output_file=job["output_file"], instructions=job["instructions"], title=job["title"],
+                    browser=browser, tab_indices=tab_indices, concurrency=len(tab_indices),
+                    block_rules=None if browser is not None else block_rules, **options,
+                )
+            except Exception as e:
+                summary = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+            finally:
+                tabs.release(job["notebook_url"], tab_indices)
+            minutes = summary.get("seconds", 0) / 60
+            summary["sections_per_minute"] = round(summary.get("asked", 0) / minutes, 2) if minutes else 0.0
+            summaries[n] = {"name": job["name"], **summary}
+
+    async with AsyncExitStack() as stack:
+        browser = None
+        if launch:
+            browser = await stack.enter_async_context(PersistentBrowser(
+                notebook_url=jobs[0]["notebook_url"] if jobs else None, profile_dir=profile_dir,
+                headless=headless, channel=channel,
+                blocker=ResourceBlocker(name="launched browser", **block_rules) if block_rules is not None else None,
+            ))
+        await asyncio.gather(*(run_job(n, job, browser) for n, job in enumerate(jobs)))
+
+    seconds = time.monotonic() - started
+    asked = sum(s.get("asked", 0) for s in summaries)
+    report = {
+        "jobs": summaries,
+        "totals": {
+            "seconds": round(seconds, 1),
+            "written": sum(s.get("written", 0) for s in summaries),
+            "asked": asked,
+            "sections_per_minute": round(asked / (seconds / 60), 2) if seconds else 0.0,
+            "failed_sections": sum(len(s.get("dead_letters", [])) for s in summaries),
+            "jobs_ok": sum(1 for s in summaries if s["status"] in ("complete", "up to date")),
+        },
+    }
+    with open(report_file, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print_report(report)
+    print(f"Report saved to {report_file}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate study guides for several courses from one config file.")
+    parser.add_argument("config", help="JSON config listing the jobs (see the example at the top of batch_runner.py).")
+    parser.add_argument("--report", default=REPORT_FILE, help=f"Where to write the JSON report (default: {REPORT_FILE}).")
+    parser.add_argument("--launch", action="store_true",
+                        help="Launch one Chromium with a saved profile for all jobs instead of attaching over CDP.")
+    parser.add_argument("--profile-dir", default=PROFILE_DIR)
+    parser.add_argument("--headless", action="store_true")
+    parser.add_argument("--channel", default=None)
+    parser.add_argument("--block-resources", action="store_true",
+                        help="Abort image/font/media and analytics requests (default rules).")
+    args = parser.parse_args()
+
+    asyncio.run(run_batch(
+        load_config(args.config),
+        launch=args.launch,
+        profile_dir=args.profile_dir,
+        headless=args.headless,
+        channel=args.channel,
+        block_rules={} if args.block_resources else None,
+        report_file=args.report,
+    ))
@@ -0,0 +1,107 @@
+"""
+Per-section latency vs. chat length, with and without the long-chat policies.
+
+Runs the same number of questions through the real NotebookSession against
+the local fake NotebookLM page once per mode (fresh Chromium each time):
+    baseline      every answer stays in one growing chat
+    prune         finished turns are removed from the DOM after extraction
+    rotate-K      a fresh chat (cleared through the chat menu, then the preamble) every K questions
+and prints bucketed latencies plus the fitted growth per extra chat turn.
+
+    python -m benchmarks.bench_chat_length --sections 40 --rotate-every 10
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from benchmarks.bench_scraper import default_chromium_path, launch_chromium, wait_for_notebook_tab
+from benchmarks.fake_notebooklm import NEW_CHAT_SELECTORS, add_server_arguments, serve_in_background, server_options
+from notebook_automator import NotebookSession
+from scraper_metrics import ScraperMetrics
+
+BUCKET_SIZE = 10
+
+
+def slope(latencies):
+    """Least-squares growth in seconds per additional question in the chat."""
+    xs = range(len(latencies))
+    mean_x = statistics.mean(xs)
+    mean_y = statistics.mean(latencies)
+    denominator = sum((x - mean_x) ** 2 for x in xs)
+    if not denominator:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, latencies)) / denominator
+
+
+async def run_mode(args, executable, server, cdp_port, session_options):
+    cdp_endpoint = f"http://127.0.0.1:{cdp_port}"
+    user_data_dir = tempfile.mkdtemp(prefix="fake-notebooklm-profile-")
+    browser = launch_chromium(executable, cdp_port, user_data_dir, server.notebook_url)
+    latencies = []
+    try:
+        wait_for_notebook_tab(cdp_endpoint, server.notebook_url)
+        async with NotebookSession(
+            notebook_url=server.notebook_url,
+            cdp_endpoint=cdp_endpoint,
+            settle_quiet_ms=args.settle_quiet_ms,
+            metrics=ScraperMetrics(path=os.path.join(user_data_dir, "scraper_metrics.jsonl")),
+            chat_preamble=lambda: "Context preamble for the fresh chat.",
+            new_chat_selectors=NEW_CHAT_SELECTORS,
+            **session_options,
+        ) as session:
+            for i in range(args.sections):
+                start = time.perf_counter()
+                await session.ask(f"Section {i + 1}")
+                latencies.append(time.perf_counter() - start)
+    finally:
+        browser.terminate()
+        browser.wait(timeout=10)
+        shutil.rmtree(user_data_dir, ignore_errors=True)
+    return latencies
+
+
+async def run_benchmark(args):
+    server = serve_in_background(**server_options(args))
+    executable = args.chrome or await default_chromium_path()
+    modes = [
+        ("baseline", {}),
+        ("prune", {"prune_dom": True}),
+        (f"rotate-{args.rotate_every}", {"rotate_every": args.rotate_every}),
+        (f"prune+rotate-{args.rotate_every}", {"prune_dom": True, "rotate_every": args.rotate_every}),
+    ]
+    results = {}
+    try:
+        for offset, (name, options) in enumerate(modes):
+            print(f"Running {name} ({args.sections} sections)...")
+            results[name] = await run_mode(args, executable, server, args.cdp_port + offset, options)
+    finally:
+        server.shutdown()
+
+    buckets = range(0, args.sections, BUCKET_SIZE)
+    header = "".join(f"{f'{b + 1}-{min(b + BUCKET_SIZE, args.sections)}':>10}" for b in buckets)
+    print(f"\nMean latency (s) by section number\n{'mode':<20}{header}{'growth/turn':>14}")
+    for name, latencies in results.items():
+        cells = "".join(f"{statistics.mean(latencies[b:b + BUCKET_SIZE]):>10.2f}" for b in buckets)
+        print(f"{name:<20}{cells}{slope(latencies) * 1000:>11.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-section latency against chat length.")
+    parser.add_argument("--sections", type=int, default=40)
+    parser.add_argument("--rotate-every", type=int, default=10)
+    parser.add_argument("--cdp-port", type=int, default=9340, help="First CDP port; one per mode.")
+    parser.add_argument("--chrome", help="Chromium/Chrome executable (default: Playwright's bundled Chromium).")
+    parser.add_argument("--settle-quiet-ms", type=int, default=300)
+    add_server_arguments(parser)
+    # Stream fast so DOM growth, not token rate, dominates the measurement.
+    parser.set_defaults(tokens_per_second=2000.0, first_token_delay_ms=100, render_delay_ms=0)
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Micro-benchmark: old two-pass response extraction vs. response_extractor.
+
+Both paths run on the same saved response HTML (the innerHTML of
+.message-text-content). Browser round trips cannot be timed offline, so the
+DOM work each path does in the page is reproduced in Python and the number of
+page.evaluate calls per response is reported alongside the timings.
+
+    python -m benchmarks.bench_extraction [--html PATH] [--iterations N]
+"""
+import argparse
+import os
+import re
+import statistics
+import tempfile
+import time
+from html.parser import HTMLParser
+
+import html2text
+
+from response_extractor import SKIP_SELECTORS, extract_response
+
+DEFAULT_HTML = os.path.join(os.path.dirname(__file__), "fixtures", "response_sample.html")
+
+CITATION_BUTTON_RE = re.compile(r'<button[^>]*class="[^"]*citation-marker[^"]*"[^>]*>.*?</button>', re.DOTALL)
+ANY_BUTTON_RE = re.compile(r'<button\b[^>]*>.*?</button>', re.DOTALL)
+
+
+class _TextContent(HTMLParser):
+    """Stand-in for node.textContent."""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+
+    def handle_data(self, data):
+        self.chunks.append(data)
+
+
+def text_content(html_content):
+    parser = _TextContent()
+    parser.feed(html_content)
+    return "".join(parser.chunks)
+
+
+def legacy_extract(html_content, response_path):
+    """The extraction notebook_automator did before the single-pass stage (4 evaluate calls)."""
+    # Pass 1: raw innerHTML -> html2text -> regex cleanup -> response.md
+    h = html2text.HTML2Text()
+    h.body_width = 0
+    markdown_content = h.handle(html_content)
+    markdown_content = markdown_content.replace('â€¢', '•')
+    markdown_content = markdown_content.replace('â€¦', '…')
+    markdown_content = re.sub(r'(\w)\d+\b', r'\1', markdown_content)
+    markdown_content = re.sub(r'\.\.\.\.', '.', markdown_content)
+    markdown_content = re.sub(r"\[[\d,\s]+\]", "", markdown_content)
+    with open(response_path, "w", encoding="utf-8") as f:
+        f.write(markdown_content.strip())
+
+    # In-page mutation removing citation buttons, then innerHTML again
+    stripped_html = CITATION_BUTTON_RE.sub("", html_content)
+
+    # Pass 2: html2text again -> response.md again
+    h = html2text.HTML2Text()
+    h.body_width = 0
+    markdown_content = h.handle(stripped_html)
+    markdown_content = markdown_content.replace('â€¢', '•').replace('â€¦', '…')
+    with open(response_path, "w", encoding="utf-8") as f:
+        f.write(markdown_content.strip())
+
+    # textContent -> terminal text
+    raw_text = text_content(stripped_html)
+    clean_text = re.sub(r"keep_pin.*", "", raw_text, flags=re.DOTALL)
+    clean_text = re.sub(r"Save to note", "", clean_text)
+    clean_text = clean_text.replace('â€¢', '•').replace('â€¦', '…')
+    clean_text = re.sub(r"\s{2,}", " ", clean_text).strip()
+    clean_text = clean_text.replace("• ", "\n\n• ").strip()
+    return markdown_content.strip(), clean_text
+
+
+def single_pass_extract(serialized_html, response_path):
+    """The current stage: one serialized subtree, one parse, one write (1 evaluate call)."""
+    markdown_content, clean_text = extract_response(serialized_html)
+    with open(response_path, "w", encoding="utf-8") as f:
+        f.write(markdown_content)
+    return markdown_content, clean_text
+
+
+def time_it(fn, iterations, *args):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(name, samples, evaluate_calls):
+    samples = sorted(samples)
+    p95 = samples[int(0.95 * (len(samples) - 1))]
+    print(f"{name:<14} mean {statistics.mean(samples):7.3f} ms | median {statistics.median(samples):7.3f} ms"
+          f" | p95 {p95:7.3f} ms | page.evaluate calls {evaluate_calls}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scraped-response extraction.")
+    parser.add_argument("--html", default=DEFAULT_HTML, help="Saved innerHTML of a response's .message-text-content.")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    with open(args.html, "r", encoding="utf-8") as f:
+        html_content = f.read()
+    # What SERIALIZE_RESPONSE_JS hands back: the same subtree minus the skipped nodes.
+    assert "button" in SKIP_SELECTORS
+    serialized_html = ANY_BUTTON_RE.sub("", html_content)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        response_path = os.path.join(tmp, "response.md")
+        legacy_md, _ = legacy_extract(html_content, response_path)
+        single_md, _ = single_pass_extract(serialized_html, response_path)
+        legacy = time_it(legacy_extract, args.iterations, html_content, response_path)
+        single = time_it(single_pass_extract, args.iterations, serialized_html, response_path)
+
+    print(f"Input: {args.html} ({len(html_content)} bytes), {args.iterations} iterations")
+    report("legacy", legacy, 4)
+    report("single-pass", single, 1)
+    print(f"Speedup (median): {statistics.median(legacy) / statistics.median(single):.2f}x")
+    print(f"Markdown identical: {legacy_md == single_md}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Page-ready time with and without resource blocking.
+
+Loads the local fake NotebookLM page (whose stylesheet, script bundle, font
+and image come from a cacheable /static/) several times per mode, in a fresh
+Chromium each, and times goto -> chat input visible:
+    off         no interception
+    blocked     ResourceBlocker with the default rules (DevTools Fetch patterns)
+    route-all   page.route("**/*") that continues everything it doesn't block,
+                i.e. every request through the driver and the HTTP cache off
+The first load is cold; the rest are reloads, where the cache should make
+the page's own assets free.
+
+    python -m benchmarks.bench_page_ready --loads 10 --asset-delay-ms 150
+"""
+import argparse
+import asyncio
+import shutil
+import statistics
+import tempfile
+import time
+
+from playwright.async_api import async_playwright, expect  # type: ignore
+
+from benchmarks.bench_scraper import default_chromium_path, launch_chromium, wait_for_notebook_tab
+from benchmarks.fake_notebooklm import add_server_arguments, serve_in_background, server_options
+from notebook_automator import CHAT_INPUT_SELECTOR
+from resource_blocker import ResourceBlocker
+
+MODES = ("off", "blocked", "route-all")
+
+
+async def route_everything(page, blocker):
+    """The interception ResourceBlocker used to do: a catch-all route deciding every request."""
+    async def handle(route):
+        request = route.request
+        if blocker.block_reason(request.resource_type, request.url) is None:
+            await route.continue_()
+        else:
+            await route.abort("blockedbyclient")
+
+    await page.route("**/*", handle)
+
+
+async def run_mode(mode, args, executable, server, cdp_port):
+    cdp_endpoint = f"http://127.0.0.1:{cdp_port}"
+    user_data_dir = tempfile.mkdtemp(prefix="fake-notebooklm-profile-")
+    browser = launch_chromium(executable, cdp_port, user_data_dir, "about:blank")
+    timings = []
+    try:
+        wait_for_notebook_tab(cdp_endpoint, "about:blank")
+        async with async_playwright() as p:
+            context = (await p.chromium.connect_over_cdp(cdp_endpoint)).contexts[0]
+            page = context.pages[0]
+            if mode == "blocked":
+                await ResourceBlocker().attach(page)
+            elif mode == "route-all":
+                await route_everything(page, ResourceBlocker())
+            for _ in range(args.loads):
+                start = time.perf_counter()
+                await page.goto(server.notebook_url)
+                await expect(page.locator(CHAT_INPUT_SELECTOR)).to_be_visible(timeout=30000)
+                timings.append(time.perf_counter() - start)
+    finally:
+        browser.terminate()
+        browser.wait(timeout=10)
+        shutil.rmtree(user_data_dir, ignore_errors=True)
+    return timings
+
+
+async def run_benchmark(args):
+    server = serve_in_background(**server_options(args))
+    executable = args.chrome or await default_chromium_path()
+    results = {}
+    try:
+        for offset, mode in enumerate(MODES):
+            print(f"Running {mode} ({args.loads} loads)...")
+            results[mode] = await run_mode(mode, args, executable, server, args.cdp_port + offset)
+    finally:
+        server.shutdown()
+
+    print(f"\n{'mode':<12}{'cold':>9}{'warm median':>14}{'warm mean':>12}")
+    for mode, timings in results.items():
+        warm = timings[1:] or timings
+        print(f"{mode:<12}{timings[0]:>8.3f}s{statistics.median(warm):>13.3f}s{statistics.mean(warm):>11.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure page-ready time with and without resource blocking.")
+    parser.add_argument("--loads", type=int, default=10, help="Page loads per mode (the first one is cold).")
+    parser.add_argument("--cdp-port", type=int, default=9360, help="First CDP port; one per mode.")
+    parser.add_argument("--chrome", help="Chromium/Chrome executable (default: Playwright's bundled Chromium).")
+    add_server_arguments(parser)
+    parser.set_defaults(asset_delay_ms=150)
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Full-prompt vs. primed-conversation comparison: latency and answer quality.
+
+Asks the same sections twice, each mode in a fresh chat:
+    full      every message carries PROMPT_TEMPLATE (standing instructions + section)
+    primed    PRIMING_PREAMBLE once, then only the SECTION_DELTA_TEMPLATE per section
+and prints per-section latency, the cost of priming, and quality indicators
+for each answer next to its full-prompt counterpart: length, similarity,
+math and bullet counts, and whether the do-not-include list was kept. The
+answers are saved under --output-dir for reading side by side.
+
+By default this drives the real notebook in a Chrome started with
+--remote-debugging-port (quality only means something there); --fake runs it
+against benchmarks.fake_notebooklm for latency alone. Each mode starts by
+clearing the chat, so the real notebook needs NEW_CHAT_SELECTORS set in
+notebook_automator.py; otherwise the second mode would see the first one's
+prompts in the chat history.
+
+    python -m benchmarks.bench_primed --sections 1a,1b,1c,1d
+    python -m benchmarks.bench_primed --fake --sections 1a,1b,1c,1d,1e,1f
+"""
+import argparse
+import asyncio
+import difflib
+import os
+import re
+import shutil
+import statistics
+import tempfile
+import time
+
+from benchmarks.bench_scraper import default_chromium_path, launch_chromium, wait_for_notebook_tab
+from benchmarks.fake_notebooklm import NEW_CHAT_SELECTORS as FAKE_NEW_CHAT_SELECTORS
+from benchmarks.fake_notebooklm import add_server_arguments, serve_in_background, server_options
+from notebook_automator import CDP_ENDPOINT, NEW_CHAT_SELECTORS, NOTEBOOK_URL, NotebookSession
+from scraper_metrics import ScraperMetrics
+from study_guide_generator import PRIMING_PREAMBLE, parse_topics, section_prompt
+
+MODES = ("full", "primed")
+
+
+def quality_metrics(markdown_content):
+    lines = markdown_content.splitlines()
+    return {
+        "chars": len(markdown_content),
+        "bullets": sum(1 for line in lines if re.match(r"\s*[*+-]\s", line)),
+        "math": markdown_content.count("$") // 2,
+        "exclusions": bool(re.search(r"do not include|not included|exclude", markdown_content, re.IGNORECASE)),
+    }
+
+
+async def run_mode(mode, topics, session_options, output_dir):
+    """Returns (latencies, answers, priming seconds) for one mode in a fresh chat."""
+    primed = mode == "primed"
+    latencies = []
+    answers = []
+    priming = 0.0
+    async with NotebookSession(**session_options) as session:
+        await session.connect()
+        await session.start_new_chat()
+        if primed:
+            # Timed on its own, outside the first section.
+            start = time.perf_counter()
+            await session.ask(PRIMING_PREAMBLE.format(covered="none yet"))
+            priming = time.perf_counter() - start
+        for topic in topics:
+            start = time.perf_counter()
+            answer = await session.ask(section_prompt(topic, primed))
+            latencies.append(time.perf_counter() - start)
+            answers.append(answer)
+            os.makedirs(os.path.join(output_dir, mode), exist_ok=True)
+            with open(os.path.join(output_dir, mode, f"{topic['id']}.md"), "w", encoding="utf-8") as f:
+                f.write(answer)
+    return latencies, answers, priming
+
+
+async def compare(args, session_options):
+    wanted = [s.strip() for s in args.sections.split(",") if s.strip()]
+    topics = [topic for topic in parse_topics(args.topics) if topic['id'] in wanted]
+    if not topics:
+        raise SystemExit(f"None of the sections {wanted} are in {args.topics}.")
+
+    results = {}
+    for mode in MODES:
+        print(f"Running {mode} ({len(topics)} sections)...")
+        results[mode] = await run_mode(mode, topics, session_options, args.output_dir)
+
+    print(f"\n{'mode':<8}{'priming':>10}{'mean':>9}{'median':>9}{'total':>9}   prompt chars/section")
+    for mode, (latencies, _, priming) in results.items():
+        prompt_chars = statistics.mean(len(section_prompt(t, mode == "primed")) for t in topics)
+        print(f"{mode:<8}{priming:>9.2f}s{statistics.mean(latencies):>8.2f}s"
+              f"{statistics.median(latencies):>8.2f}s{priming + sum(latencies):>8.2f}s   {prompt_chars:.0f}")
+
+    print(f"\n{'section':<9}{'mode':<8}{'chars':>7}{'bullets':>9}{'math':>6}{'excl.':>7}{'sim. to full':>14}")
+    full_answers = results["full"][1]
+    for i, topic in enumerate(topics):
+        for mode in MODES:
+            answer = results[mode][1][i]
+            q = quality_metrics(answer)
+            similarity = difflib.SequenceMatcher(None, full_answers[i], answer).ratio()
+            print(f"{topic['id']:<9}{mode:<8}{q['chars']:>7}{q['bullets']:>9}{q['math']:>6}"
+                  f"{'yes' if q['exclusions'] else 'no':>7}{similarity:>14.2f}")
+    print(f"\nAnswers saved under {args.output_dir}/{{{','.join(MODES)}}}/.")
+
+
+async def run_benchmark(args):
+    metrics_dir = tempfile.mkdtemp(prefix="bench-primed-")
+    # Keep benchmark timings out of the real run's history.
+    session_options = {"metrics": ScraperMetrics(path=os.path.join(metrics_dir, "scraper_metrics.jsonl"))}
+    server = browser = None
+    try:
+        if args.fake:
+            server = serve_in_background(**server_options(args))
+            cdp_endpoint = f"http://127.0.0.1:{args.cdp_port}"
+            executable = args.chrome or await default_chromium_path()
+            browser = launch_chromium(executable, args.cdp_port, metrics_dir, server.notebook_url)
+            wait_for_notebook_tab(cdp_endpoint, server.notebook_url)
+            session_options.update(notebook_url=server.notebook_url, cdp_endpoint=cdp_endpoint,
+                                   new_chat_selectors=FAKE_NEW_CHAT_SELECTORS)
+        else:
+            if not NEW_CHAT_SELECTORS:
+                raise SystemExit("Set NEW_CHAT_SELECTORS in notebook_automator.py first: without a way to clear "
+                                 "the chat, the modes would share one conversation.")
+            session_options.update(notebook_url=NOTEBOOK_URL, cdp_endpoint=args.cdp_endpoint)
+        await compare(args, session_options)
+    finally:
+        if browser is not None:
+            browser.terminate()
+            browser.wait(timeout=10)
+        if server is not None:
+            server.shutdown()
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full-prompt and primed-conversation modes.")
+    parser.add_argument("--sections", default="1a,1b,1c,1d", help="Comma-separated section ids from topics.md.")
+    parser.add_argument("--topics", default="topics.md")
+    parser.add_argument("--output-dir", default="bench_primed_output")
+    parser.add_argument("--cdp-endpoint", default=CDP_ENDPOINT, help="Chrome to drive when not using --fake.")
+    parser.add_argument("--fake", action="store_true", help="Use the local fake NotebookLM page (latency only).")
+    parser.add_argument("--cdp-port", type=int, default=9350, help="CDP port for the Chromium started with --fake.")
+    parser.add_argument("--chrome", help="Chromium/Chrome executable for --fake (default: Playwright's bundled Chromium).")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+End-to-end scraper benchmark against the local fake NotebookLM page.
+
+Starts benchmarks.fake_notebooklm, launches a local Chromium with remote
+debugging pointed at it, then drives the real NotebookSession over CDP and
+reports per-query latency percentiles. No Google account is involved.
+--capture network reads answers from the fake page's /api/answer stream
+instead of the DOM.
+
+    python -m benchmarks.bench_scraper --queries 20 --tokens-per-second 80
+    python -m benchmarks.bench_scraper --queries 20 --capture network
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import urllib.request
+
+from playwright.async_api import async_playwright  # type: ignore
+
+from benchmarks.fake_notebooklm import ANSWER_PATH, add_server_arguments, serve_in_background, server_options
+from network_capture import NetworkCapture
+from notebook_automator import SETTLE_MAX_MS, SETTLE_QUIET_MS, NotebookSession
+from scraper_metrics import ScraperMetrics, percentile
+
+
+async def default_chromium_path():
+    async with async_playwright() as p:
+        return p.chromium.executable_path
+
+
+def launch_chromium(executable, cdp_port, user_data_dir, url, headless=True):
+    args = [
+        executable,
+        f"--remote-debugging-port={cdp_port}",
+        f"--user-data-dir={user_data_dir}",
+        "--no-first-run",
+        "--no-default-browser-check",
+    ]
+    if headless:
+        args.append("--headless=new")
+    args.append(url)
+    return subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_for_notebook_tab(cdp_endpoint, url_prefix, timeout=30.0):
+    """Polls the CDP target list until Chromium is up and the fake notebook tab is open."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            targets = json.loads(urllib.request.urlopen(f"{cdp_endpoint}/json/list", timeout=1).read())
+            if any(t.get("type") == "page" and t.get("url", "").startswith(url_prefix) for t in targets):
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"No tab on {url_prefix} behind {cdp_endpoint} within {timeout:.0f}s")
+
+
+def report(latencies):
+    print(f"\nQueries: {len(latencies)}")
+    print(f"  mean {statistics.mean(latencies):6.2f}s   min {min(latencies):6.2f}s   max {max(latencies):6.2f}s")
+    for pct in (50, 90, 95, 99):
+        print(f"  p{pct:<3} {percentile(latencies, pct):6.2f}s")
+
+
+async def run_benchmark(args):
+    server = serve_in_background(**server_options(args))
+    cdp_endpoint = f"http://127.0.0.1:{args.cdp_port}"
+    executable = args.chrome or await default_chromium_path()
+    user_data_dir = tempfile.mkdtemp(prefix="fake-notebooklm-profile-")
+    browser = launch_chromium(executable, args.cdp_port, user_data_dir, server.notebook_url, headless=not args.headed)
+    latencies = []
+    try:
+        wait_for_notebook_tab(cdp_endpoint, server.notebook_url)
+        session_options = {
+            "notebook_url": server.notebook_url,
+            "cdp_endpoint": cdp_endpoint,
+            "settle_quiet_ms": args.settle_quiet_ms,
+            "settle_max_ms": args.settle_max_ms,
+            # Keep benchmark timings out of the real run's history.
+            "metrics": ScraperMetrics(path=os.path.join(user_data_dir, "scraper_metrics.jsonl")),
+        }
+        if args.capture == "network":
+            session_options["network_capture"] = NetworkCapture(ANSWER_PATH)
+        async with NotebookSession(**session_options) as session:
+            for i in range(args.queries):
+                start = time.perf_counter()
+                response = await session.ask(f"Benchmark question {i + 1}")
+                elapsed = time.perf_counter() - start
+                latencies.append(elapsed)
+                print(f"[{i + 1}/{args.queries}] {elapsed:.2f}s ({len(response)} chars)")
+    finally:
+        browser.terminate()
+        browser.wait(timeout=10)
+        server.shutdown()
+        shutil.rmtree(user_data_dir, ignore_errors=True)
+    report(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the NotebookLM scraper against a local fake page.")
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--cdp-port", type=int, default=9333)
+    parser.add_argument("--chrome", help="Chromium/Chrome executable (default: Playwright's bundled Chromium).")
+    parser.add_argument("--headed", action="store_true", help="Show the browser window.")
+    parser.add_argument("--settle-quiet-ms", type=int, default=SETTLE_QUIET_MS)
+    parser.add_argument("--settle-max-ms", type=int, default=SETTLE_MAX_MS)
+    parser.add_argument("--capture", choices=("dom", "network"), default="dom")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
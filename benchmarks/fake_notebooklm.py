@@ -0,0 +1,259 @@
+"""
+Local stand-in for a NotebookLM notebook page.
+
+Serves /notebook/fake with the same DOM the scraper relies on:
+    textarea[placeholder*='Start typing…']
+    div.to-user-container .message-text-content
+    .loading-dots
+    button.citation-marker
+    button.chat-menu, button.clear-chat (NEW_CHAT_SELECTORS)
+Like NotebookLM, the chat history survives a reload (kept in sessionStorage);
+only the chat menu's "Clear chat" starts a fresh conversation.
+The page also loads a cacheable stylesheet, script bundle, web font and image
+from /static/ (each delayed by --asset-delay-ms), so page-ready time depends
+on blocking and on the HTTP cache the way NotebookLM's does.
+On Enter the page POSTs the question to /api/answer, which streams a canned
+answer (benchmarks/fixtures/response_sample.html) as newline-delimited JSON
+chunks at a configurable token rate, and renders it into a new bubble.
+
+    python -m benchmarks.fake_notebooklm --port 8765 --tokens-per-second 60
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURE_HTML = os.path.join(os.path.dirname(__file__), "fixtures", "response_sample.html")
+NOTEBOOK_PATH = "/notebook/fake"
+ANSWER_PATH = "/api/answer"
+STATIC_PATH = "/static/"
+# Stand-ins for NotebookLM's own assets: (content type, body). Cached for an hour.
+STATIC_ASSETS = {
+    "app.css": ("text/css", b"@font-face { font-family: Fake; src: url(/static/font.woff2); }\n"
+                            b"body { font-family: Fake, sans-serif; }\n"),
+    "app.js": ("application/javascript", b"window.fakeAppLoaded = true;\n" + b"// padding\n" * 20000),
+    "font.woff2": ("font/woff2", b"\0" * 40_000),
+    "logo.png": ("image/png", b"\0" * 25_000),
+}
+# Click sequence that clears the fake chat; pass as NotebookSession(new_chat_selectors=...).
+NEW_CHAT_SELECTORS = ("button.chat-menu", "button.clear-chat")
+
+PAGE_TEMPLATE = """<!doctype html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Fake NotebookLM</title>
+<link rel="stylesheet" href="/static/app.css">
+<script src="/static/app.js"></script>
+<style>
+  .hidden { display: none; }
+  .to-user-container, .from-user-container { margin: 8px 0; padding: 8px; border: 1px solid #ddd; }
+</style>
+</head>
+<body>
+<img src="/static/logo.png" alt="">
+<button class="chat-menu">⋮</button>
+<div class="menu hidden"><button class="clear-chat">Clear chat</button></div>
+<div id="chat"></div>
+<textarea placeholder="Start typing…" rows="3" cols="80"></textarea>
+<script>
+const RENDER_DELAY_MS = __RENDER_DELAY_MS__;
+const chat = document.getElementById('chat');
+const input = document.querySelector('textarea');
+const menu = document.querySelector('.menu');
+chat.innerHTML = sessionStorage.getItem('chat') || '';
+
+document.querySelector('.chat-menu').addEventListener('click', () => menu.classList.toggle('hidden'));
+document.querySelector('.clear-chat').addEventListener('click', () => {
+    chat.innerHTML = '';
+    sessionStorage.removeItem('chat');
+    menu.classList.add('hidden');
+});
+
+input.addEventListener('keydown', event => {
+    if (event.key !== 'Enter' || event.shiftKey) return;
+    event.preventDefault();
+    const question = input.value;
+    input.value = '';
+    ask(question);
+});
+
+async function ask(question) {
+    const user = document.createElement('div');
+    user.className = 'from-user-container';
+    user.textContent = question;
+    chat.appendChild(user);
+
+    const bubble = document.createElement('div');
+    bubble.className = 'to-user-container';
+    bubble.innerHTML =
+        '<div class="message-content">' +
+        '<div class="message-text-content"></div>' +
+        '<div class="loading-dots">...</div>' +
+        '</div>' +
+        '<div class="message-actions"><button class="keep-pin"><mat-icon>keep_pin</mat-icon> Save to note</button></div>';
+    chat.appendChild(bubble);
+    const content = bubble.querySelector('.message-text-content');
+    const dots = bubble.querySelector('.loading-dots');
+
+    const response = await fetch('/api/answer', { method: 'POST', body: question });
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+    let html = '';
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffered += decoder.decode(value, { stream: true });
+        let newline;
+        while ((newline = buffered.indexOf('\\n')) >= 0) {
+            const line = buffered.slice(0, newline);
+            buffered = buffered.slice(newline + 1);
+            if (line) {
+                html += JSON.parse(line).text;
+                content.innerHTML = html;
+            }
+        }
+    }
+    dots.classList.add('hidden');
+    sessionStorage.setItem('chat', chat.innerHTML);
+    // Late re-render after the stream ends (stands in for math typesetting).
+    if (RENDER_DELAY_MS > 0) {
+        setTimeout(() => { content.innerHTML = html; }, RENDER_DELAY_MS);
+    }
+}
+</script>
+</body>
+</html>
+"""
+
+
+def load_answer_tokens(path=FIXTURE_HTML):
+    """Splits the canned answer into whitespace-delimited 'tokens' (trailing space kept)."""
+    with open(path, "r", encoding="utf-8") as f:
+        return re.findall(r"\S+\s*", f.read())
+
+
+class FakeNotebookLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output readable.
+
+    def do_GET(self):
+        if self.path.startswith(STATIC_PATH) and self.path[len(STATIC_PATH):] in STATIC_ASSETS:
+            self._send_asset(self.path[len(STATIC_PATH):])
+            return
+        if not self.path.startswith(NOTEBOOK_PATH):
+            self.send_error(404)
+            return
+        page = PAGE_TEMPLATE.replace("__RENDER_DELAY_MS__", str(self.server.render_delay_ms)).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(page)))
+        self.end_headers()
+        self.wfile.write(page)
+
+    def _send_asset(self, name):
+        content_type, body = STATIC_ASSETS[name]
+        time.sleep(self.server.asset_delay_ms / 1000)
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "public, max-age=3600")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path != ANSWER_PATH:
+            self.send_error(404)
+            return
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        server = self.server
+        time.sleep(server.first_token_delay_ms / 1000)
+        interval = 1 / server.tokens_per_second
+        tokens = server.answer_tokens
+        for i in range(server.answer_length):
+            self._write_chunk(json.dumps({"text": tokens[i % len(tokens)]}) + "\n")
+            time.sleep(interval)
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _write_chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+class FakeNotebookLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, tokens_per_second=60.0, answer_length=None, first_token_delay_ms=500, render_delay_ms=300,
+                 asset_delay_ms=0):
+        super().__init__(address, FakeNotebookLMHandler)
+        self.answer_tokens = load_answer_tokens()
+        self.tokens_per_second = tokens_per_second
+        self.answer_length = answer_length or len(self.answer_tokens)
+        self.first_token_delay_ms = first_token_delay_ms
+        self.render_delay_ms = render_delay_ms
+        self.asset_delay_ms = asset_delay_ms
+
+    @property
+    def notebook_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{NOTEBOOK_PATH}"
+
+
+def serve_in_background(port=0, **options):
+    """Starts the fake server on a daemon thread and returns it (port 0 picks a free port)."""
+    server = FakeNotebookLMServer(("127.0.0.1", port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_server_arguments(parser):
+    parser.add_argument("--tokens-per-second", type=float, default=60.0, help="Streaming rate of the canned answer.")
+    parser.add_argument("--answer-tokens", type=int, default=None,
+                        help="Answer length in tokens (default: the whole fixture, repeated if longer).")
+    parser.add_argument("--first-token-delay-ms", type=int, default=500, help="Delay before the first chunk.")
+    parser.add_argument("--render-delay-ms", type=int, default=300,
+                        help="Late DOM re-render after the stream ends (0 disables).")
+    parser.add_argument("--asset-delay-ms", type=int, default=0,
+                        help="Server delay for each /static/ asset, standing in for network latency.")
+
+
+def server_options(args):
+    return {
+        "tokens_per_second": args.tokens_per_second,
+        "answer_length": args.answer_tokens,
+        "first_token_delay_ms": args.first_token_delay_ms,
+        "render_delay_ms": args.render_delay_ms,
+        "asset_delay_ms": args.asset_delay_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local fake NotebookLM page.")
+    parser.add_argument("--port", type=int, default=8765)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = FakeNotebookLMServer(("127.0.0.1", args.port), **server_options(args))
+    print(f"Fake NotebookLM serving at {server.notebook_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+import argparse
+import math
+import re
+from diagram_files import DIAGRAMS_FILE, load_diagrams
+
+# --- Configuration ---
+WARN_COST = 2_000     # Above this a diagram is flagged as slow.
+MAX_COST = 10_000     # Above this it is rejected without compiling.
+DEFAULT_SAMPLES = 25  # pgfplots' and TikZ's default for plotted expressions.
+TABLE_POINTS = 100    # Guess for "table" plots, whose size isn't visible here.
+UNKNOWN_ITERATIONS = 10  # Guess for a \foreach list that isn't numeric.
+
+# Rough relative costs, in "plotted points".
+NODE_COST = 4
+CURVE_COST = 3
+CURVED_FILL_COST = 50   # Per curve in a filled path: the slow case the prompt warns about.
+OPACITY_COST = 50       # Per statement using transparency.
+
+COMMENT_PATTERN = re.compile(r"(?<!\\)%[^\n]*")
+TOKEN_PATTERN = re.compile(r"\\addplot3|\\[A-Za-z@]+|\\.|[{}\[\];]|[^\\{}\[\];]+")
+OPACITY_PATTERN = re.compile(r"\b(?:fill |draw |text )?opacity\b")
+FILL_OPTION_PATTERN = re.compile(r"\bfill\s*=")
+# Circles and ellipses are cheap to fill, so they don't count as curves here.
+CURVE_PATTERN = re.compile(r"\.\.\s*controls|\bto\s*\[[^\]]*\b(?:out|in|bend)|\barc\b|"
+                           r"\bplot\b|\bsmooth\b|\bparabola\b|\bsin\b|\bcos\b")
+NODE_PATTERN = re.compile(r"\bnode\b")
+FILL_COMMANDS = ("\\fill", "\\filldraw", "\\shade", "\\shadedraw")
+AXIS_ENVIRONMENTS = ("axis", "semilogxaxis", "semilogyaxis", "loglogaxis", "polaraxis")
+PREAMBLE_COMMANDS = ("\\documentclass", "\\usepackage")
+
+
+def tokenize(code: str):
+    """Splits TikZ code (comments removed) into commands, braces, brackets, ';' and text runs."""
+    return TOKEN_PATTERN.findall(COMMENT_PATTERN.sub("", code))
+
+
+def _group_end(tokens, i, open_token="{", close_token="}"):
+    """Index just past the group opened at tokens[i]."""
+    depth = 0
+    for j in range(i, len(tokens)):
+        if tokens[j] == open_token:
+            depth += 1
+        elif tokens[j] == close_token:
+            depth -= 1
+            if depth == 0:
+                return j + 1
+    return len(tokens)
+
+
+def _skip_space(tokens, i, end):
+    while i < end and not tokens[i].strip():
+        i += 1
+    return i
+
+
+def _number(text):
+    """Evaluates a plain arithmetic expression (digits, + - * / ( ), pi); None otherwise."""
+    text = text.strip()
+    if not text or "**" in text or not re.fullmatch(r"[\d\s.+\-*/()]*(?:pi[\d\s.+\-*/()]*)*", text):
+        return None
+    try:
+        return float(eval(text, {"__builtins__": {}}, {"pi": math.pi}))
+    except Exception:
+        return None
+
+
+def list_length(items_text: str) -> int:
+    """Iterations of a \\foreach list: explicit items, or a '...' range like {0,0.5,...,10}."""
+    items = [item.strip() for item in items_text.split(",") if item.strip()]
+    if "..." not in items:
+        return max(1, len(items))
+    k = items.index("...")
+    if k == 0 or k == len(items) - 1:
+        return UNKNOWN_ITERATIONS
+    first, last = _number(items[0]), _number(items[k + 1])
+    if first is None or last is None:
+        if len(items[0]) == 1 and len(items[k + 1]) == 1:  # Letter ranges, {a,...,e}
+            return abs(ord(items[k + 1]) - ord(items[0])) + 1
+        return UNKNOWN_ITERATIONS
+    second = _number(items[1]) if k >= 2 else None
+    step = second - first if second is not None else (1.0 if last >= first else -1.0)
+    if step == 0:
+        return UNKNOWN_ITERATIONS
+    count = max(1, int(math.floor((last - first) / step + 1e-9)) + 1)
+    return count + len(items) - k - 2  # Plus any items after the range's end.
+
+
+def parse_options(text: str):
+    """key=value pairs of an option list, at its top level only; bare keys map to True."""
+    options = {}
+    depth = 0
+    current = ""
+    for ch in text + ",":
+        if ch in "{(":
+            depth += 1
+        elif ch in "})":
+            depth -= 1
+        if ch == "," and depth == 0:
+            key, _, value = current.partition("=")
+            if key.strip():
+                options[key.strip()] = value.strip().strip("{}") if _ else True
+            current = ""
+        else:
+            current += ch
+    return options
+
+
+class _Analysis:
+    def __init__(self):
+        self.cost = 0.0
+        self.plots = []
+        self.nodes = 0
+        self.curved_fills = 0
+        self.opacity = 0
+        self.foreach_iterations = 0
+        self.max_foreach_depth = 0
+        self.violations = []
+        self.warnings = []
+        self.axis_options = {}
+
+    def violation(self, message):
+        if message not in self.violations:
+            self.violations.append(message)
+
+    def warning(self, message):
+        if message not in self.warnings:
+            self.warnings.append(message)
+
+
+def _walk(tokens, i, end, multiplier, depth, result):
+    while i < end:
+        token = tokens[i]
+        if not token.strip() or token in ("{", "}"):
+            i += 1
+        elif token == "\\foreach":
+            i = _foreach(tokens, i, end, multiplier, depth, result)
+        elif token in ("\\begin", "\\end"):
+            name_end = _group_end(tokens, i + 1)
+            name = "".join(tokens[i + 2:name_end - 1]).strip()
+            i = _skip_space(tokens, name_end, end)
+            options = ""
+            if token == "\\begin" and i < end and tokens[i] == "[":
+                options_end = _group_end(tokens, i, "[", "]")
+                options = "".join(tokens[i + 1:options_end - 1])
+                i = options_end
+            if name == "document":
+                result.violation("Contains \\begin{document}/\\end{document}; only the picture belongs in the output.")
+            if OPACITY_PATTERN.search(options):
+                result.opacity += multiplier
+                result.violation("Uses opacity/fill opacity (transparency is very slow to render).")
+            if name in AXIS_ENVIRONMENTS:
+                # Plots inherit the axis' samples/domain until the axis ends.
+                result.axis_options = parse_options(options) if token == "\\begin" else {}
+                if token == "\\begin" and result.axis_options.get("clip") != "false":
+                    result.warning("Axis without clip=false (labels near the edge get cut off).")
+        elif token in PREAMBLE_COMMANDS:
+            result.violation(f"Contains {token}; the document preamble already loads everything.")
+            i = _group_end(tokens, _skip_space(tokens, i + 1, end)) if i + 1 < end else end
+        else:
+            statement_end = i
+            depth_in = 0
+            while statement_end < end:
+                t = tokens[statement_end]
+                if t == "{":
+                    depth_in += 1
+                elif t == "}":
+                    if depth_in == 0:
+                        break
+                    depth_in -= 1
+                elif depth_in == 0 and (t == ";" or t in ("\\begin", "\\end")):
+                    break
+                statement_end += 1
+            _statement(tokens[i:statement_end], multiplier, result)
+            i = statement_end + (1 if statement_end < end and tokens[statement_end] == ";" else 0)
+
+
+def _foreach(tokens, i, end, multiplier, depth, result):
+    """Handles \\foreach <vars> [options] in {list} <body>; returns the index after the body."""
+    j = i + 1
+    seen_in = False
+    while j < end and not (seen_in and tokens[j] == "{"):
+        if tokens[j] == "[":
+            j = _group_end(tokens, j, "[", "]")
+            continue
+        if re.search(r"\bin\b", tokens[j]):
+            seen_in = True
+        j += 1
+    list_end = _group_end(tokens, j)
+    iterations = list_length("".join(tokens[j + 1:list_end - 1]))
+    body_start = _skip_space(tokens, list_end, end)
+    if body_start < end and tokens[body_start] == "{":
+        body_end = _group_end(tokens, body_start)
+        inner = (body_start + 1, body_end - 1)
+    else:
+        body_end = body_start
+        depth_in = 0
+        while body_end < end and not (tokens[body_end] == ";" and depth_in == 0):
+            depth_in += tokens[body_end] == "{"
+            depth_in -= tokens[body_end] == "}"
+            body_end += 1
+        body_end = min(body_end + 1, end)
+        inner = (body_start, body_end)
+    result.foreach_iterations += multiplier * iterations
+    result.max_foreach_depth = max(result.max_foreach_depth, depth + 1)
+    if depth + 1 >= 2:
+        result.warning(f"Nested \\foreach ({depth + 1} levels, {multiplier * iterations} innermost iterations).")
+    _walk(tokens, inner[0], inner[1], multiplier * iterations, depth + 1, result)
+    return body_end
+
+
+def _statement(tokens, multiplier, result):
+    text = "".join(tokens)
+    path_text = "".join(t for t in tokens if not t.startswith("\\"))  # Without the commands.
+    options = " ".join("".join(tokens[k + 1:_group_end(tokens, k, "[", "]") - 1])
+                       for k, t in enumerate(tokens) if t == "[")
+    lead = next((t for t in tokens if t.startswith("\\")), "")
+    cost = 1.0 + text.count("--")
+
+    curves = len(CURVE_PATTERN.findall(path_text))
+    cost += curves * CURVE_COST
+    nodes = len(NODE_PATTERN.findall(path_text)) + (lead == "\\node")
+    result.nodes += nodes * multiplier
+    cost += nodes * NODE_COST
+
+    if OPACITY_PATTERN.search(options):
+        result.opacity += multiplier
+        cost += OPACITY_COST
+        result.violation("Uses opacity/fill opacity (transparency is very slow to render).")
+
+    filled = lead in FILL_COMMANDS or bool(FILL_OPTION_PATTERN.search(options))
+    if filled and curves and lead not in ("\\addplot", "\\addplot3"):
+        result.curved_fills += multiplier
+        cost += curves * CURVED_FILL_COST
+        if re.search(r"\bcycle\b", text):
+            result.violation("Fills a closed path built from curves (\\fill with curves and cycle); "
+                             "use fillbetween or an annotation instead.")
+        else:
+            result.warning("Fills a path with curves.")
+
+    if lead in ("\\addplot", "\\addplot3"):
+        cost += _plot(lead, tokens, text, result)
+    elif "fill between" in text or "fillbetween" in text:
+        result.warning("Uses fill between, which needs \\usepgfplotslibrary{fillbetween}; the document preamble doesn't load it.")
+    result.cost += cost * multiplier
+
+
+def _plot(lead, tokens, text, result):
+    """Points pgfplots computes for one \\addplot (its own options over the axis options)."""
+    k = tokens.index(lead) + 1
+    while k < len(tokens) and (not tokens[k].strip() or tokens[k].strip() == "+"):
+        k += 1
+    own = {}
+    if k < len(tokens) and tokens[k] == "[":
+        own = parse_options("".join(tokens[k + 1:_group_end(tokens, k, "[", "]") - 1]))
+    options = {**result.axis_options, **own}
+    domain = options.get("domain")
+    width = None
+    if isinstance(domain, str) and ":" in domain:
+        low, high = (_number(part) for part in domain.split(":", 1))
+        if low is not None and high is not None:
+            width = high - low
+    if "coordinates" in text:
+        points = len(re.findall(r"\([^()]*\)", text[text.index("coordinates"):]))
+        kind = "coordinates"
+    elif re.search(r"\btable\b", text):
+        points = TABLE_POINTS
+        kind = "table"
+    elif "fill between" in text:
+        points = DEFAULT_SAMPLES
+        kind = "fill between"
+        result.warning("Uses fill between, which needs \\usepgfplotslibrary{fillbetween}; the document preamble doesn't load it.")
+    else:
+        kind = "expression"
+        if isinstance(options.get("samples at"), str):
+            points = list_length(options["samples at"])
+        else:
+            points = int(_number(str(options.get("samples", DEFAULT_SAMPLES))) or DEFAULT_SAMPLES)
+        if lead == "\\addplot3":
+            points *= int(_number(str(options.get("samples y", points))) or points)
+    result.plots.append({"kind": kind, "points": points, "domain_width": width})
+    return points
+
+
+def analyze(code: str, warn_cost=WARN_COST, max_cost=MAX_COST):
+    """
+    Static estimate of what a diagram costs to render, without compiling it.
+
+    Walks the tokenized TikZ/PGFPlots code statement by statement. Plotted
+    points, nodes, curves and the slow constructs the diagram prompt forbids
+    (transparency, filled curved paths) are weighted and multiplied by the
+    iterations of every enclosing \\foreach. Returns a dict with the
+    estimated cost, the counts behind it, the rule violations and warnings,
+    and a verdict: "reject" for any violation or a cost over max_cost,
+    "flag" for warnings or a cost over warn_cost, else "ok".
+    """
+    result = _Analysis()
+    tokens = tokenize(code)
+    _walk(tokens, 0, len(tokens), 1, 0, result)
+    if result.cost > max_cost:
+        result.violation(f"Estimated cost {result.cost:.0f} is over the limit of {max_cost}.")
+    elif result.cost > warn_cost:
+        result.warning(f"Estimated cost {result.cost:.0f} is high (over {warn_cost}).")
+    verdict = "reject" if result.violations else "flag" if result.warnings else "ok"
+    return {
+        "verdict": verdict,
+        "cost": round(result.cost),
+        "plots": result.plots,
+        "points": sum(plot["points"] for plot in result.plots),
+        "nodes": result.nodes,
+        "curved_fills": result.curved_fills,
+        "opacity": result.opacity,
+        "foreach_iterations": result.foreach_iterations,
+        "max_foreach_depth": result.max_foreach_depth,
+        "violations": result.violations,
+        "warnings": result.warnings,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estimate the rendering cost of every diagram in diagrams.json.")
+    parser.add_argument("diagrams", nargs="?", default=DIAGRAMS_FILE)
+    parser.add_argument("--max-cost", type=float, default=MAX_COST)
+    args = parser.parse_args()
+
+    diagrams = load_diagrams(args.diagrams)
+    print(f"{'section':<9}{'verdict':<9}{'cost':>8}{'points':>8}{'nodes':>7}{'loops':>7}")
+    for section_id, code in diagrams.items():
+        if not code:
+            continue
+        report = analyze(code, max_cost=args.max_cost)
+        print(f"{section_id:<9}{report['verdict']:<9}{report['cost']:>8}{report['points']:>8}"
+              f"{report['nodes']:>7}{report['foreach_iterations']:>7}")
+        for message in report["violations"]:
+            print(f"    ✗ {message}")
+        for message in report["warnings"]:
+            print(f"    ⚠ {message}")
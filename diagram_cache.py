@@ -0,0 +1,172 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import time
+
+# --- Configuration ---
+DIAGRAM_CACHE_PATH = "diagram_cache.sqlite3"
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024   # Least recently used diagrams are evicted past this.
+DEFAULT_PRUNE_DAYS = 30
+
+
+def diagram_key(model_name: str, prompt_version: str, section_id: str, section_content: str,
+                topic_description: str) -> str:
+    """Content address of a diagram: model + prompt version + everything the prompt is built from."""
+    digest = hashlib.sha256()
+    for part in (model_name, prompt_version, section_id, topic_description, section_content):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class DiagramCache:
+    """
+    Persistent SQLite cache of generated TikZ diagrams, keyed by diagram_key.
+
+    An unchanged section (same text, topic, prompt version and model) is
+    served from here instead of calling Gemini again. Entries never expire
+    on their own: prune() drops the ones not used for a while or made with
+    an older prompt/model, and the cache is trimmed back under max_bytes
+    (least recently used first) after every write. hits and misses count
+    lookups for the current run.
+    """
+
+    def __init__(self, path: str = DIAGRAM_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS diagrams (
+                key TEXT PRIMARY KEY,
+                section_id TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                code TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self._conn.close()
+
+    def get(self, key: str):
+        """Returns the cached diagram code, or None on a miss."""
+        row = self._conn.execute("SELECT code FROM diagrams WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._conn.execute("UPDATE diagrams SET last_access = ?, hits = hits + 1 WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+        return row[0]
+
+    def put(self, key: str, section_id: str, model_name: str, prompt_version: str, code: str):
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO diagrams (key, section_id, model, prompt_version, code, size, created_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, section_id, model_name, prompt_version, code, len(code.encode("utf-8")), now, now),
+        )
+        self._conn.commit()
+        self.evict()
+
+    def delete(self, key: str):
+        self._conn.execute("DELETE FROM diagrams WHERE key = ?", (key,))
+        self._conn.commit()
+
+    def evict(self):
+        """Drops least recently used entries until the cache is under max_bytes."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM diagrams").fetchone()[0]
+        if total > self.max_bytes:
+            rows = self._conn.execute("SELECT key, size FROM diagrams ORDER BY last_access ASC").fetchall()
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM diagrams WHERE key = ?", (key,))
+                total -= size
+        self._conn.commit()
+
+    def prune(self, older_than_seconds=None, keep=None) -> int:
+        """
+        Deletes entries last used more than older_than_seconds ago and, if
+        keep lists (model, prompt_version) pairs, every entry made with
+        anything else. Returns the number of entries removed.
+        """
+        before = self._conn.execute("SELECT COUNT(*) FROM diagrams").fetchone()[0]
+        if older_than_seconds is not None:
+            self._conn.execute("DELETE FROM diagrams WHERE last_access < ?", (time.time() - older_than_seconds,))
+        if keep is not None:
+            current = " OR ".join(["(model = ? AND prompt_version = ?)"] * len(keep)) or "0"
+            self._conn.execute(f"DELETE FROM diagrams WHERE NOT ({current})", [v for pair in keep for v in pair])
+        self._conn.commit()
+        self._conn.execute("VACUUM")
+        return before - self._conn.execute("SELECT COUNT(*) FROM diagrams").fetchone()[0]
+
+    def stats(self):
+        """Entry count, size and lifetime hits overall and per (model, prompt version)."""
+        count, size, hits = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM diagrams"
+        ).fetchone()
+        groups = self._conn.execute(
+            "SELECT model, prompt_version, COUNT(*), SUM(size), SUM(hits), MAX(last_access) FROM diagrams "
+            "GROUP BY model, prompt_version ORDER BY model, prompt_version"
+        ).fetchall()
+        return {
+            "entries": count,
+            "bytes": size,
+            "hits": hits,
+            "by_version": [
+                {"model": model, "prompt_version": version, "entries": n, "bytes": b, "hits": h, "last_access": last}
+                for model, version, n, b, h, last in groups
+            ],
+        }
+
+
+def print_stats(stats):
+    print(f"{stats['entries']} diagram(s), {stats['bytes'] / 1024:.1f} KiB, {stats['hits']} hit(s) in total.")
+    for group in stats["by_version"]:
+        last = time.strftime("%Y-%m-%d %H:%M", time.localtime(group["last_access"]))
+        print(f"  {group['model']} / prompt {group['prompt_version']}: {group['entries']} diagram(s), "
+              f"{group['bytes'] / 1024:.1f} KiB, {group['hits']} hit(s), last used {last}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or prune the generated-diagram cache.")
+    parser.add_argument("--path", default=DIAGRAM_CACHE_PATH)
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    subcommands.add_parser("stats", help="Show entry counts, size and hits.")
+    prune_parser = subcommands.add_parser("prune", help="Delete unused or outdated diagrams.")
+    prune_parser.add_argument("--older-than-days", type=float, default=DEFAULT_PRUNE_DAYS,
+                              help=f"Drop diagrams not used for this many days (default: {DEFAULT_PRUNE_DAYS}).")
+    prune_parser.add_argument("--outdated", action="store_true",
+                              help="Also drop every diagram made with another model or prompt version than the current one.")
+    args = parser.parse_args()
+
+    with DiagramCache(args.path) as cache:
+        if args.command == "prune":
+            keep = None
+            if args.outdated:
+                from diagram_generator import DIAGRAM_MODEL, DIAGRAM_PROMPT_VERSION
+                from generate_single import SINGLE_DIAGRAM_PROMPT_VERSION
+                keep = [(DIAGRAM_MODEL, DIAGRAM_PROMPT_VERSION), (DIAGRAM_MODEL, SINGLE_DIAGRAM_PROMPT_VERSION)]
+            removed = cache.prune(older_than_seconds=args.older_than_days * 24 * 3600, keep=keep)
+            print(f"Removed {removed} diagram(s).")
+        print_stats(cache.stats())
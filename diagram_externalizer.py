@@ -0,0 +1,66 @@
+import argparse
+import asyncio
+import os
+from diagram_files import DIAGRAMS_FILE, PDF_CACHE_DIR, load_diagrams, pdf_cache_path
+from diagram_validator import DEFAULT_BUDGET_SECONDS, PDFLATEX, compile_all
+
+
+async def externalize_diagrams(diagrams, pdf_dir=PDF_CACHE_DIR, budget_seconds=DEFAULT_BUDGET_SECONDS, workers=None,
+                               pdflatex=PDFLATEX):
+    """
+    Renders every diagram to its own PDF under pdf_dir (see pdf_cache_path)
+    on a pool of `workers` pdflatex processes. A diagram whose PDF is
+    already there costs nothing, so only new or edited diagrams compile.
+
+    Returns {section_id: PDF path, or None when the diagram is empty or
+    didn't compile}; replace_diagram_markers includes the PDFs and falls
+    back to inline TikZ for the rest.
+    """
+    results = await compile_all(diagrams, budget_seconds, workers, pdflatex, pdf_dir)
+    cached = [s for s, r in results.items() if r.get("cached")]
+    rendered = [s for s, r in results.items() if r["status"] == "ok" and not r.get("cached")]
+    failed = [s for s, r in results.items() if r["status"] in ("failed", "over budget")]
+    seconds = sum(results[s]["seconds"] for s in rendered)
+    print(f"Diagram PDFs: {len(cached)} cached, {len(rendered)} rendered ({seconds:.1f}s of pdflatex), "
+          f"{len(failed)} left inline.")
+    for section_id in failed:
+        print(f"  ✗ {section_id} ({results[section_id]['status']}): {results[section_id]['error']}")
+    return {
+        section_id: pdf_cache_path(diagrams[section_id], pdf_dir) if result["status"] == "ok" else None
+        for section_id, result in results.items()
+    }
+
+
+def prune_pdfs(diagrams, pdf_dir=PDF_CACHE_DIR) -> int:
+    """Deletes every PDF in pdf_dir that no diagram in `diagrams` renders to. Returns how many."""
+    if not os.path.isdir(pdf_dir):
+        return 0
+    current = {os.path.basename(pdf_cache_path(code, pdf_dir)) for code in diagrams.values() if code}
+    removed = 0
+    for name in os.listdir(pdf_dir):
+        if name.endswith(".pdf") and name not in current:
+            os.remove(os.path.join(pdf_dir, name))
+            removed += 1
+    return removed
+
+
+def main(diagrams_file=DIAGRAMS_FILE, pdf_dir=PDF_CACHE_DIR, budget_seconds=DEFAULT_BUDGET_SECONDS, workers=None,
+         prune=False):
+    # Read the way replace_diagram_markers reads it, so the PDFs are the ones it looks for.
+    diagrams = load_diagrams(diagrams_file)
+    asyncio.run(externalize_diagrams(diagrams, pdf_dir, budget_seconds, workers))
+    if prune:
+        print(f"Removed {prune_pdfs(diagrams, pdf_dir)} outdated PDF(s) from {pdf_dir}.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-render every diagram in diagrams.json to a cached PDF.")
+    parser.add_argument("--diagrams", default=DIAGRAMS_FILE)
+    parser.add_argument("--pdf-dir", default=PDF_CACHE_DIR, help=f"Where the PDFs are kept (default: {PDF_CACHE_DIR}).")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS,
+                        help=f"Wall-clock seconds a diagram may take to compile (default: {DEFAULT_BUDGET_SECONDS:.0f}).")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel pdflatex processes (default: CPU count).")
+    parser.add_argument("--prune", action="store_true", help="Also delete PDFs of diagrams no longer in diagrams.json.")
+    args = parser.parse_args()
+    main(diagrams_file=args.diagrams, pdf_dir=args.pdf_dir, budget_seconds=args.budget, workers=args.workers,
+         prune=args.prune)
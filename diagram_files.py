@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+
+# --- Configuration ---
+DIAGRAMS_FILE = 'diagrams.json'
+PDF_CACHE_DIR = "diagram_pdfs"  # Compiled diagrams, named by the hash of their standalone source.
+
+# The packages study_guide_CLEAN.tex gives a diagram (see LATEX_HEADER), minus
+# page layout and externalization, so a diagram that compiles here compiles there.
+STANDALONE_PREAMBLE = r"""\documentclass[border=2pt]{standalone}
+\usepackage{amsmath}
+\usepackage{amssymb}
+\usepackage{graphicx}
+\usepackage{tikz}
+\usepackage{pgfplots}
+\pgfplotsset{compat=1.18}
+\begin{document}
+"""
+STANDALONE_FOOTER = "\n\\end{document}\n"
+
+
+def standalone_document(diagram_code: str) -> str:
+    return STANDALONE_PREAMBLE + diagram_code + STANDALONE_FOOTER
+
+
+def pdf_cache_path(diagram_code: str, pdf_dir: str = PDF_CACHE_DIR) -> str:
+    """Where the compiled diagram lives: same code and preamble, same PDF."""
+    digest = hashlib.sha256(standalone_document(diagram_code).encode("utf-8")).hexdigest()
+    return os.path.join(pdf_dir, f"{digest[:32]}.pdf")
+
+
+def write_diagrams(diagrams, output_file=DIAGRAMS_FILE):
+    """
+    Replaces output_file with diagrams in one step, so a reader never sees
+    half a file, then removes its log (diagram_log_path): whatever the log
+    held was read into diagrams (see load_diagrams) or is superseded by them,
+    and left behind it would be laid over the new file.
+    """
+    tmp_path = output_file + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(diagrams, f, indent=2)
+    os.replace(tmp_path, output_file)
+    log_file = diagram_log_path(output_file)
+    if os.path.exists(log_file):
+        os.remove(log_file)
+
+
+def diagram_log_path(output_file=DIAGRAMS_FILE):
+    """The log generate_diagrams appends to while it runs: diagrams.json -> diagrams.jsonl."""
+    return os.path.splitext(output_file)[0] + ".jsonl"
+
+
+def append_diagram_log(log, section_id, key, code):
+    """Appends one result to an open diagram log and forces it to disk."""
+    log.write(json.dumps({"section_id": section_id, "key": key, "code": code}) + "\n")
+    log.flush()
+    os.fsync(log.fileno())
+
+
+def read_diagram_log(log_file):
+    """
+    {section_id: record} from a diagram log, the latest record per section.
+    A line cut short by a crash is skipped.
+    """
+    records = {}
+    with open(log_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            records[record["section_id"]] = record
+    return records
+
+
+def load_diagrams(path=DIAGRAMS_FILE):
+    """
+    {section_id: diagram code} from diagrams.json or from a diagram log
+    (a .jsonl path). For diagrams.json, anything in its log, left by a run
+    that was interrupted before compacting it, takes precedence. Raises
+    FileNotFoundError when there is neither.
+    """
+    if path.endswith(".jsonl"):
+        return {section_id: record["code"] for section_id, record in read_diagram_log(path).items()}
+    log_file = diagram_log_path(path)
+    diagrams = {}
+    if os.path.exists(path) or not os.path.exists(log_file):
+        with open(path, 'r', encoding='utf-8') as f:
+            diagrams = json.load(f)
+    if os.path.exists(log_file):
+        diagrams.update(load_diagrams(log_file))
+    return diagrams
@@ -1,27 +1,36 @@
 import google.generativeai as genai
+import argparse
+import asyncio
 import os
-import json
 import re
 from dotenv import load_dotenv
+from google.api_core.exceptions import (
+    DeadlineExceeded,
+    InternalServerError,
+    ResourceExhausted,
+    ServiceUnavailable,
+    TooManyRequests,
+)
+from diagram_analyzer import analyze
+from diagram_cache import DiagramCache, diagram_key
+from diagram_files import DIAGRAMS_FILE, append_diagram_log, diagram_log_path, read_diagram_log, write_diagrams
+from gm.section_index import STUDY_GUIDE_PREFIX, SectionIndex
+from rate_limiter import DEFAULT_RPM, DEFAULT_TPM, RateLimiter, estimate_tokens
+from retry_policy import MAX_ATTEMPTS, backoff_delay
+
+DIAGRAM_MODEL = 'gemini-2.5-flash'
+# Bump whenever diagram_prompt changes in a way that should invalidate cached diagrams.
+DIAGRAM_PROMPT_VERSION = "1"
+EXPECTED_OUTPUT_TOKENS = 1500  # Reserved per request until the API reports the real usage.
+RETRYABLE_ERRORS = (ResourceExhausted, TooManyRequests, ServiceUnavailable, InternalServerError, DeadlineExceeded)
 
 load_dotenv()
 # Configure your API key
 genai.configure(api_key=os.getenv("GEMINI_API_KEY")) # type: ignore
 
 def parse_markdown_sections(markdown_file):
-    with open(markdown_file, 'r', encoding='utf-8') as f:
-        content = f.read()
-    sections = {}
-    # Split the content by section headers
-    parts = re.split(r'## Section (\w+)', content)
-    if len(parts) > 1:
-        for i in range(1, len(parts), 2):
-            section_id = parts[i]
-            section_content = parts[i+1].strip()
-            # Remove the diagram marker from the content
-            section_content = re.sub(r'%%DIAGRAM_MARKER_\w+%%', '', section_content)
-            sections[section_id] = section_content
-    return sections
+    # One read through the shared section index, with the diagram markers removed
+    return SectionIndex.load(markdown_file, STUDY_GUIDE_PREFIX).read_all(strip_markers=True)
 
 def parse_topics(topics_file):
     with open(topics_file, 'r', encoding='utf-8') as f:
@@ -40,9 +49,8 @@ def parse_topics(topics_file):
     return topics
 
 
-def generate_diagram_code(section_id, section_content, topic_description):
-    model = genai.GenerativeModel('gemini-2.5-flash') # type: ignore
-    prompt = f"""
+def diagram_prompt(section_id, section_content, topic_description):
+    return f"""
     You are an expert in creating EFFICIENT LaTeX diagrams for technical topics using TikZ and PGFPlots.
     Based on the content for section {section_id}, create a visually clear LaTeX diagram.
 
@@ -85,40 +93,167 @@ def generate_diagram_code(section_id, section_content, topic_description):
     
     Now, generate the efficient diagram for the provided section content.
     """
-    # ... (rest of your function)
+
+def extract_diagram_code(text):
+    match = re.search(r'```latex\n(.*?)\n```', text, re.DOTALL)
+    if match:
+        return match.group(1).strip()
+    # Fallback if the model doesn't use markdown
+    code = text.replace("```latex", "").replace("```", "")
+    return code.strip()
+
+def generate_diagram_code(section_id, section_content, topic_description):
+    model = genai.GenerativeModel(DIAGRAM_MODEL) # type: ignore
+    prompt = diagram_prompt(section_id, section_content, topic_description)
     try:
         response = model.generate_content(prompt)
-        # (Your existing code to parse the response)
-        code = response.text
-        match = re.search(r'```latex\n(.*?)\n```', code, re.DOTALL)
-        if match:
-            return match.group(1).strip()
-        # Fallback if the model doesn't use markdown
-        code = code.replace("```latex", "").replace("```", "")
-        return code.strip()
+        return extract_diagram_code(response.text)
     except Exception as e:
         print(f"Error generating diagram for section {section_id}: {e}")
         return ""
 
-def main():
-    sections = parse_markdown_sections('final_study_guide.md')
-    topics = parse_topics('topics.md') # You'll need to implement a parser for topics.md
-    diagrams = {}
 
-    for section_id, section_content in sections.items():
-        print(f"Generating diagram for section {section_id}...")
-        topic_description = topics.get(section_id, "") # Get the corresponding topic description
-        if topic_description:
-            diagram_code = generate_diagram_code(section_id, section_content, topic_description)
-            diagrams[section_id] = diagram_code
+class DiagramClient:
+    """
+    Async diagram requests through one reused model, for generating many
+    sections at once. Every request first takes its share of the
+    requests-per-minute and tokens-per-minute budgets (see RateLimiter);
+    rate-limit and transient server errors are retried with backoff, and a
+    429 pauses every request, not just the one that got it.
+
+    With a DiagramCache, unchanged sections are served from it without a
+    request (refresh=True skips the lookup but still stores new diagrams).
+    """
+
+    def __init__(self, model_name=DIAGRAM_MODEL, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM, max_attempts=MAX_ATTEMPTS,
+                 cache=None, refresh=False):
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name) # type: ignore
+        self.limiter = RateLimiter(rpm, tpm)
+        self.max_attempts = max_attempts
+        self.cache = cache
+        self.refresh = refresh
+
+    def key(self, section_id, section_content, topic_description):
+        """The section's diagram_key for this client's model and the current prompt version."""
+        return diagram_key(self.model_name, DIAGRAM_PROMPT_VERSION, section_id, section_content, topic_description)
+
+    async def generate(self, section_id, section_content, topic_description, refresh=None):
+        """The diagram's LaTeX, or "" if it could not be generated (like generate_diagram_code)."""
+        key = self.key(section_id, section_content, topic_description)
+        if self.cache is not None and not (self.refresh if refresh is None else refresh):
+            code = self.cache.get(key)
+            if code is not None:
+                return code
+        code = await self._request(section_id, section_content, topic_description)
+        if self.cache is not None and code:
+            self.cache.put(key, section_id, self.model_name, DIAGRAM_PROMPT_VERSION, code)
+        return code
+
+    def forget(self, section_id, section_content, topic_description):
+        """Removes the section's cached diagram (e.g. one that doesn't compile)."""
+        if self.cache is not None:
+            self.cache.delete(self.key(section_id, section_content, topic_description))
+
+    async def _request(self, section_id, section_content, topic_description):
+        prompt = diagram_prompt(section_id, section_content, topic_description)
+        estimate = estimate_tokens(prompt) + EXPECTED_OUTPUT_TOKENS
+        for attempt in range(self.max_attempts):
+            await self.limiter.acquire(estimate)
+            try:
+                response = await self.model.generate_content_async(prompt)
+                code = extract_diagram_code(response.text)
+            except RETRYABLE_ERRORS as e:
+                if attempt + 1 >= self.max_attempts:
+                    print(f"Error generating diagram for section {section_id}: {e}")
+                    return ""
+                delay = backoff_delay(attempt)
+                if isinstance(e, (ResourceExhausted, TooManyRequests)):
+                    self.limiter.pause(delay)
+                print(f"Diagram {section_id} attempt {attempt + 1}/{self.max_attempts} failed ({e}); retrying in {delay:.1f}s...")
+                await asyncio.sleep(delay)
+                continue
+            except Exception as e:
+                print(f"Error generating diagram for section {section_id}: {e}")
+                return ""
+            usage = getattr(response, "usage_metadata", None)
+            if usage and usage.total_token_count:
+                self.limiter.settle(estimate, usage.total_token_count)
+            return code
+        return ""
+
+
+async def generate_diagrams(sections, topics, output_file=DIAGRAMS_FILE, client=None):
+    """
+    Generates the diagram for every section with a topic description, all
+    requests in flight at once (within the client's rate limits).
+
+    Each result is appended to a log next to output_file (diagram_log_path)
+    the moment it arrives, so a crash or kill loses nothing: the next run
+    reuses every logged diagram whose section, topic, prompt and model are
+    unchanged (unless the client refreshes) and asks only for the rest. At
+    the end the log is compacted into output_file, in section order, with an
+    atomic rename, and removed.
+    """
+    client = client or DiagramClient()
+    section_ids = []
+    for section_id in sections:
+        if topics.get(section_id, ""):
+            section_ids.append(section_id)
         else:
             print(f"No topic description found for section {section_id}")
+    log_file = diagram_log_path(output_file)
+    done = {}
+    if not client.refresh and os.path.exists(log_file):
+        for section_id, record in read_diagram_log(log_file).items():
+            if (section_id in section_ids and record["code"]
+                    and record["key"] == client.key(section_id, sections[section_id], topics[section_id])):
+                done[section_id] = record["code"]
+        print(f"Resuming: {len(done)} diagram(s) recovered from {log_file}.")
+    recovered = len(done)
+
+    # Start the log over with just what is reused, dropping stale records and any cut-off line.
+    with open(log_file + ".tmp", 'w', encoding='utf-8') as log:
+        for section_id in section_ids:
+            if section_id in done:
+                append_diagram_log(log, section_id, client.key(section_id, sections[section_id], topics[section_id]),
+                                   done[section_id])
+    os.replace(log_file + ".tmp", log_file)
 
+    async def run(section_id, log):
+        print(f"Generating diagram for section {section_id}...")
+        done[section_id] = await client.generate(section_id, sections[section_id], topics[section_id])
+        append_diagram_log(log, section_id, client.key(section_id, sections[section_id], topics[section_id]),
+                           done[section_id])
+        print(f"✓ Diagram {section_id} ({len(done)}/{len(section_ids)})")
+        if done[section_id]:
+            # Cheap static check; diagram_validator.py acts on it, this only warns.
+            static = analyze(done[section_id])
+            for message in static["violations"] + static["warnings"]:
+                print(f"  ⚠ {section_id} ({static['verdict']}, est. cost {static['cost']}): {message}")
 
-    with open('diagrams.json', 'w', encoding='utf-8') as f:
-        json.dump(diagrams, f, indent=2)
+    with open(log_file, 'a', encoding='utf-8') as log:
+        await asyncio.gather(*(run(section_id, log) for section_id in section_ids if section_id not in done))
+    diagrams = {section_id: done[section_id] for section_id in section_ids}
+    write_diagrams(diagrams, output_file)  # Also removes the log.
+    if client.cache is not None:
+        generated = len(section_ids) - recovered - client.cache.hits
+        print(f"Diagrams: {recovered} from the log, {client.cache.hits} from the cache, {generated} generated.")
+    return diagrams
 
-    print("✅ Diagram generation complete! Check diagrams.json.")
+def main(rpm=DEFAULT_RPM, tpm=DEFAULT_TPM, refresh=False):
+    sections = parse_markdown_sections('final_study_guide.md')
+    topics = parse_topics('topics.md') # You'll need to implement a parser for topics.md
+    with DiagramCache() as cache:
+        client = DiagramClient(rpm=rpm, tpm=tpm, cache=cache, refresh=refresh)
+        asyncio.run(generate_diagrams(sections, topics, client=client))
+    print(f"✅ Diagram generation complete! Check {DIAGRAMS_FILE}.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate a TikZ diagram for every study guide section.")
+    parser.add_argument("--rpm", type=float, default=DEFAULT_RPM, help=f"Requests per minute (default: {DEFAULT_RPM}).")
+    parser.add_argument("--tpm", type=float, default=DEFAULT_TPM, help=f"Tokens per minute (default: {DEFAULT_TPM}).")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Regenerate every diagram instead of reusing cached ones (new results are still cached).")
+    args = parser.parse_args()
+    main(rpm=args.rpm, tpm=args.tpm, refresh=args.refresh)
@@ -0,0 +1,214 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from diagram_analyzer import MAX_COST, analyze
+from diagram_cache import DiagramCache
+from diagram_files import (
+    DIAGRAMS_FILE,
+    PDF_CACHE_DIR,
+    load_diagrams,
+    pdf_cache_path,
+    standalone_document,
+    write_diagrams,
+)
+from diagram_generator import DiagramClient, parse_markdown_sections, parse_topics
+
+# --- Configuration ---
+REPORT_FILE = "diagram_compile_report.json"
+DEFAULT_BUDGET_SECONDS = 20.0
+DEFAULT_ROUNDS = 2            # Regeneration attempts for a diagram before it is dropped.
+PDFLATEX = "pdflatex"
+
+
+def first_error(log: str) -> str:
+    """The first TeX error ("! ...") and the line after it, or the log's tail."""
+    match = re.search(r"^! .*(?:\n.*)?", log, re.MULTILINE)
+    if match:
+        return match.group(0).strip()
+    return log.strip()[-300:]
+
+
+async def compile_diagram(section_id, diagram_code, budget_seconds=DEFAULT_BUDGET_SECONDS, pdflatex=PDFLATEX,
+                          pdf_dir=None):
+    """
+    Compiles one diagram in its own scratch directory. Returns a report entry:
+    status "ok", "failed" (pdflatex error), "over budget" (killed after
+    budget_seconds) or "empty", with the wall-clock seconds and the error.
+
+    With pdf_dir, the PDF is kept at pdf_cache_path, and a diagram already
+    there is not compiled again ("ok", marked cached).
+    """
+    if not diagram_code:
+        return {"status": "empty", "seconds": 0.0, "error": None}
+    pdf_path = pdf_cache_path(diagram_code, pdf_dir) if pdf_dir else None
+    if pdf_path and os.path.exists(pdf_path):
+        return {"status": "ok", "seconds": 0.0, "error": None, "cached": True}
+    workdir = tempfile.mkdtemp(prefix=f"diagram-{section_id}-")
+    try:
+        with open(os.path.join(workdir, "diagram.tex"), "w", encoding="utf-8") as f:
+            f.write(standalone_document(diagram_code))
+        start = time.monotonic()
+        process = await asyncio.create_subprocess_exec(
+            pdflatex, "-interaction=nonstopmode", "-halt-on-error", "-no-shell-escape", "diagram.tex",
+            cwd=workdir, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL,
+        )
+        try:
+            await asyncio.wait_for(process.wait(), timeout=budget_seconds)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            return {"status": "over budget", "seconds": round(time.monotonic() - start, 2),
+                    "error": f"Still compiling after {budget_seconds:.0f}s."}
+        seconds = round(time.monotonic() - start, 2)
+        if process.returncode == 0 and os.path.exists(os.path.join(workdir, "diagram.pdf")):
+            if pdf_path:
+                os.makedirs(pdf_dir, exist_ok=True)
+                # Copied under a temporary name first so a reader never finds half a PDF.
+                shutil.copyfile(os.path.join(workdir, "diagram.pdf"), pdf_path + ".tmp")
+                os.replace(pdf_path + ".tmp", pdf_path)
+            return {"status": "ok", "seconds": seconds, "error": None}
+        try:
+            with open(os.path.join(workdir, "diagram.log"), "r", encoding="utf-8", errors="replace") as f:
+                error = first_error(f.read())
+        except OSError:
+            error = f"pdflatex exited with status {process.returncode}."
+        return {"status": "failed", "seconds": seconds, "error": error}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+async def compile_all(diagrams, budget_seconds=DEFAULT_BUDGET_SECONDS, workers=None, pdflatex=PDFLATEX,
+                      pdf_dir=None):
+    """Compiles every diagram on a pool of `workers` pdflatex processes; {section_id: report entry}."""
+    semaphore = asyncio.Semaphore(workers or os.cpu_count() or 1)
+
+    async def run(section_id):
+        async with semaphore:
+            return await compile_diagram(section_id, diagrams[section_id], budget_seconds, pdflatex, pdf_dir)
+
+    results = await asyncio.gather(*(run(section_id) for section_id in diagrams))
+    return dict(zip(diagrams, results))
+
+
+async def validate_diagrams(diagrams, sections, topics, budget_seconds=DEFAULT_BUDGET_SECONDS, workers=None,
+                            on_failure="regenerate", rounds=DEFAULT_ROUNDS, client=None, pdflatex=PDFLATEX,
+                            max_cost=MAX_COST, pdf_dir=None):
+    """
+    Compiles every diagram and deals with the ones that fail or go over the
+    budget. Each diagram first goes through the static analyzer; one it
+    rejects (a forbidden construct, or an estimated cost over max_cost) is
+    not compiled at all and counts as failed ("rejected").
+
+    on_failure="regenerate" asks the client again for a failed diagram
+    (bypassing the cache, whose entry the new diagram replaces) up to
+    `rounds` times and then drops it; "drop" drops it straight away;
+    "keep" only reports.
+    A regeneration that returns "" counts as a failure as well.
+    A dropped diagram becomes "" (its marker is then just removed from the
+    LaTeX) and leaves the client's cache, so the next run doesn't serve it
+    again.
+
+    With pdf_dir, every diagram that compiles is kept there (see
+    compile_diagram), and those already there aren't compiled again.
+    Returns (diagrams, report) where report has one entry per section,
+    including its compile attempts.
+    """
+    diagrams = dict(diagrams)
+    report = {section_id: {"attempts": []} for section_id in diagrams}
+    pending = list(diagrams)
+    round_number = 0
+    while pending:
+        results = {}
+        for section_id in pending:
+            static = analyze(diagrams[section_id], max_cost=max_cost) if diagrams[section_id] else None
+            report[section_id]["static"] = static
+            if static and static["verdict"] == "reject":
+                results[section_id] = {"status": "rejected", "seconds": 0.0, "error": "; ".join(static["violations"])}
+        to_compile = {s: diagrams[s] for s in pending if s not in results}
+        results.update(await compile_all(to_compile, budget_seconds, workers, pdflatex, pdf_dir))
+        for section_id in pending:
+            result = results[section_id]
+            report[section_id]["attempts"].append(result)
+            report[section_id].update(status=result["status"], seconds=result["seconds"])
+        # A regeneration that came back empty (API error or refusal) failed too; a
+        # section that never had a diagram is just "empty".
+        failing = [s for s in pending if results[s]["status"] in ("failed", "over budget", "rejected")
+                   or (results[s]["status"] == "empty" and report[s].get("regenerated"))]
+        if not failing or on_failure == "keep":
+            break
+        if on_failure == "regenerate" and round_number < rounds and client is not None:
+            round_number += 1
+            print(f"Regenerating {len(failing)} diagram(s) (round {round_number}/{rounds}): {', '.join(failing)}")
+            codes = await asyncio.gather(*(
+                client.generate(s, sections.get(s, ""), topics.get(s, ""), refresh=True) for s in failing
+            ))
+            diagrams.update(zip(failing, codes))
+            for section_id in failing:
+                report[section_id]["regenerated"] = round_number
+            pending = failing
+            continue
+        for section_id in failing:
+            print(f"✗ Dropping the diagram for section {section_id} ({report[section_id]['status']}).")
+            diagrams[section_id] = ""
+            report[section_id]["dropped"] = True
+            if client is not None:
+                client.forget(section_id, sections.get(section_id, ""), topics.get(section_id, ""))
+        break
+    return diagrams, report
+
+
+def print_report(report, budget_seconds):
+    print(f"\n{'section':<9}{'status':<13}{'seconds':>9}{'tries':>7}")
+    for section_id, entry in report.items():
+        print(f"{section_id:<9}{entry.get('status', '-'):<13}{entry.get('seconds', 0):>9.2f}{len(entry['attempts']):>7}"
+              f"{'  dropped' if entry.get('dropped') else ''}")
+    compiled = [e for e in report.values() if e.get("status") == "ok"]
+    slowest = max((e["seconds"] for e in compiled), default=0.0)
+    print(f"{len(compiled)}/{len(report)} diagram(s) compile within {budget_seconds:.0f}s (slowest {slowest:.2f}s).")
+
+
+def main(guide_file='final_study_guide.md', topics_file='topics.md', diagrams_file=DIAGRAMS_FILE,
+         report_file=REPORT_FILE, budget_seconds=DEFAULT_BUDGET_SECONDS, workers=None, on_failure="regenerate",
+         rounds=DEFAULT_ROUNDS, max_cost=MAX_COST):
+    if shutil.which(PDFLATEX) is None:
+        print(f"ERROR: {PDFLATEX} was not found on PATH.")
+        return
+    # Includes anything an interrupted diagram_generator run left in its log.
+    diagrams = load_diagrams(diagrams_file)
+    sections = parse_markdown_sections(guide_file)
+    topics = parse_topics(topics_file)
+    with DiagramCache() as cache:
+        diagrams, report = asyncio.run(validate_diagrams(
+            diagrams, sections, topics, budget_seconds=budget_seconds, workers=workers,
+            on_failure=on_failure, rounds=rounds, client=DiagramClient(cache=cache), max_cost=max_cost,
+            pdf_dir=PDF_CACHE_DIR,
+        ))
+    if on_failure != "keep":
+        write_diagrams(diagrams, diagrams_file)
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump({"budget_seconds": budget_seconds, "diagrams": report}, f, indent=2)
+    print_report(report, budget_seconds)
+    print(f"Report saved to {report_file}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile every diagram in diagrams.json within a time budget.")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS,
+                        help=f"Wall-clock seconds a diagram may take to compile (default: {DEFAULT_BUDGET_SECONDS:.0f}).")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel pdflatex processes (default: CPU count).")
+    parser.add_argument("--on-failure", choices=("regenerate", "drop", "keep"), default="regenerate",
+                        help="What to do with diagrams that fail or go over budget (default: regenerate, then drop).")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS,
+                        help=f"Regeneration attempts before a diagram is dropped (default: {DEFAULT_ROUNDS}).")
+    parser.add_argument("--max-cost", type=float, default=MAX_COST,
+                        help=f"Reject diagrams whose estimated cost (see diagram_analyzer.py) is above this (default: {MAX_COST}).")
+    parser.add_argument("--guide", default='final_study_guide.md')
+    parser.add_argument("--report", default=REPORT_FILE)
+    args = parser.parse_args()
+    main(guide_file=args.guide, budget_seconds=args.budget, workers=args.workers, on_failure=args.on_failure,
+         rounds=args.rounds, report_file=args.report, max_cost=args.max_cost)
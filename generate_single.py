@@ -3,27 +3,25 @@ import os
 import json
 import re
 import dotenv
+from diagram_cache import DiagramCache, diagram_key
+from gm.section_index import STUDY_GUIDE_PREFIX, SectionIndex
 # Configure your API key
 dotenv.load_dotenv()
 genai.configure(api_key=os.getenv("GEMINI_API_KEY")) # type: ignore
 
+SINGLE_DIAGRAM_MODEL = 'gemini-2.5-flash'
+# Bump whenever generate_diagram_for_section's prompt changes (cached diagrams are keyed on it).
+SINGLE_DIAGRAM_PROMPT_VERSION = "single-1"
+
 def get_section_content(markdown_file, section_id):
     """Extracts content for a specific section from the markdown file."""
-    with open(markdown_file, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    # Regex to find the content of a specific section
-    pattern = re.compile(rf'## Section {section_id}(.*?)(?=## Section|\Z)', re.DOTALL)
-    match = pattern.search(content)
-
-    if match:
-        section_content = match.group(1).strip()
-        # Remove the marker from the content before sending it to the model
-        return re.sub(r'%%DIAGRAM_MARKER_\w+%%', '', section_content)
-    return None
+    # The index maps straight to the section's bytes (see gm/section_index.py)
+    # and removes the marker before the content is sent to the model.
+    section_content = SectionIndex.load(markdown_file, STUDY_GUIDE_PREFIX).read(section_id, strip_markers=True)
+    return section_content or None
 
 def generate_diagram_for_section(section_id, section_content):
-    model = genai.GenerativeModel('gemini-2.5-flash') # type: ignore
+    model = genai.GenerativeModel(SINGLE_DIAGRAM_MODEL) # type: ignore
     prompt = f"""
     You are an expert in creating EFFICIENT LaTeX diagrams for technical topics using TikZ and PGFPlots.
     Based on the content for section {section_id}, create a visually clear LaTeX diagram.
@@ -87,8 +85,18 @@ def main():
     section_content = get_section_content(markdown_file, target_section)
 
     if section_content:
-        print(f"Generating diagram for section {target_section}...")
-        diagram_code = generate_diagram_for_section(target_section, section_content)
+        # This prompt uses the section text as its topic description too.
+        key = diagram_key(SINGLE_DIAGRAM_MODEL, SINGLE_DIAGRAM_PROMPT_VERSION, target_section,
+                          section_content, section_content)
+        with DiagramCache() as cache:
+            diagram_code = cache.get(key)
+            if diagram_code is not None:
+                print(f"↺ Diagram for section {target_section} served from the diagram cache.")
+            else:
+                print(f"Generating diagram for section {target_section}...")
+                diagram_code = generate_diagram_for_section(target_section, section_content)
+                if diagram_code:
+                    cache.put(key, target_section, SINGLE_DIAGRAM_MODEL, SINGLE_DIAGRAM_PROMPT_VERSION, diagram_code)
 
         diagrams = {target_section: diagram_code}
 
@@ -5,6 +5,7 @@ import os
 from dotenv import load_dotenv
 import google.generativeai as genai
 import markdown
+from gm.section_index import SectionIndex
 
 load_dotenv()
 
@@ -28,44 +29,15 @@ class GeminiAPI:
             raise
 
 def extract_section_and_title(markdown_content, section_id):
-    # This is a simplified markdown parser.
-    # In a real implementation, a more robust parser would be used.
-    lines = markdown_content.splitlines()
-    section_content = []
-    title = "Untitled Chapter"
-    in_section = False
-
-    for line in lines:
-        if line.startswith("# "):
-            title = line[2:].strip()
-        if line.strip() == f"## {section_id}": # Assuming sections are H2 with ID
-            in_section = True
-            continue
-        if in_section and line.startswith("## "): # End of current section
-            in_section = False
-            break
-        if in_section:
-            section_content.append(line)
-
-    return title, "\n".join(section_content).strip()
+    index = SectionIndex.from_bytes(markdown_content.encode("utf-8"))
+    return section_and_title(index, section_id)
 
-def generate_manifest(chapter_path, section_id):
-    """
-    Generates a manifest for a given chapter and section.
-    """
-    if not os.path.exists(chapter_path):
-        raise FileNotFoundError(f"Chapter file not found: {chapter_path}")
-
-    with open(chapter_path, 'r', encoding='utf-8') as f:
-        markdown_content = f.read()
+def section_and_title(index, section_id):
+    title = index.title_for(section_id) or "Untitled Chapter"
+    return title, index.read(section_id) or ""
 
-    title, section_content = extract_section_and_title(markdown_content, section_id)
-
-    if not section_content:
-        raise ValueError(f"Section '{section_id}' not found or is empty in {chapter_path}")
-
-    gemini_api = GeminiAPI()
-    prompt = f"""
+def manifest_prompt(section_id, section_content):
+    return f"""
     You are an expert in creating Manim video manifests from text.
     Analyze the following markdown content for a study guide section and break it down into logical \"scenes\" (e.g., introduction, example, explanation, derivation, diagram).
     For each scene, provide:
@@ -102,9 +74,10 @@ def generate_manifest(chapter_path, section_id):
     Markdown Content for Section '{section_id}':
     {section_content}
     """
-    response_data = gemini_api.generate_content(prompt)
 
-    manifest = {
+def build_manifest(chapter_path, section_id, title, response_data):
+    """Wraps the model's scenes and narration for a section into a manifest."""
+    return {
         "manifest_id": str(uuid.uuid4()),
         "source_chapter": chapter_path,
         "chapter_section": section_id,
@@ -127,7 +100,25 @@ def generate_manifest(chapter_path, section_id):
         "validation_hash": "sha256:..." # Placeholder
     }
 
-    return manifest
+def manifest_output_path(chapter_path, section_id):
+    chapter_base_name = os.path.splitext(os.path.basename(chapter_path))[0]
+    return f"manifests/{chapter_base_name}_{section_id}.json"
+
+def generate_manifest(chapter_path, section_id):
+    """
+    Generates a manifest for a given chapter and section.
+    """
+    if not os.path.exists(chapter_path):
+        raise FileNotFoundError(f"Chapter file not found: {chapter_path}")
+
+    title, section_content = section_and_title(SectionIndex.load(chapter_path), section_id)
+
+    if not section_content:
+        raise ValueError(f"Section '{section_id}' not found or is empty in {chapter_path}")
+
+    gemini_api = GeminiAPI()
+    response_data = gemini_api.generate_content(manifest_prompt(section_id, section_content))
+    return build_manifest(chapter_path, section_id, title, response_data)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -138,8 +129,7 @@ if __name__ == "__main__":
     try:
         manifest = generate_manifest(args.chapter, args.section)
 
-        chapter_base_name = os.path.splitext(os.path.basename(args.chapter))[0]
-        output_filename = f"manifests/{chapter_base_name}_{args.section}.json"
+        output_filename = manifest_output_path(args.chapter, args.section)
 
         os.makedirs("manifests", exist_ok=True) # Ensure directory exists
 
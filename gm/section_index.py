@@ -0,0 +1,159 @@
+import hashlib
+import json
+import mmap
+import os
+import re
+
+INDEX_SUFFIX = ".index.json"
+INDEX_VERSION = 1
+
+H1_PATTERN = re.compile(rb"^# (.*?)[ \t]*\r?$", re.MULTILINE)
+H2_PATTERN = re.compile(rb"^## (.*?)[ \t]*\r?$", re.MULTILINE)
+MARKER_PATTERN = re.compile(r"%%DIAGRAM_MARKER_\w+%%")
+# Generated study guides delimit sections with "## Section <id>"; the answers
+# themselves may contain other H2s, which must stay inside their section.
+STUDY_GUIDE_PREFIX = "Section "
+
+
+def _section_id(heading):
+    """'Section 1a' -> '1a'; any other heading is its own id."""
+    match = re.fullmatch(r"Section (\w+)", heading)
+    return match.group(1) if match else heading
+
+
+def parse_sections(data: bytes, heading_prefix=""):
+    """
+    Parses Markdown bytes into an index: every H1 (with its offset) and every
+    H2 section with its id, heading, byte range of the body (the lines up to
+    the next H2), SHA-256 of the body and the offset of its diagram marker.
+    Only H2s starting with heading_prefix count as section boundaries.
+    """
+    titles = [[m.start(), m.group(1).decode("utf-8").strip()] for m in H1_PATTERN.finditer(data)]
+    prefix = heading_prefix.encode("utf-8")
+    headings = [m for m in H2_PATTERN.finditer(data) if m.group(1).startswith(prefix)]
+    sections = []
+    for match, following in zip(headings, headings[1:] + [None]):
+        heading = match.group(1).decode("utf-8").strip()
+        section_id = _section_id(heading)
+        start = min(match.end() + 1, len(data))  # Body starts after the heading's newline.
+        end = following.start() if following else len(data)
+        marker = data.find(f"%%DIAGRAM_MARKER_{section_id}%%".encode("utf-8"), start, end)
+        sections.append({
+            "id": section_id,
+            "heading": heading,
+            "heading_offset": match.start(),
+            "start": start,
+            "end": end,
+            "sha256": hashlib.sha256(data[start:end]).hexdigest(),
+            "marker": marker if marker != -1 else None,
+        })
+    return {"titles": titles, "sections": sections}
+
+
+def _decode_body(raw: bytes, strip_markers=False):
+    text = raw.decode("utf-8").replace("\r\n", "\n").strip()
+    if strip_markers:
+        text = MARKER_PATTERN.sub("", text)
+    return text
+
+
+class SectionIndex:
+    """
+    Byte-offset index of the H2 sections of a study-guide Markdown file.
+
+    load() reuses the sidecar (<file>.index.json) while the file's mtime and
+    size are unchanged and reparses it otherwise. Reading one section then
+    maps just its byte range instead of regex-scanning the whole file.
+    Sections are looked up by their heading ("Section 1a") or by the id
+    after "Section " ("1a").
+    """
+
+    def __init__(self, markdown_path, titles, sections, data=None):
+        self.markdown_path = markdown_path
+        self.titles = titles
+        self.sections = sections
+        self._data = data
+        self._by_key = {}
+        for entry in sections:
+            self._by_key.setdefault(entry["heading"], entry)
+            self._by_key.setdefault(entry["id"], entry)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, heading_prefix=""):
+        """An index over in-memory Markdown (no file, no sidecar)."""
+        parsed = parse_sections(data, heading_prefix)
+        return cls(None, parsed["titles"], parsed["sections"], data=data)
+
+    @classmethod
+    def load(cls, markdown_path, heading_prefix=""):
+        """Returns the index for markdown_path, rebuilding the sidecar if the file changed."""
+        stat = os.stat(markdown_path)
+        sidecar = markdown_path + INDEX_SUFFIX
+        try:
+            with open(sidecar, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if (cached.get("version") == INDEX_VERSION and cached.get("heading_prefix") == heading_prefix
+                    and cached.get("mtime_ns") == stat.st_mtime_ns and cached.get("size") == stat.st_size):
+                return cls(markdown_path, cached["titles"], cached["sections"])
+        except (OSError, ValueError, KeyError):
+            pass
+
+        with open(markdown_path, "rb") as f:
+            data = f.read()
+        parsed = parse_sections(data, heading_prefix)
+        index = cls(markdown_path, parsed["titles"], parsed["sections"])
+        try:
+            with open(sidecar, "w", encoding="utf-8") as f:
+                json.dump({
+                    "version": INDEX_VERSION,
+                    "heading_prefix": heading_prefix,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                    "titles": index.titles,
+                    "sections": index.sections,
+                }, f)
+        except OSError:
+            pass  # A read-only checkout still gets an in-memory index.
+        return index
+
+    def ids(self):
+        return [entry["id"] for entry in self.sections]
+
+    def find(self, section_id):
+        return self._by_key.get(section_id)
+
+    def title_for(self, section_id):
+        """The last H1 up to the end of the section (or in the whole file if it isn't there)."""
+        entry = self.find(section_id)
+        limit = entry["end"] if entry else float("inf")
+        title = None
+        for offset, text in self.titles:
+            if offset < limit:
+                title = text
+        return title
+
+    def _read_range(self, start, end):
+        if self._data is not None:
+            return self._data[start:end]
+        if start >= end:
+            return b""
+        with open(self.markdown_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            return m[start:end]
+
+    def read(self, section_id, strip_markers=False):
+        """The section's body text (stripped), or None if there is no such section."""
+        entry = self.find(section_id)
+        if entry is None:
+            return None
+        return _decode_body(self._read_range(entry["start"], entry["end"]), strip_markers)
+
+    def read_all(self, strip_markers=False):
+        """{id: body} for every section, in file order, from a single read."""
+        data = self._data
+        if data is None:
+            with open(self.markdown_path, "rb") as f:
+                data = f.read()
+        return {
+            entry["id"]: _decode_body(data[entry["start"]:entry["end"]], strip_markers)
+            for entry in self.sections
+        }
@@ -0,0 +1,92 @@
+from diagram_analyzer import DEFAULT_SAMPLES, MAX_COST, UNKNOWN_ITERATIONS, analyze, list_length, tokenize
+
+CLEAN_AXIS = r"""
+\begin{tikzpicture}
+    \begin{axis}[domain=0:10, samples=50, clip=false]
+    \addplot[blue, thick] {sin(deg(x))};
+    \node at (axis cs: 7, 0.8) {Important};
+    \draw[->] (axis cs: 6, 0.7) -- (axis cs: 5, 0.1);
+    \end{axis}
+\end{tikzpicture}
+"""
+
+def test_simple_axis_is_ok():
+    report = analyze(CLEAN_AXIS)
+
+    assert report["verdict"] == "ok"
+    assert report["points"] == 50
+    assert report["plots"][0]["domain_width"] == 10
+    assert report["nodes"] == 1
+
+def test_addplot3_is_one_token():
+    assert tokenize(r"\addplot3[surf] {x*y};")[:2] == ["\\addplot3", "["]
+
+def test_addplot3_multiplies_samples_by_samples_y():
+    report = analyze(r"\begin{axis}[samples=100, clip=false]\addplot3[surf] {x*y};\end{axis}")
+
+    assert report["points"] == 100 * 100
+    assert report["verdict"] == "reject"
+    assert any("over the limit" in v for v in report["violations"])
+
+def test_addplot3_reads_its_own_options():
+    report = analyze(r"\begin{axis}[samples=100, clip=false]\addplot3[surf, samples y=10] {x*y};\end{axis}")
+
+    assert report["points"] == 100 * 10
+    assert report["cost"] < MAX_COST
+
+def test_addplot_defaults_to_pgfplots_samples():
+    report = analyze(r"\begin{axis}[clip=false]\addplot {x^2};\end{axis}")
+
+    assert report["points"] == DEFAULT_SAMPLES
+
+def test_nested_foreach_multiplies_and_warns():
+    code = r"\foreach \x in {1,...,10} { \foreach \y in {0,0.5,...,2} { \node at (\x,\y) {a}; } }"
+    report = analyze(code)
+
+    assert report["max_foreach_depth"] == 2
+    assert report["foreach_iterations"] == 10 + 10 * 5
+    assert report["nodes"] == 50
+    assert any("Nested \\foreach" in w for w in report["warnings"])
+    assert report["verdict"] == "flag"
+
+def test_list_length_ranges():
+    assert list_length("1,2,3") == 3
+    assert list_length("1,...,10") == 10
+    assert list_length("0,0.5,...,2") == 5
+    assert list_length("10,...,1") == 10
+    assert list_length("a,...,e") == 5
+    assert list_length("0,...,4,7") == 6
+
+def test_list_length_rejects_non_arithmetic():
+    # Anything but plain arithmetic (here a power that would hang eval) is a guess, not evaluated.
+    assert list_length("1,...,9**9**9") == UNKNOWN_ITERATIONS
+
+def test_curved_fill_with_cycle_is_rejected():
+    report = analyze(r"\fill[blue] (0,0) .. controls (1,1) .. (2,0) -- cycle;")
+
+    assert report["verdict"] == "reject"
+    assert report["curved_fills"] == 1
+
+def test_filled_circle_is_not_a_curved_fill():
+    report = analyze(r"\fill[red] (0,0) circle (1);")
+
+    assert report["curved_fills"] == 0
+    assert report["verdict"] == "ok"
+
+def test_opacity_is_rejected():
+    for code in (r"\draw[fill opacity=0.3] (0,0) rectangle (1,1);",
+                 r"\begin{scope}[opacity=0.5] \draw (0,0) -- (1,1); \end{scope}"):
+        report = analyze(code)
+        assert report["verdict"] == "reject"
+        assert report["opacity"] == 1
+
+def test_preamble_is_rejected():
+    report = analyze("\\documentclass{article}\n\\usepackage{tikz}\n\\begin{document}\\end{document}")
+
+    assert report["verdict"] == "reject"
+    assert len(report["violations"]) == 3
+
+def test_comments_are_ignored():
+    report = analyze("% \\fill[opacity=0.5] (0,0) .. controls (1,1) .. (2,0) -- cycle;\n\\draw (0,0) -- (1,1);")
+
+    assert report["verdict"] == "ok"
@@ -0,0 +1,48 @@
+import time
+from diagram_cache import DiagramCache, diagram_key
+
+def fill(cache, entries):
+    """entries: (section_id, model, prompt_version); returns their keys."""
+    keys = []
+    for section_id, model, version in entries:
+        key = diagram_key(model, version, section_id, "content", "topic")
+        cache.put(key, section_id, model, version, f"\\draw ({section_id});")
+        keys.append(key)
+    return keys
+
+def remaining(cache):
+    return sorted(row[0] for row in cache._conn.execute("SELECT section_id FROM diagrams"))
+
+def test_prune_keeps_listed_versions(tmp_path):
+    with DiagramCache(str(tmp_path / "cache.sqlite3")) as cache:
+        fill(cache, [("1a", "flash", "v3"), ("1b", "flash", "v2"), ("1c", "pro", "v3"), ("1d", "flash", "single-v1")])
+
+        removed = cache.prune(keep=[("flash", "v3"), ("flash", "single-v1")])
+
+        assert removed == 2
+        assert remaining(cache) == ["1a", "1d"]
+
+def test_prune_with_empty_keep_drops_everything(tmp_path):
+    with DiagramCache(str(tmp_path / "cache.sqlite3")) as cache:
+        fill(cache, [("1a", "flash", "v3"), ("1b", "pro", "v1")])
+
+        assert cache.prune(keep=[]) == 2
+        assert remaining(cache) == []
+
+def test_prune_without_keep_leaves_versions_alone(tmp_path):
+    with DiagramCache(str(tmp_path / "cache.sqlite3")) as cache:
+        fill(cache, [("1a", "flash", "v3"), ("1b", "pro", "v1")])
+
+        assert cache.prune() == 0
+        assert remaining(cache) == ["1a", "1b"]
+
+def test_prune_by_age_and_version(tmp_path):
+    with DiagramCache(str(tmp_path / "cache.sqlite3")) as cache:
+        old_key, _, _ = fill(cache, [("1a", "flash", "v3"), ("1b", "flash", "v3"), ("1c", "flash", "v2")])
+        cache._conn.execute("UPDATE diagrams SET last_access = ? WHERE key = ?", (time.time() - 40 * 86400, old_key))
+
+        removed = cache.prune(older_than_seconds=30 * 86400, keep=[("flash", "v3")])
+
+        assert removed == 2
+        assert remaining(cache) == ["1b"]
+        assert cache.get(old_key) is None
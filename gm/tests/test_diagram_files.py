@@ -0,0 +1,59 @@
+import json
+import os
+from diagram_files import (
+    append_diagram_log,
+    diagram_log_path,
+    load_diagrams,
+    pdf_cache_path,
+    read_diagram_log,
+    write_diagrams,
+)
+
+def write_log(path, records, torn=""):
+    with open(path, "w", encoding="utf-8") as log:
+        for section_id, code in records:
+            append_diagram_log(log, section_id, f"key-{section_id}", code)
+        log.write(torn)
+
+def test_log_path_sits_next_to_the_json(tmp_path):
+    assert diagram_log_path(str(tmp_path / "diagrams.json")) == str(tmp_path / "diagrams.jsonl")
+
+def test_read_log_keeps_latest_and_skips_a_torn_line(tmp_path):
+    log_file = str(tmp_path / "diagrams.jsonl")
+    write_log(log_file, [("1a", "old"), ("1b", "b"), ("1a", "new")], torn='{"section_id": "1c", "co')
+
+    records = read_diagram_log(log_file)
+
+    assert {s: r["code"] for s, r in records.items()} == {"1a": "new", "1b": "b"}
+    assert load_diagrams(log_file) == {"1a": "new", "1b": "b"}
+
+def test_load_overlays_a_leftover_log(tmp_path):
+    diagrams_file = str(tmp_path / "diagrams.json")
+    with open(diagrams_file, "w", encoding="utf-8") as f:
+        json.dump({"1a": "a", "1b": "stale"}, f)
+    write_log(diagram_log_path(diagrams_file), [("1b", "fresh"), ("2a", "c")])
+
+    assert load_diagrams(diagrams_file) == {"1a": "a", "1b": "fresh", "2a": "c"}
+
+def test_load_from_log_alone(tmp_path):
+    diagrams_file = str(tmp_path / "diagrams.json")
+    write_log(diagram_log_path(diagrams_file), [("1a", "a")])
+
+    assert load_diagrams(diagrams_file) == {"1a": "a"}
+
+def test_write_compacts_away_the_log(tmp_path):
+    diagrams_file = str(tmp_path / "diagrams.json")
+    write_log(diagram_log_path(diagrams_file), [("1a", "unvalidated")])
+
+    write_diagrams({"1a": ""}, diagrams_file)
+
+    assert not os.path.exists(diagram_log_path(diagrams_file))
+    assert not os.path.exists(diagrams_file + ".tmp")
+    assert load_diagrams(diagrams_file) == {"1a": ""}
+
+def test_pdf_cache_path_is_content_addressed(tmp_path):
+    code = r"\begin{tikzpicture}\draw (0,0) -- (1,1);\end{tikzpicture}"
+
+    assert pdf_cache_path(code, "pdfs") == pdf_cache_path(code, "pdfs")
+    assert pdf_cache_path(code, "pdfs") != pdf_cache_path(code + " ", "pdfs")
+    assert os.path.dirname(pdf_cache_path(code, "pdfs")) == "pdfs"
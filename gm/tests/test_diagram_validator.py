@@ -0,0 +1,39 @@
+import asyncio
+from diagram_validator import validate_diagrams
+
+class RecordingClient:
+    """Stands in for DiagramClient: hands out `codes` in turn and records what it forgets."""
+
+    def __init__(self, *codes):
+        self.codes = list(codes)
+        self.forgotten = []
+
+    async def generate(self, section_id, section_content, topic_description, refresh=None):
+        return self.codes.pop(0)
+
+    def forget(self, section_id, section_content, topic_description):
+        self.forgotten.append(section_id)
+
+def validate(diagrams, client, rounds=2):
+    # `false` exits with an error like a pdflatex run that fails.
+    return asyncio.run(validate_diagrams(diagrams, {}, {}, client=client, rounds=rounds, pdflatex="false"))
+
+def test_empty_regeneration_is_dropped_and_forgotten():
+    client = RecordingClient("", "")
+
+    diagrams, report = validate({"1a": "\\draw (0,0) -- (1,1);"}, client)
+
+    assert diagrams == {"1a": ""}
+    assert report["1a"]["dropped"] is True
+    assert [a["status"] for a in report["1a"]["attempts"]] == ["failed", "empty", "empty"]
+    assert client.forgotten == ["1a"]
+
+def test_section_without_a_diagram_is_left_alone():
+    client = RecordingClient()
+
+    diagrams, report = validate({"1a": ""}, client)
+
+    assert diagrams == {"1a": ""}
+    assert report["1a"]["status"] == "empty"
+    assert "dropped" not in report["1a"]
+    assert client.forgotten == []
@@ -0,0 +1,19 @@
+import json
+from md_to_latex_converter import replace_diagram_markers
+
+LATEX = "Before\n%%DIAGRAM_MARKER_1a%%\nMiddle\n%%DIAGRAM_MARKER_1b%%\nAfter"
+
+def test_markers_are_read_from_the_given_diagrams_file(tmp_path):
+    diagrams_file = tmp_path / "course_diagrams.json"
+    diagrams_file.write_text(json.dumps({"1a": "\\draw (0,0) -- (1,1);", "1b": ""}), encoding="utf-8")
+
+    latex = replace_diagram_markers(LATEX, tex_dir=str(tmp_path), pdf_dir=str(tmp_path / "pdfs"),
+                                    diagrams_file=str(diagrams_file))
+
+    assert "\\draw (0,0) -- (1,1);" in latex
+    assert "%%DIAGRAM_MARKER" not in latex
+
+def test_missing_diagrams_file_leaves_the_markers(tmp_path):
+    latex = replace_diagram_markers(LATEX, diagrams_file=str(tmp_path / "missing.json"))
+
+    assert latex == LATEX
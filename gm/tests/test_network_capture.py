@@ -0,0 +1,60 @@
+import json
+import os
+from network_capture import XSSI_PREFIX, NetworkCapture, agrees_with_dom, parse_batchexecute, parse_stream_body
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "..", "..", "benchmarks", "fixtures", "generate_free_form_streamed.txt")
+QUESTION = "Continue with section 1a."
+
+def load_fixture():
+    with open(FIXTURE, "r", encoding="utf-8") as f:
+        return f.read()
+
+def wrb(payload):
+    return json.dumps([["wrb.fr", None, json.dumps(payload)]])
+
+def test_answer_comes_from_the_last_answer_field():
+    answer = parse_stream_body(load_fixture(), QUESTION)
+
+    assert answer.startswith("**Energy signals** have finite total energy $E_\\infty")
+    assert answer.endswith("* A signal cannot be both.")
+
+def test_source_passages_are_not_taken_for_the_answer():
+    # The cited slide text in the last chunk is longer than the answer itself.
+    answer = parse_batchexecute(load_fixture(), QUESTION)
+
+    assert "Lecture M1, slide 14" not in answer
+
+def test_unrecognized_structure_returns_empty():
+    body = XSSI_PREFIX + "\n\n" + json.dumps([["wrb.fr", None, json.dumps({"text": "A long string " * 20})]])
+
+    assert parse_batchexecute(body, QUESTION) == ""
+
+def test_only_wrb_envelopes_count():
+    body = XSSI_PREFIX + "\n\n" + json.dumps([["di", 12], ["af.httprm", 11, "A long string " * 20, 3]])
+
+    assert parse_batchexecute(body, QUESTION) == ""
+
+def test_echoed_question_is_not_an_answer():
+    body = XSSI_PREFIX + "\n\n" + wrb([[QUESTION, None, None]])
+
+    assert parse_batchexecute(body, QUESTION) == ""
+
+def test_ndjson_stream_still_parses():
+    body = "\n".join(json.dumps({"text": part}) for part in ("<p>Energy ", "signals</p>"))
+
+    assert parse_stream_body(body, QUESTION) == "Energy signals"
+
+def test_answer_must_agree_with_the_rendered_text():
+    answer = parse_stream_body(load_fixture(), QUESTION)
+    rendered = answer.replace("**", "").replace("$", "")
+
+    assert agrees_with_dom(answer, rendered)
+    assert not agrees_with_dom("c_5f1e0a7b9d2c4e8f", rendered)
+    assert not agrees_with_dom(answer, "")
+
+def test_capture_records_raw_bodies(tmp_path):
+    capture = NetworkCapture(record_dir=str(tmp_path / "captures"))
+
+    capture.parse(load_fixture().encode("utf-8"), QUESTION)
+
+    assert (tmp_path / "captures" / "capture-001.txt").read_text(encoding="utf-8") == load_fixture()
@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from notebook_automator import BrowserUnavailableError, NotebookSession, PersistentBrowser, ResponseTimeoutError
+from scraper_metrics import ScraperMetrics
+
+class FailingPage:
+    url = "https://accounts.google.com/signin"
+
+    async def goto(self, url):
+        raise TimeoutError("navigation timed out")
+
+class RecordingContext:
+    def __init__(self):
+        self.pages = [FailingPage()]
+        self.closed = False
+
+    def on(self, event, handler):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+class RecordingChromium:
+    def __init__(self):
+        self.contexts = []
+
+    async def launch_persistent_context(self, profile_dir, **options):
+        self.contexts.append(RecordingContext())
+        return self.contexts[-1]
+
+class RecordingPlaywright:
+    def __init__(self):
+        self.chromium = RecordingChromium()
+
+def test_failed_warm_up_is_not_reused():
+    browser = PersistentBrowser(profile_dir="profile")
+    browser._playwright = RecordingPlaywright()
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(BrowserUnavailableError, match="accounts.google.com"):
+                await browser.get_context()
+
+    asyncio.run(run())
+
+    contexts = browser._playwright.chromium.contexts
+    assert len(contexts) == 2
+    assert all(context.closed for context in contexts)
+    assert browser._context is None
+
+def test_chat_preparation_errors_are_attributed_to_prepare(tmp_path):
+    metrics = ScraperMetrics(str(tmp_path / "metrics.jsonl"))
+    session = NotebookSession(metrics=metrics, rotate_every=1, new_chat_selectors=("button.clear-chat",))
+    session._entered = True
+    session._questions_in_chat = 1
+
+    async def connected():
+        pass
+
+    async def stuck_clear():
+        raise PlaywrightTimeoutError("clear-chat button not found")
+
+    session.connect = connected
+    session._is_connected = lambda: True
+    session.start_new_chat = stuck_clear
+    with pytest.raises(ResponseTimeoutError, match="during prepare"):
+        asyncio.run(session.ask("Continue with section 1a."))
+
+    record = metrics.history[-1]
+    assert record["failed_phase"] == "prepare"
+    assert "prepare" in record["phases"]
@@ -0,0 +1,15 @@
+import asyncio
+import pytest
+import pipeline_orchestrator
+from pipeline_orchestrator import run_pipeline
+
+def test_compile_budget_without_pdflatex_fails_before_scraping(monkeypatch):
+    monkeypatch.setattr(pipeline_orchestrator.shutil, "which", lambda name: None)
+
+    def scrape(**kwargs):
+        raise AssertionError("scraped without pdflatex")
+
+    monkeypatch.setattr(pipeline_orchestrator, "generate_study_guide", scrape)
+    for options in ({"compile_budget": 20.0}, {"externalize": True}):
+        with pytest.raises(FileNotFoundError, match="pdflatex"):
+            asyncio.run(run_pipeline(topics_file="missing_topics.md", **options))
@@ -0,0 +1,49 @@
+import asyncio
+from resource_blocker import ResourceBlocker
+
+class RecordingSession:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, method, params=None):
+        self.sent.append((method, params))
+
+def paused(resource_type, url, request_id="1"):
+    return {"requestId": request_id, "resourceType": resource_type, "request": {"url": url}}
+
+def test_patterns_cover_only_the_deny_rules():
+    blocker = ResourceBlocker(blocked_types=("image", "font"), blocked_domains=("doubleclick.net",))
+
+    assert blocker.fetch_patterns() == [
+        {"urlPattern": "*", "resourceType": "Font"},
+        {"urlPattern": "*", "resourceType": "Image"},
+        {"urlPattern": "*://doubleclick.net/*"},
+        {"urlPattern": "*://*.doubleclick.net/*"},
+    ]
+    assert not any(p.get("resourceType") in ("Script", "Stylesheet", "Document") for p in blocker.fetch_patterns())
+
+def test_no_rules_no_patterns():
+    assert ResourceBlocker(blocked_types=(), blocked_domains=()).fetch_patterns() == []
+
+def test_paused_requests_are_blocked_or_continued():
+    blocker = ResourceBlocker()
+    session = RecordingSession()
+
+    async def run():
+        await blocker._on_request_paused(session, paused("Image", "https://cdn.example.com/a.png", "1"))
+        await blocker._on_request_paused(session, paused("Image", "https://notebooklm.google.com/logo.png", "2"))
+        await blocker._on_request_paused(session, paused("Script", "https://www.google-analytics.com/ga.js", "3"))
+        # Matched a domain pattern through its query string only.
+        await blocker._on_request_paused(session, paused("XHR", "https://example.com/?next=https://a.doubleclick.net/", "4"))
+
+    asyncio.run(run())
+
+    assert session.sent == [
+        ("Fetch.failRequest", {"requestId": "1", "errorReason": "BlockedByClient"}),
+        ("Fetch.continueRequest", {"requestId": "2"}),
+        ("Fetch.failRequest", {"requestId": "3", "errorReason": "BlockedByClient"}),
+        ("Fetch.continueRequest", {"requestId": "4"}),
+    ]
+    assert blocker.blocked_requests == 2
+    assert blocker.allowed_requests == 2
+    assert blocker.blocked_by_reason == {"type:image": 1, "domain:www.google-analytics.com": 1}
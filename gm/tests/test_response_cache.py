@@ -0,0 +1,35 @@
+from response_cache import ResponseCache
+
+URL = "https://notebooklm.google.com/notebook/test"
+
+def test_put_then_get(tmp_path):
+    with ResponseCache(str(tmp_path / "cache.sqlite3")) as cache:
+        cache.put(URL, "prompt", "v1", "answer")
+
+        assert cache.get(URL, "prompt", "v1") == "answer"
+        assert cache.get(URL, "prompt", "v2") is None
+
+def test_zero_ttl_stores_nothing(tmp_path):
+    with ResponseCache(str(tmp_path / "cache.sqlite3")) as cache:
+        cache.put(URL, "prompt", "v1", "answer", ttl_seconds=0)
+
+        assert cache.get(URL, "prompt", "v1") is None
+
+    with ResponseCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=0) as cache:
+        cache.put(URL, "prompt", "v1", "answer")
+
+        assert cache.get(URL, "prompt", "v1") is None
+
+def test_expired_entries_are_misses(tmp_path):
+    with ResponseCache(str(tmp_path / "cache.sqlite3")) as cache:
+        cache.put(URL, "prompt", "v1", "answer", ttl_seconds=1e-9)
+
+        assert cache.get(URL, "prompt", "v1") is None
+
+def test_no_ttl_never_expires(tmp_path):
+    with ResponseCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=None) as cache:
+        cache.put(URL, "prompt", "v1", "answer")
+
+        row = cache._conn.execute("SELECT expires_at FROM responses").fetchone()
+        assert row == (None,)
+        assert cache.get(URL, "prompt", "v1") == "answer"
@@ -0,0 +1,96 @@
+import json
+import os
+from gm.section_index import INDEX_SUFFIX, STUDY_GUIDE_PREFIX, SectionIndex
+
+STUDY_GUIDE = """# ECE 301 Quiz 1 Study Guide
+
+## Section 1a
+
+Energy and power signals ü.
+
+## Details inside the answer
+More of 1a.
+
+%%DIAGRAM_MARKER_1a%%
+
+
+
+---
+
+## Section 1b
+
+Even and odd signals.
+
+%%DIAGRAM_MARKER_1b%%
+
+
+
+---
+
+"""
+
+def write_guide(tmp_path, content=STUDY_GUIDE):
+    guide = tmp_path / "final_study_guide.md"
+    guide.write_text(content, encoding="utf-8")
+    return str(guide)
+
+def test_read_section_by_id_and_heading(tmp_path):
+    index = SectionIndex.load(write_guide(tmp_path), STUDY_GUIDE_PREFIX)
+
+    assert index.ids() == ["1a", "1b"]
+    assert index.read("1b") == "Even and odd signals.\n\n%%DIAGRAM_MARKER_1b%%\n\n\n\n---"
+    assert index.read("Section 1b", strip_markers=True).startswith("Even and odd signals.\n\n\n")
+    assert index.read("2a") is None
+
+def test_answer_headings_stay_inside_their_section(tmp_path):
+    index = SectionIndex.load(write_guide(tmp_path), STUDY_GUIDE_PREFIX)
+
+    body = index.read("1a", strip_markers=True)
+    assert "## Details inside the answer\nMore of 1a." in body
+    assert "%%DIAGRAM_MARKER" not in body
+
+def test_marker_offsets_and_hashes(tmp_path):
+    path = write_guide(tmp_path)
+    index = SectionIndex.load(path, STUDY_GUIDE_PREFIX)
+    data = open(path, "rb").read()
+
+    for entry in index.sections:
+        marker = f"%%DIAGRAM_MARKER_{entry['id']}%%".encode("utf-8")
+        assert data[entry["marker"]:entry["marker"] + len(marker)] == marker
+        assert entry["start"] < entry["marker"] < entry["end"]
+    assert index.sections[0]["sha256"] != index.sections[1]["sha256"]
+
+def test_sidecar_reused_until_file_changes(tmp_path):
+    path = write_guide(tmp_path)
+    SectionIndex.load(path, STUDY_GUIDE_PREFIX)
+    sidecar = path + INDEX_SUFFIX
+    assert os.path.exists(sidecar)
+
+    # An untouched file is served from the sidecar, even if it says something else.
+    with open(sidecar, "r", encoding="utf-8") as f:
+        cached = json.load(f)
+    cached["sections"][0]["id"] = "from-sidecar"
+    with open(sidecar, "w", encoding="utf-8") as f:
+        json.dump(cached, f)
+    assert SectionIndex.load(path, STUDY_GUIDE_PREFIX).ids() == ["from-sidecar", "1b"]
+
+    # Any change in size or mtime forces a reparse.
+    write_guide(tmp_path, STUDY_GUIDE + "## Section 1c\n\nNew.\n")
+    assert SectionIndex.load(path, STUDY_GUIDE_PREFIX).ids() == ["1a", "1b", "1c"]
+
+def test_read_all_matches_read(tmp_path):
+    index = SectionIndex.load(write_guide(tmp_path), STUDY_GUIDE_PREFIX)
+
+    sections = index.read_all(strip_markers=True)
+    assert list(sections) == ["1a", "1b"]
+    assert all(sections[section_id] == index.read(section_id, strip_markers=True) for section_id in sections)
+
+def test_title_for():
+    index = SectionIndex.from_bytes(b"## Preface\nx\n\n# Chapter One\n\n## Intro\nText\n\n## Outro\n# Chapter Two\n")
+
+    # Same rule as the old line scan: the last H1 seen before the section ends.
+    assert index.title_for("Preface") == "Chapter One"
+    assert index.title_for("Intro") == "Chapter One"
+    assert index.title_for("Outro") == "Chapter Two"
+    assert index.title_for("Missing") == "Chapter Two"
+    assert SectionIndex.from_bytes(b"## Only\nx\n").title_for("Only") is None
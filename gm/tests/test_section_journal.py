@@ -0,0 +1,62 @@
+from section_journal import SectionJournal
+from study_guide_generator import format_section, parse_section_block
+
+def write_guide(tmp_path, sections):
+    """Writes a guide and its journal the way generate_study_guide does; returns their paths."""
+    output_file = str(tmp_path / "guide.md")
+    journal = SectionJournal(str(tmp_path / "guide.journal.jsonl"))
+    journal.reset()
+    with open(output_file, "wb") as f:
+        f.write(b"# Guide\n\n")
+        for section_id, response_md in sections:
+            block = format_section(section_id, response_md).encode("utf-8")
+            journal.record(section_id, f"hash-{section_id}", f.tell(), block)
+            f.write(block)
+    return output_file, journal
+
+def test_recover_returns_intact_blocks(tmp_path):
+    output_file, journal = write_guide(tmp_path, [("1a", "Alpha"), ("1b", "Beta")])
+
+    blocks = journal.recover(output_file, {"1a": "hash-1a", "1b": "hash-1b"})
+
+    assert {s: parse_section_block(s, b.decode("utf-8")) for s, b in blocks.items()} == {"1a": "Alpha", "1b": "Beta"}
+
+def test_recover_skips_changed_prompts(tmp_path):
+    output_file, journal = write_guide(tmp_path, [("1a", "Alpha"), ("1b", "Beta")])
+
+    assert list(journal.recover(output_file, {"1a": "hash-1a", "1b": "edited"})) == ["1a"]
+
+def test_recover_skips_a_tampered_block(tmp_path):
+    output_file, journal = write_guide(tmp_path, [("1a", "Alpha"), ("1b", "Beta")])
+    with open(output_file, "r+b") as f:
+        data = f.read()
+        f.seek(data.index(b"Beta"))
+        f.write(b"Bent")
+
+    assert list(journal.recover(output_file, {"1a": "hash-1a", "1b": "hash-1b"})) == ["1a"]
+
+def test_recover_skips_a_truncated_file_and_a_torn_line(tmp_path):
+    output_file, journal = write_guide(tmp_path, [("1a", "Alpha"), ("1b", "Beta")])
+    with open(output_file, "r+b") as f:
+        f.truncate(len(f.read()) - 5)
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"id": "1c", "prompt_ha')
+
+    assert list(journal.recover(output_file, {"1a": "hash-1a", "1b": "hash-1b", "1c": "hash-1c"})) == ["1a"]
+
+def test_recover_without_an_output_file(tmp_path):
+    _, journal = write_guide(tmp_path, [("1a", "Alpha")])
+
+    assert journal.recover(str(tmp_path / "missing.md"), {"1a": "hash-1a"}) == {}
+
+def test_parse_section_block_round_trips():
+    assert parse_section_block("1a", format_section("1a", "Body\n\nwith $x$")) == "Body\n\nwith $x$"
+    assert parse_section_block("1a", format_section("1a", "")) == ""
+
+def test_parse_section_block_rejects_tampered_blocks():
+    block = format_section("1a", "Alpha")
+
+    assert parse_section_block("1b", block) is None
+    assert parse_section_block("1a", block.replace("## Section", "## Part")) is None
+    assert parse_section_block("1a", block.replace("%%DIAGRAM_MARKER_1a%%", "")) is None
+    assert parse_section_block("1a", block[:-3]) is None
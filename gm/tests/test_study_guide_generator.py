@@ -0,0 +1,126 @@
+import asyncio
+import pytest
+import study_guide_generator
+from response_cache import cache_key
+from section_journal import SectionJournal
+from study_guide_generator import (
+    BATCH_DELTA_TEMPLATE,
+    BATCH_END,
+    NOTEBOOK_URL,
+    PROMPT_INSTRUCTIONS,
+    PROMPT_TEMPLATE,
+    PROMPT_TEMPLATE_VERSION,
+    MAX_BATCH_SECTIONS,
+    batch_prompt,
+    companion_paths,
+    format_section,
+    generate_study_guide,
+    parse_topics,
+    plan_batches,
+    section_prompt,
+    split_batched_response,
+)
+
+TOPIC = {'id': '1a', 'title': '1. Signals\n\n(a) Energy and power'}
+LATEX_INSTRUCTIONS = "\nWrite every fraction as $\\frac{a}{b}$ and sets as {x | x > 0}.\n"
+
+def test_default_section_prompt_is_the_template():
+    assert section_prompt(TOPIC) == PROMPT_TEMPLATE.format(X='1a', Y=TOPIC['title'])
+    assert section_prompt(TOPIC, primed=True) == section_prompt(TOPIC)[len(PROMPT_INSTRUCTIONS):]
+
+def test_instructions_with_braces_are_kept_verbatim():
+    prompt = section_prompt(TOPIC, instructions=LATEX_INSTRUCTIONS)
+
+    assert prompt.startswith(LATEX_INSTRUCTIONS)
+    assert "Continue with section 1a." in prompt
+
+def test_batch_prompt_with_brace_instructions():
+    prompt = batch_prompt([TOPIC, {'id': '1b', 'title': '(b) Even and odd'}], instructions=LATEX_INSTRUCTIONS)
+
+    assert prompt.startswith(LATEX_INSTRUCTIONS)
+    assert "Continue with sections 1a, 1b." in prompt
+    assert prompt.endswith(BATCH_DELTA_TEMPLATE.format(
+        X="1a, 1b", example="@@SECTION 1a@@", end=BATCH_END,
+        Y="@@SECTION 1a@@\n" + TOPIC['title'] + "\n\n@@SECTION 1b@@\n(b) Even and odd"))
+
+def short_topics(count, length=100):
+    return [{'id': f"1{chr(ord('a') + i)}", 'title': "x" * length} for i in range(count)]
+
+def test_plan_batches_caps_the_number_of_sections():
+    batches = plan_batches(short_topics(12), 4000)
+
+    assert [i for batch in batches for i in batch] == list(range(12))
+    assert {len(batch) for batch in batches[:-1]} == {MAX_BATCH_SECTIONS}
+    assert plan_batches(short_topics(5), 4000, max_sections=2) == [[0, 1], [2, 3], [4]]
+
+def test_plan_batches_budgets_section_text_only():
+    # Three 100-character titles fit in 300 however long the shared instructions are.
+    assert plan_batches(short_topics(4), 300) == [[0, 1, 2], [3]]
+    assert plan_batches(short_topics(3, length=500), 300) == [[0], [1], [2]]
+
+def test_plan_batches_off():
+    assert plan_batches(short_topics(3), 0) == [[0], [1], [2]]
+    assert plan_batches([], 4000) == []
+
+BODY = "Energy is the integral of |x(t)|^2 over all time; power is its time average."
+
+def batched(*parts, before="", end=BATCH_END + "\n"):
+    return before + "".join(f"@@SECTION {section_id}@@\n{body}\n\n" for section_id, body in parts) + end
+
+def test_split_batched_response():
+    response_md = batched(("1a", BODY), ("1b", BODY + " Even."), before="\n  \n")
+
+    assert split_batched_response(response_md, ["1a", "1b"]) == [BODY, BODY + " Even."]
+
+def test_split_accepts_decorated_delimiters():
+    response_md = f"**@@SECTION 1a@@**\n{BODY}\n\n\\@@SECTION 1b@@\n{BODY}\n\n**@@END@@**"
+
+    assert split_batched_response(response_md, ["1a", "1b"]) == [BODY, BODY]
+
+def test_split_rejects_missing_or_reordered_delimiters():
+    assert split_batched_response(batched(("1a", BODY)), ["1a", "1b"]) is None
+    assert split_batched_response(batched(("1b", BODY), ("1a", BODY)), ["1a", "1b"]) is None
+    assert split_batched_response(batched(("1a", BODY), ("1a", BODY)), ["1a"]) is None
+
+def test_split_rejects_an_empty_body():
+    assert split_batched_response(batched(("1a", ""), ("1b", BODY)), ["1a", "1b"]) is None
+
+def test_split_rejects_text_before_the_first_delimiter():
+    response_md = batched(("1a", BODY), ("1b", BODY), before="Energy signals have finite energy.\n")
+
+    assert split_batched_response(response_md, ["1a", "1b"]) is None
+
+def test_split_rejects_an_answer_without_its_end_marker():
+    assert split_batched_response(batched(("1a", BODY), ("1b", "Ener"), end=""), ["1a", "1b"]) is None
+    assert split_batched_response(batched(("1a", BODY), ("1b", BODY), end=BATCH_END + "\nMore"), ["1a", "1b"]) is None
+
+def test_split_keeps_a_short_last_section():
+    summary = "| Signal | Energy |"
+
+    assert split_batched_response(batched(("1a", BODY * 20), ("1b", summary)), ["1a", "1b"]) == [BODY * 20, summary]
+
+def test_resume_keeps_the_guide_when_startup_fails(tmp_path, monkeypatch):
+    topics_file = tmp_path / "topics.md"
+    topics_file.write_text("1. Signals\n(a) Energy\n(b) Power\n", encoding="utf-8")
+    output_file = str(tmp_path / "guide.md")
+    topics = parse_topics(str(topics_file))
+    journal_path, _ = companion_paths(output_file)
+    journal = SectionJournal(journal_path)
+    journal.reset()
+    with open(output_file, "wb") as f:
+        f.write(b"# Guide\n\n")
+        block = format_section("1a", "Energy notes").encode("utf-8")
+        prompt_hash = cache_key(NOTEBOOK_URL, section_prompt(topics[0]), PROMPT_TEMPLATE_VERSION)
+        journal.record("1a", prompt_hash, f.tell(), block)
+        f.write(block)
+
+    def broken_cache(*args, **kwargs):
+        raise OSError("database is locked")
+
+    monkeypatch.setattr(study_guide_generator, "ResponseCache", broken_cache)
+    with pytest.raises(OSError):
+        asyncio.run(generate_study_guide(resume=True, topics_file=str(topics_file), output_file=output_file,
+                                         title="Guide"))
+
+    assert "Energy notes" in open(output_file, encoding="utf-8").read()
+    assert list(journal.recover(output_file, {"1a": prompt_hash})) == ["1a"]
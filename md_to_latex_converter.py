@@ -4,7 +4,7 @@ import time
 import google.generativeai as genai
 from dotenv import load_dotenv
 import unicodedata
-import json
+from diagram_files import DIAGRAMS_FILE, PDF_CACHE_DIR, load_diagrams, pdf_cache_path
 
 load_dotenv()
 
@@ -250,10 +250,15 @@ def clean_and_chunk_markdown(markdown_text: str) -> list:
     # Filter out any empty strings that may result from the split
     return [chunk.strip() for chunk in chunks if chunk.strip()]
 
-def post_process_latex(latex_content: str) -> str:
+def assemble_latex(latex_parts: list) -> str:
+    """Stitches the converted chunks, in order, between the header and footer."""
+    return LATEX_HEADER + "\n\n" + "\n\n".join(latex_parts) + "\n\n" + LATEX_FOOTER
+
+def post_process_latex(latex_content: str, tex_dir=None, diagrams_file=DIAGRAMS_FILE) -> str:
     """
     Applies a series of final cleaning rules to the generated LaTeX document.
     This is a modular function you can easily add new rules to.
+    tex_dir is the directory the document is compiled from (see replace_diagram_markers).
     """
     print("Applying post-processing cleaning rules...")
 
@@ -306,21 +311,33 @@ def post_process_latex(latex_content: str) -> str:
     latex_content = re.sub(r'((\d+\\\. .*(\n|$))+)', fix_enumerate, latex_content)
 
     # Add the diagram replacement step at the end
-    latex_content = replace_diagram_markers(latex_content)
+    latex_content = replace_diagram_markers(latex_content, tex_dir, diagrams_file=diagrams_file)
 
     print("Cleaning complete.")
     return latex_content
-def replace_diagram_markers(latex_content):
+def replace_diagram_markers(latex_content, tex_dir=None, pdf_dir=PDF_CACHE_DIR, diagrams_file=DIAGRAMS_FILE):
+    """
+    Puts each diagram from diagrams_file (or from the JSONL log of a diagram
+    run that didn't finish, see load_diagrams) in place of its marker. A diagram
+    pre-rendered by diagram_externalizer.py is included as its PDF, so the
+    document build doesn't compile it again; any other diagram goes in as
+    inline TikZ. PDF paths are relative to tex_dir (default: CLEAN's folder).
+    """
+    if tex_dir is None:
+        tex_dir = os.path.dirname(CLEAN)
     try:
-        with open('diagrams.json', 'r', encoding='utf-8') as f:
-            diagrams = json.load(f)
+        diagrams = load_diagrams(diagrams_file)
     except FileNotFoundError:
-        print("diagrams.json not found. No diagrams will be inserted.")
+        print(f"{diagrams_file} not found. No diagrams will be inserted.")
         return latex_content
 
     for section_id, diagram_code in diagrams.items():
         marker = f"%%DIAGRAM_MARKER_{section_id}%%"
         if diagram_code:
+            pdf_path = pdf_cache_path(diagram_code, pdf_dir)
+            if os.path.exists(pdf_path):
+                relative_path = os.path.relpath(pdf_path, tex_dir or ".").replace(os.sep, "/")
+                diagram_code = f"\\includegraphics{{{relative_path}}}"
             # You might want to wrap the diagram in a figure environment
             replacement = (
                 "\\begin{figure}[h!]\n"
@@ -588,7 +605,7 @@ def main():
                 print(f"✓ Chunk {chunk_num} converted successfully.")
 
             # Assemble the document
-            final_latex = LATEX_HEADER + "\n\n" + "\n\n".join(full_latex_output) + "\n\n" + LATEX_FOOTER
+            final_latex = assemble_latex(full_latex_output)
 
             with open(OUTPUT, 'w', encoding='utf-8') as f:
                 f.write(final_latex)
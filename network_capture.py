@@ -0,0 +1,136 @@
+import json
+import os
+from response_extractor import extract_response, fix_mojibake
+
+# --- Configuration ---
+# URL fragment of the request that streams NotebookLM's answer (an RPC over a
+# chunked HTTP POST). The local stand-in page streams from /api/answer instead.
+NOTEBOOKLM_STREAM_PATTERN = "GenerateFreeFormStreamed"
+XSSI_PREFIX = ")]}'"
+WRB_ENVELOPE = "wrb.fr"
+# Where GenerateFreeFormStreamed puts the answer in each envelope's payload:
+# payload[0][0], the Markdown so far (payload[0][3] holds the cited passages).
+ANSWER_FIELD_PATH = (0, 0)
+# A captured answer is only used when its word count is within this factor of
+# the answer NotebookLM rendered; anything else (a conversation id, a source
+# passage) means ANSWER_FIELD_PATH no longer points at the answer.
+DOM_AGREEMENT_FACTOR = 2.0
+
+
+def _iter_json_values(text):
+    """Yields every top-level JSON array/object embedded in a chunked body."""
+    decoder = json.JSONDecoder()
+    i = 0
+    while i < len(text):
+        if text[i] in "[{":
+            try:
+                value, end = decoder.raw_decode(text, i)
+            except json.JSONDecodeError:
+                i += 1
+                continue
+            yield value
+            i = end
+        else:
+            i += 1
+
+
+def _field(value, path):
+    """value[path[0]][path[1]]..., or None where the nesting doesn't match."""
+    for index in path:
+        if not isinstance(value, list) or index >= len(value):
+            return None
+        value = value[index]
+    return value
+
+
+def parse_ndjson_html(text: str, question: str = "") -> str:
+    """Newline-delimited {"text": <html fragment>} chunks (the local stand-in page)."""
+    html_parts = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            chunk = json.loads(line)
+        except json.JSONDecodeError:
+            return ""
+        if isinstance(chunk, dict) and isinstance(chunk.get("text"), str):
+            html_parts.append(chunk["text"])
+    markdown_content, _ = extract_response("".join(html_parts))
+    return markdown_content
+
+
+def parse_batchexecute(text: str, question: str = "") -> str:
+    """
+    Google batchexecute-style stream: an XSSI prefix followed by length-prefixed
+    JSON chunks. Each answer chunk is a ["wrb.fr", null, <payload>] envelope
+    whose payload (a JSON string) holds the answer so far at ANSWER_FIELD_PATH;
+    the last one is the whole answer. Anything else in the stream (source
+    passages, citation snippets, the "di"/"af.httprm" trailer) is ignored.
+    Returns "" when no chunk has that shape, so the caller falls back to the DOM.
+    """
+    text = text.lstrip()
+    if text.startswith(XSSI_PREFIX):
+        text = text[len(XSSI_PREFIX):]
+    question = question.strip()
+    answer = ""
+    for value in _iter_json_values(text):
+        envelopes = value if isinstance(value, list) else []
+        for envelope in envelopes:
+            if not (isinstance(envelope, list) and len(envelope) >= 3 and envelope[0] == WRB_ENVELOPE):
+                continue
+            try:
+                payload = json.loads(envelope[2])
+            except (TypeError, json.JSONDecodeError):
+                continue
+            candidate = _field(payload, ANSWER_FIELD_PATH)
+            if isinstance(candidate, str) and candidate.strip() and candidate.strip() != question:
+                answer = candidate
+    return fix_mojibake(answer).strip()
+
+
+def agrees_with_dom(answer: str, dom_text: str, factor: float = DOM_AGREEMENT_FACTOR) -> bool:
+    """Whether a captured answer and the rendered answer's text are about the same length (in words)."""
+    answer_words = len(answer.split())
+    dom_words = len(dom_text.split())
+    if not answer_words or not dom_words:
+        return False
+    return max(answer_words, dom_words) <= factor * min(answer_words, dom_words)
+
+
+def parse_stream_body(text: str, question: str = "") -> str:
+    if text.lstrip().startswith(XSSI_PREFIX):
+        return parse_batchexecute(text, question)
+    return parse_ndjson_html(text, question)
+
+
+class NetworkCapture:
+    """
+    Picks the answer out of the page's own network traffic instead of the DOM.
+
+    matches() selects the streamed answer response for page.expect_response;
+    parse() turns its complete body (available once the stream closes) into
+    Markdown. An empty result means the format was not recognised and the
+    caller should fall back to scraping the DOM; so should a result that
+    doesn't agree with the rendered answer (see agrees_with_dom).
+
+    With record_dir set, every body parsed is also saved there as it came
+    off the wire (capture-NNN.txt), e.g. to refresh the test fixture.
+    """
+
+    def __init__(self, url_pattern: str = NOTEBOOKLM_STREAM_PATTERN, parser=parse_stream_body, record_dir=None):
+        self.url_pattern = url_pattern
+        self.parser = parser
+        self.record_dir = record_dir
+        self._recorded = 0
+
+    def matches(self, response) -> bool:
+        return self.url_pattern in response.url and response.request.method == "POST"
+
+    def parse(self, body: bytes, question: str = "") -> str:
+        if self.record_dir:
+            os.makedirs(self.record_dir, exist_ok=True)
+            self._recorded += 1
+            with open(os.path.join(self.record_dir, f"capture-{self._recorded:03d}.txt"), "wb") as f:
+                f.write(body)
+        return self.parser(body.decode("utf-8", errors="replace"), question)
@@ -1,151 +1,606 @@
 import asyncio
-import re
 from playwright.async_api import async_playwright, expect #type: ignore
-import html2text
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError #type: ignore
+from network_capture import NetworkCapture, agrees_with_dom
+from response_extractor import SERIALIZE_RESPONSE_JS, SKIP_SELECTORS, extract_response, markdown_to_terminal_text
+from resource_blocker import ResourceBlocker
+from scraper_metrics import PhaseTimer, ScraperMetrics
 
 # --- Configuration ---
 NOTEBOOK_URL = "https://notebooklm.google.com/notebook/" 
+CDP_ENDPOINT = "http://localhost:9222"
+# Profile directory for the self-launched browser (launch mode). Log in once with a
+# headed run; later runs, including headless ones, reuse the saved Google session.
+PROFILE_DIR = "chrome_profile"
+WARMUP_TIMEOUT_MS = 60000
 
 # --- DOM Selectors ---
 CHAT_INPUT_SELECTOR = "textarea[placeholder*='Start typing…']"
 RESPONSE_CONTAINER_SELECTOR = "div.to-user-container .message-text-content"
 
-async def query_notebook(question: str) -> str:
+# --- Completion detection ---
+# A response counts as finished once its DOM has not changed for SETTLE_QUIET_MS.
+# SETTLE_MAX_MS caps the wait (it matches the old fixed post-stream sleep).
+SETTLE_QUIET_MS = 1500
+SETTLE_MAX_MS = 15000
+
+
+
+class ScraperError(Exception):
+    """Base class for failures while asking NotebookLM a question."""
+
+
+class BrowserUnavailableError(ScraperError):
+    """Chrome is unreachable, the CDP link dropped, or the NotebookLM tab is gone."""
+
+
+class ResponseTimeoutError(ScraperError):
+    """A page wait (input, new bubble, streaming) ran past its timeout."""
+
+
+class EmptyResponseError(ScraperError):
+    """The response bubble finished but contained no Markdown."""
+
+
+class ChatResetError(ScraperError):
+    """A fresh chat could not be started (no clear-chat click sequence, or the history stayed)."""
+
+
+class PersistentBrowser:
     """
-    Connects to a running Chrome instance, finds the NotebookLM tab,
-    asks a question, and scrapes the response.
+    Chromium launched and owned by the automator (launch mode), as an
+    alternative to attaching to a hand-started Chrome over CDP.
+
+    Uses Playwright's launch_persistent_context on profile_dir so the Google
+    login survives between runs, and can run headless. The browser is started
+    on first use, and that first use also pre-warms the notebook: it navigates
+    the first tab to notebook_url and waits for the chat input, so the first
+    question does not pay the page's cold start. If the browser dies it is
+    relaunched on the next request. Several NotebookSessions can share one.
+    An optional ResourceBlocker is installed on the whole context before warm-up.
     """
-    async with async_playwright() as p:
+
+    def __init__(self, notebook_url: str = NOTEBOOK_URL, profile_dir: str = PROFILE_DIR,
+                 headless: bool = False, channel: str = None, blocker: ResourceBlocker = None):
+        self.notebook_url = notebook_url
+        self.blocker = blocker
+        self.profile_dir = profile_dir
+        self.headless = headless
+        self.channel = channel
+        self._playwright = None
+        self._context = None
+        self._launch_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        self._playwright = await async_playwright().start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        if self._context is not None:
+            try:
+                await self._context.close()
+            except Exception:
+                pass  # Already gone.
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._context = None
+        self._playwright = None
+
+    def _on_context_closed(self, _context):
+        self._context = None
+
+    async def get_context(self):
+        """Returns the running browser context, launching and warming it if needed."""
+        if self._playwright is None:
+            raise RuntimeError("PersistentBrowser must be used as an async context manager.")
+        async with self._launch_lock:
+            if self._context is None:
+                await self._launch()
+            return self._context
+
+    async def _launch(self):
         try:
-            browser = await p.chromium.connect_over_cdp("http://localhost:9222")
-            context = browser.contexts[0]
+            context = await self._playwright.chromium.launch_persistent_context(
+                self.profile_dir, headless=self.headless, channel=self.channel
+            )
         except Exception as e:
-            return f"Error connecting to browser. Is it running with --remote-debugging-port=9222? Details: {e}"
+            raise BrowserUnavailableError(f"Could not launch browser with profile '{self.profile_dir}': {e}") from e
+        print(f"Launched {'headless ' if self.headless else ''}browser with profile '{self.profile_dir}'.")
 
+        # Only a warmed-up context is handed out; one that fails warm-up is closed,
+        # so the next get_context() launches (and warms) a fresh one.
         page = None
-        for p_iter in context.pages:
-            if p_iter.url.startswith(NOTEBOOK_URL):
-                page = p_iter
-                break
-        
-        if not page:
-            return f"Error: No open tab found with a URL starting with '{NOTEBOOK_URL}'"
-        
-        print("Successfully connected to the NotebookLM tab.")
+        try:
+            if self.blocker is not None:
+                await self.blocker.attach(context)
+            page = context.pages[0] if context.pages else await context.new_page()
+            await page.goto(self.notebook_url)
+            await expect(page.locator(CHAT_INPUT_SELECTOR)).to_be_visible(timeout=WARMUP_TIMEOUT_MS)
+        except Exception as e:
+            try:
+                await context.close()
+            except Exception:
+                pass  # Already gone.
+            raise BrowserUnavailableError(
+                f"Notebook did not become ready at {page.url if page else self.notebook_url}. If this is a "
+                f"sign-in page, run once without --headless to log in and save the profile. Details: {e}"
+            ) from e
+        context.on("close", self._on_context_closed)
+        self._context = context
+        print("Notebook page warmed up.")
+
+
+# Runs inside the page: resolves once the node has seen no mutations for quietMs,
+# or after maxMs regardless. Returns {settled, elapsed} so callers can log it.
+WAIT_FOR_QUIESCENCE_JS = """
+(node, [quietMs, maxMs]) => new Promise(resolve => {
+    const start = performance.now();
+    let quietTimer = null;
+    let hardStop = null;
+    const observer = new MutationObserver(() => {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => finish(true), quietMs);
+    });
+    const finish = settled => {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(hardStop);
+        resolve({ settled, elapsed: performance.now() - start });
+    };
+    observer.observe(node, { childList: true, subtree: true, characterData: true });
+    quietTimer = setTimeout(() => finish(true), quietMs);
+    hardStop = setTimeout(() => finish(false), maxMs);
+})
+"""
+
+# --- Long chats ---
+# Click sequence that starts a fresh NotebookLM chat (e.g. open the chat menu, pick
+# the clear-history item, confirm). NotebookLM's markup for this control changes
+# often, so it is empty by default; fill it in before using rotation. Reloading the
+# tab is no substitute: NotebookLM keeps the chat history per notebook and simply
+# renders the same conversation again.
+NEW_CHAT_SELECTORS = ()
+
+# Runs inside the page after a response has been extracted: removes every chat
+# turn before the newest one so locator counts, layout and memory stay flat as
+# the conversation grows. Never removes anything containing the chat input.
+PRUNE_CHAT_JS = """
+inputSelector => {
+    const bubbles = document.querySelectorAll('div.to-user-container');
+    if (bubbles.length < 2) return 0;
+    // Climb from the newest bubble to the element that sits directly in the chat list.
+    let turn = bubbles[bubbles.length - 1];
+    while (turn.parentElement && !turn.parentElement.contains(bubbles[0])) {
+        turn = turn.parentElement;
+    }
+    let removed = 0;
+    let sibling = turn.previousElementSibling;
+    while (sibling) {
+        const previous = sibling.previousElementSibling;
+        if (!sibling.matches(inputSelector) && !sibling.querySelector(inputSelector)) {
+            sibling.remove();
+            removed++;
+        }
+        sibling = previous;
+    }
+    return removed;
+}
+"""
+
+
+class NotebookSession:
+    """
+    Long-lived connection to the NotebookLM tab.
+
+    Connects to the running Chrome instance on the first question, caches the
+    resolved tab and chat input, and only reconnects when the CDP link drops
+    or the tab is closed. Meant to wrap the whole generator loop:
+
+        async with NotebookSession() as session:
+            response = await session.ask(question)
+
+    For concurrent generation each session gets its own tab_index: session N
+    attaches to the Nth open NotebookLM tab, opening a new tab on the same
+    notebook if there are not enough. Sessions can share one ScraperMetrics,
+    which records phase timings and supplies the page-wait timeouts.
+
+    By default the session attaches over CDP to a Chrome started by hand with
+    --remote-debugging-port. Pass a PersistentBrowser to use a browser the
+    automator launches itself instead. An optional ResourceBlocker is routed
+    on the session's own tab, so its counts are per session.
+
+    Long conversations: rotate_every=K starts a fresh chat after every K
+    questions and first sends chat_preamble() (if given) so the new chat has
+    context. Rotation clicks through new_chat_selectors, so it needs them (a
+    ValueError otherwise). prune_dom=True removes finished turns from the page after each
+    extraction. Both keep the per-question cost flat as the guide grows.
+    With preamble_first_chat=True the preamble also opens the session's first
+    chat, for callers whose questions rely on it (primed conversations).
+
+    Network capture: with network_capture set, the answer is read from the
+    page's streamed answer response (complete once the stream closes) instead
+    of waiting for the bubble to settle. If no matching response arrives, its
+    body can't be parsed, or what it yields is not about as long as the
+    rendered answer (so probably not the answer), the same question falls
+    back to the DOM path.
+    """
+
+    def __init__(
+        self,
+        notebook_url: str = NOTEBOOK_URL,
+        cdp_endpoint: str = CDP_ENDPOINT,
+        settle_quiet_ms: int = SETTLE_QUIET_MS,
+        settle_max_ms: int = SETTLE_MAX_MS,
+        tab_index: int = 0,
+        metrics: ScraperMetrics = None,
+        browser: PersistentBrowser = None,
+        blocker: ResourceBlocker = None,
+        rotate_every: int = 0,
+        prune_dom: bool = False,
+        chat_preamble=None,
+        preamble_first_chat: bool = False,
+        network_capture: NetworkCapture = None,
+        new_chat_selectors=NEW_CHAT_SELECTORS,
+    ):
+        if rotate_every and not new_chat_selectors:
+            raise ValueError("rotate_every needs new_chat_selectors (the clicks that clear NotebookLM's chat); "
+                             "reloading the tab keeps the chat history.")
+        self.notebook_url = notebook_url
+        self.new_chat_selectors = tuple(new_chat_selectors)
+        self.network_capture = network_capture
+        self.blocker = blocker
+        self.rotate_every = rotate_every
+        self.prune_dom = prune_dom
+        self.chat_preamble = chat_preamble
+        self._questions_in_chat = 0
+        self._needs_preamble = preamble_first_chat
+        self._routed_page = None
+        self.launched_browser = browser
+        self.tab_index = tab_index
+        self.metrics = metrics or ScraperMetrics()
+        self.cdp_endpoint = cdp_endpoint
+        self.settle_quiet_ms = settle_quiet_ms
+        self.settle_max_ms = settle_max_ms
+        self._entered = False
+        self._playwright = None
+        self._browser = None
+        self._page = None
+        self._chat_input = None
+
+    async def __aenter__(self):
+        if self.launched_browser is None:
+            self._playwright = await async_playwright().start()
+        self._entered = True
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """
+        Drops the CDP connection. The attached Chrome instance keeps running;
+        a launched browser is closed by its PersistentBrowser.
+        """
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._entered = False
+        self._playwright = None
+        self._browser = None
+        self._page = None
+        self._routed_page = None
+        self._chat_input = None
+
+    def _is_connected(self) -> bool:
+        if self._page is None or self._page.is_closed():
+            return False
+        if self.launched_browser is not None:
+            return True
+        return self._browser is not None and self._browser.is_connected()
+
+    async def _resolve_context(self):
+        if self.launched_browser is not None:
+            return await self.launched_browser.get_context()
+        browser = self._browser
+        try:
+            # Only a dropped CDP link needs a new connection; a closed tab just needs a rescan.
+            if browser is None or not browser.is_connected():
+                self._browser = None
+                browser = await self._playwright.chromium.connect_over_cdp(self.cdp_endpoint)
+            context = browser.contexts[0]
+        except Exception as e:
+            raise BrowserUnavailableError(
+                f"Could not connect to browser. Is it running with --remote-debugging-port=9222? Details: {e}"
+            ) from e
+        self._browser = browser
+        return context
 
+    async def _connect(self):
+        """
+        (Re)attaches to the browser (over CDP, or the launched one) and resolves
+        the NotebookLM tab. Raises BrowserUnavailableError on failure.
+        """
+        self._page = None
+        self._chat_input = None
+        context = await self._resolve_context()
+
+        notebook_pages = [p_iter for p_iter in context.pages if p_iter.url.startswith(self.notebook_url)]
+        if not notebook_pages and self.launched_browser is None:
+            raise BrowserUnavailableError(f"No open tab found with a URL starting with '{self.notebook_url}'")
+
+        if self.tab_index < len(notebook_pages):
+            self._page = notebook_pages[self.tab_index]
+        else:
+            # A launched browser can always reopen the notebook itself.
+            target_url = notebook_pages[0].url if notebook_pages else self.notebook_url
+            try:
+                page = await context.new_page()
+                await self._route_page(page)  # Before goto, so the tab's own load is trimmed too.
+                await page.goto(target_url)
+            except Exception as e:
+                raise BrowserUnavailableError(f"Could not open NotebookLM tab #{self.tab_index + 1}: {e}") from e
+            self._page = page
+            print(f"Opened NotebookLM tab #{self.tab_index + 1}.")
+
+        await self._route_page(self._page)
+        self._chat_input = self._page.locator(CHAT_INPUT_SELECTOR)
+        print(f"Successfully connected to the NotebookLM tab #{self.tab_index + 1}.")
+
+    async def _route_page(self, page):
+        """Installs the session's ResourceBlocker on a tab once."""
+        if self.blocker is None or page is self._routed_page:
+            return
+        try:
+            await self.blocker.attach(page)
+        except Exception as e:
+            raise BrowserUnavailableError(f"Could not install request routing on tab #{self.tab_index + 1}: {e}") from e
+        self._routed_page = page
+
+    async def connect(self):
+        """
+        Attaches now instead of on the first question.
+        Raises BrowserUnavailableError on failure.
+        """
+        if not self._entered:
+            raise RuntimeError("NotebookSession must be used as an async context manager.")
+        if not self._is_connected():
+            await self._connect()
+
+    async def ask(self, question: str) -> str:
+        """
+        Asks a question in the cached NotebookLM tab and scrapes the response.
+        Reconnects first if the browser or tab has gone away.
+        Per-phase timings are appended to the session's ScraperMetrics.
+
+        Raises a ScraperError subclass on failure: BrowserUnavailableError when
+        the browser or tab is gone, ResponseTimeoutError when a page wait runs
+        out, EmptyResponseError when nothing was scraped.
+        """
+        timer = PhaseTimer()
         try:
-            chat_input = page.locator(CHAT_INPUT_SELECTOR)
-            await expect(chat_input).to_be_visible(timeout=10000)
-            
+            with timer.phase("connect"):
+                await self.connect()
+            with timer.phase("prepare"):
+                await self._prepare_chat()
+            markdown_content = await self._ask(question, timer)
+            self._questions_in_chat += 1
+        except Exception as e:
+            error = self._classify_error(e, timer.failed_phase)
+            self.metrics.record(timer, question, ok=False, tab_index=self.tab_index, error=str(error))
+            if error is e:
+                raise
+            raise error from e
+
+        self.metrics.record(timer, question, ok=True, tab_index=self.tab_index)
+        print(f"Phase timings: {timer.summary()}")
+        return markdown_content
+
+    async def _prepare_chat(self):
+        """Rotates to a fresh chat when due and makes sure its preamble was sent."""
+        if self.rotate_every and self._questions_in_chat >= self.rotate_every:
+            await self.start_new_chat()
+        if self._needs_preamble and self.chat_preamble is not None:
+            print(f"Sending chat preamble in tab #{self.tab_index + 1}...")
+            await self._ask(self.chat_preamble(), PhaseTimer())
+        self._needs_preamble = False
+
+    async def start_new_chat(self):
+        """
+        Starts a fresh chat in this tab by clicking through new_chat_selectors
+        and checking that no answer is left on the page.
+        Raises ChatResetError when there are no selectors or the chat wasn't cleared.
+        """
+        if not self.new_chat_selectors:
+            raise ChatResetError("No new_chat_selectors configured; can't clear the NotebookLM chat.")
+        await self.connect()
+        page = self._page
+        try:
+            for selector in self.new_chat_selectors:
+                await page.locator(selector).first.click(timeout=10000)
+            await expect(page.locator(RESPONSE_CONTAINER_SELECTOR)).to_have_count(0, timeout=10000)
+            await expect(self._chat_input).to_be_visible(timeout=WARMUP_TIMEOUT_MS)
+        except (AssertionError, PlaywrightTimeoutError) as e:
+            raise ChatResetError(f"Could not clear the chat in tab #{self.tab_index + 1}: {e}") from e
+        self._questions_in_chat = 0
+        self._needs_preamble = True
+        print(f"Started a fresh chat in tab #{self.tab_index + 1}.")
+
+    async def _ask(self, question: str, timer: PhaseTimer) -> str:
+        page = self._page
+        chat_input = self._chat_input
+
+        with timer.phase("input_ready"):
+            await expect(chat_input).to_be_visible(timeout=self.metrics.timeout_for("input_ready"))
             initial_response_count = await page.locator(RESPONSE_CONTAINER_SELECTOR).count()
 
-            await chat_input.fill(question)
-            await chat_input.press("Enter")
-            print(f"Asked question: '{question}'")
+        markdown_content = ""
+        submitted = self.network_capture is not None
+        if submitted:
+            markdown_content = await self._capture_from_network(question, initial_response_count, timer)
 
-            await expect(page.locator(RESPONSE_CONTAINER_SELECTOR)).to_have_count(
-                initial_response_count + 1, timeout=20000
+        if markdown_content:
+            clean_text = markdown_to_terminal_text(markdown_content)
+        else:
+            markdown_content, clean_text = await self._scrape_from_dom(
+                question, initial_response_count, submitted, timer
             )
-            print("New response detected.")
 
-      # 1) wait for the input
-            # 1) After detecting the new AI bubble…
-            ai_container = page.locator("div.to-user-container").last
+        if self.prune_dom:
+            try:
+                removed = await page.evaluate(PRUNE_CHAT_JS, CHAT_INPUT_SELECTOR)
+                if removed:
+                    print(f"Pruned {removed} finished chat turn(s) from the page.")
+            except Exception as e:
+                print(f"Could not prune the chat DOM: {e}")
 
-            # 2) Wait for the spinner/dots to disappear (i.e. streaming done)
-            await expect(ai_container.locator(".loading-dots")).to_be_hidden(timeout=60000)
+        try:
+            with open("response.md", "w", encoding="utf-8") as f:
+                f.write(markdown_content)
+            print("Cleaned Markdown response saved to response.md")
+        except Exception as e:
+            print(f"Could not save Markdown file: {e}")
 
-            # 3) (Optional) small buffer to let any final bits render
-            await page.wait_for_timeout(15000)  
-            # --- NEW: Save raw response as Markdown ---
-            try:
-                
-                message_content = ai_container.locator(".message-text-content")
-                html_content = await message_content.evaluate("node => node.innerHTML")
-
-                h = html2text.HTML2Text()
-                h.body_width = 0  # Don't wrap lines
-                markdown_content = h.handle(html_content)
-
-                # --- FINAL Markdown Cleaning ---
-                # 1. Fix unicode characters
-                markdown_content = markdown_content.replace('â€¢', '•')
-                markdown_content = markdown_content.replace('â€¦', '…')
-
-                # 2. Remove numbers attached to the end of words (e.g., "hallucination1")
-                #    This is the key fix.
-                markdown_content = re.sub(r'(\w)\d+\b', r'\1', markdown_content)
-                markdown_content = re.sub(r'\.\.\.\.', '.', markdown_content)
-
-                # 3. Remove any remaining bracketed citations like [1] or [2,3]
-                markdown_content = re.sub(r"\[[\d,\s]+\]", "", markdown_content)
-                
-                with open("response.md", "w", encoding="utf-8") as f:
-                    f.write(markdown_content.strip())
-                print("Formatted Markdown response saved to response.md")
+        # --- Print the clean terminal text to the console ---
+        print("\n--- Scraped Response (for Terminal) ---")
+        print(clean_text)
+        print("---------------------------------------")
 
-            except Exception as e:
-                print(f"Could not save Markdown file: {e}")
-
-
-            # 4) Pull absolutely everything
-            # --- PRE-PROCESS HTML TO REMOVE CITATIONS ---
-            # This JavaScript code runs inside the browser to remove both types of citation buttons.
-            await ai_container.evaluate("""
-                node => {
-                    // Selects both numbered citations and the '...' expander button
-                    const citations = node.querySelectorAll('button.citation-marker');
-                    citations.forEach(el => el.remove());
-                }
-            """)
-
-            # --- Save Cleaned Markdown ---
-            # This part is for the final study guide file.
-            markdown_content = ""
-            try:
-                message_content = ai_container.locator(".message-text-content")
-                html_content = await message_content.evaluate("node => node.innerHTML")
-                
-                h = html2text.HTML2Text()
-                h.body_width = 0
-                markdown_content = h.handle(html_content)
+        if not markdown_content:
+            raise EmptyResponseError("Scraped markdown was empty.")
+
+        # The function's main purpose is to return clean markdown for the study guide generator.
+        return markdown_content
 
-                # Fix common unicode characters in the markdown output
-                markdown_content = markdown_content.replace('â€¢', '•').replace('â€¦', '…')
+    async def _submit(self, question: str):
+        await self._chat_input.fill(question)
+        await self._chat_input.press("Enter")
+        print(f"Asked question: '{question}'")
 
-                with open("response.md", "w", encoding="utf-8") as f:
-                    f.write(markdown_content.strip())
-                print("Cleaned Markdown response saved to response.md")
+    async def _capture_from_network(self, question: str, initial_response_count: int, timer: PhaseTimer) -> str:
+        """
+        Submits the question and reads the answer from the streamed network
+        response, checked against the rendered bubble's text. Returns "" when
+        nothing usable was captured; the question has been submitted either way.
+        """
+        capture = self.network_capture
+        submitted = False
+        try:
+            with timer.phase("first_bubble"):
+                async with self._page.expect_response(
+                    capture.matches, timeout=self.metrics.timeout_for("first_bubble")
+                ) as response_info:
+                    await self._submit(question)
+                    submitted = True
+                response = await response_info.value
+        except PlaywrightTimeoutError as e:
+            if not submitted:
+                raise
+            timer.failed_phase = None
+            print(f"No response matching '{capture.url_pattern}' seen; falling back to the DOM. ({e})")
+            return ""
+        print("Answer stream detected.")
 
+        with timer.phase("stream_end"):
+            try:
+                body = await asyncio.wait_for(response.body(), self.metrics.timeout_for("stream_end") / 1000)
+            except asyncio.TimeoutError as e:
+                raise ResponseTimeoutError("Answer stream did not close before the stream_end timeout.") from e
             except Exception as e:
-                print(f"Could not save Markdown file: {e}")
+                print(f"Could not read the answer stream; falling back to the DOM. ({e})")
+                return ""
+
+        with timer.phase("extraction"):
+            markdown_content = capture.parse(body, question)
+            dom_text = await self._rendered_answer_text(initial_response_count) if markdown_content else ""
+        if not markdown_content:
+            print("Answer stream had no recognisable answer; falling back to the DOM.")
+            return ""
+        if not agrees_with_dom(markdown_content, dom_text):
+            print(f"Captured answer ({len(markdown_content.split())} words) doesn't match the rendered one "
+                  f"({len(dom_text.split())} words); falling back to the DOM.")
+            return ""
+        return markdown_content
+
+    async def _rendered_answer_text(self, initial_response_count: int) -> str:
+        """The new answer bubble's text once it has stopped loading, or "" if it doesn't show up."""
+        page = self._page
+        try:
+            await expect(page.locator(RESPONSE_CONTAINER_SELECTOR)).to_have_count(
+                initial_response_count + 1, timeout=self.metrics.timeout_for("first_bubble")
+            )
+            ai_container = page.locator("div.to-user-container").last
+            await expect(ai_container.locator(".loading-dots")).to_be_hidden(
+                timeout=self.metrics.timeout_for("stream_end")
+            )
+            return await ai_container.locator(".message-text-content").inner_text()
+        except (AssertionError, PlaywrightTimeoutError):
+            return ""
+
+    async def _scrape_from_dom(self, question: str, initial_response_count: int, submitted: bool, timer: PhaseTimer):
+        """Waits for the answer bubble to render and settle, then scrapes it."""
+        page = self._page
+        with timer.phase("first_bubble"):
+            if not submitted:
+                await self._submit(question)
+            await expect(page.locator(RESPONSE_CONTAINER_SELECTOR)).to_have_count(
+                initial_response_count + 1, timeout=self.metrics.timeout_for("first_bubble")
+            )
+            print("New response detected.")
 
-            # --- Clean and Format Plain Text (for Terminal Display) ---
-            # This part uses the SAFE regex rules to make the terminal output readable.
-            raw_text = await ai_container.evaluate("node => node.textContent")
-            
-            # 1. Remove UI text like "Save to note", etc.
-            clean_text = re.sub(r"keep_pin.*", "", raw_text, flags=re.DOTALL)
-            clean_text = re.sub(r"Save to note", "", clean_text)
+        # 1) After detecting the new AI bubble…
+        ai_container = page.locator("div.to-user-container").last
 
-            # 2. Fix unicode characters and collapse whitespace
-            clean_text = clean_text.replace('â€¢', '•').replace('â€¦', '…')
-            clean_text = re.sub(r"\s{2,}", " ", clean_text).strip()
+        # 2) Wait for the spinner/dots to disappear (i.e. streaming done)
+        with timer.phase("stream_end"):
+            await expect(ai_container.locator(".loading-dots")).to_be_hidden(
+                timeout=self.metrics.timeout_for("stream_end")
+            )
 
-            # 3. Format for terminal readability
-            clean_text = clean_text.replace("• ", "\n\n• ").strip()
+        # 3) Let any final bits render: wait until the bubble's DOM stops changing
+        with timer.phase("settle"):
+            settle = await ai_container.evaluate(
+                WAIT_FOR_QUIESCENCE_JS, [self.settle_quiet_ms, self.settle_max_ms]
+            )
+        if settle["settled"]:
+            print(f"Response settled after {settle['elapsed'] / 1000:.1f}s.")
+        else:
+            print(f"Response still changing after {self.settle_max_ms / 1000:.0f}s; scraping anyway.")
 
-            # --- Print the clean terminal text to the console ---
-            # This is separate from the markdown file generation.
-            print("\n--- Scraped Response (for Terminal) ---")
-            print(clean_text)
-            print("---------------------------------------")
+        # 4) Serialize the response once (citations and UI chrome dropped in the page)
+        #    and derive both the Markdown and the terminal text from that one parse.
+        with timer.phase("extraction"):
+            message_content = ai_container.locator(".message-text-content")
+            html_content = await message_content.evaluate(SERIALIZE_RESPONSE_JS, SKIP_SELECTORS)
+            markdown_content, clean_text = extract_response(html_content)
+        return markdown_content, clean_text
 
-            # The function's main purpose is to return clean markdown for the study guide generator.
-            return markdown_content.strip() or "Scraped markdown was empty."
+    def _classify_error(self, error: Exception, phase) -> ScraperError:
+        """Maps whatever Playwright raised onto the ScraperError hierarchy."""
+        if isinstance(error, ScraperError):
+            return error
+        if not self._is_connected():
+            return BrowserUnavailableError(f"Lost the NotebookLM tab during {phase}: {error}")
+        if isinstance(error, (PlaywrightTimeoutError, AssertionError)):
+            # expect(...) reports an exhausted timeout as an AssertionError.
+            return ResponseTimeoutError(f"Timed out during {phase}: {error}")
+        return ScraperError(f"An error occurred during automation ({phase}): {error}")
+
+
+async def query_notebook(question: str) -> str:
+    """
+    Connects to a running Chrome instance, finds the NotebookLM tab,
+    asks a question, and scrapes the response.
+    One-shot wrapper around NotebookSession; loops should hold a session open instead.
+    Returns an "Error: ..." string instead of raising, for interactive use.
+    """
+    async with NotebookSession() as session:
+        try:
+            return await session.ask(question)
+        except ScraperError as e:
+            return f"Error: {e}"
 
-        except Exception as e:
-            return f"An error occurred during automation: {e}"
 
 async def main():
     my_question = "Summarize the key findings from the uploaded research paper."
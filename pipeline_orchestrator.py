@@ -0,0 +1,315 @@
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import time
+from diagram_cache import DiagramCache
+from diagram_files import DIAGRAMS_FILE, PDF_CACHE_DIR, write_diagrams
+from diagram_generator import DiagramClient, parse_markdown_sections
+from diagram_externalizer import externalize_diagrams
+from diagram_validator import PDFLATEX, REPORT_FILE as COMPILE_REPORT_FILE, print_report, validate_diagrams
+from diagram_generator import parse_topics as parse_diagram_topics
+from gm.manifest_generator import GeminiAPI, build_manifest, manifest_output_path, manifest_prompt, section_and_title
+from gm.section_index import STUDY_GUIDE_PREFIX, SectionIndex
+from md_to_latex_converter import (
+    CLEAN,
+    OUTPUT as LATEX_OUTPUT,
+    LatexConverter,
+    assemble_latex,
+    clean_and_chunk_markdown,
+    post_process_latex,
+)
+from rate_limiter import DEFAULT_RPM, DEFAULT_TPM
+from study_guide_generator import GUIDE_TITLE, MAX_BATCH_SECTIONS, OUTPUT_FILE, generate_study_guide, parse_topics
+
+DEFAULT_DIAGRAM_WORKERS = 8  # The client's RPM/TPM limits still apply on top.
+DEFAULT_LATEX_WORKERS = 2
+DEFAULT_MANIFEST_WORKERS = 2
+
+
+class Stage:
+    """
+    One pipeline stage: a queue drained by `workers` tasks, each running the
+    stage's call (awaited if it is a coroutine function, in a thread if it
+    blocks), so `workers` is the stage's concurrency limit. Results are memoized by key; asking for a key that is queued or
+    running waits for that call instead of making another one.
+    """
+
+    def __init__(self, name, workers, work):
+        self.name = name
+        self.work = work
+        self.queue = asyncio.Queue()
+        self.results = {}  # key -> Future
+        self.calls = 0
+        self.busy_seconds = 0.0
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(max(1, workers))]
+
+    def submit(self, key, *args):
+        """Queues work(*args) under key (once) and returns its future."""
+        if key not in self.results:
+            future = asyncio.get_running_loop().create_future()
+            # Speculative results nobody asks for shouldn't warn about unretrieved errors.
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self.results[key] = future
+            self.queue.put_nowait((future, args))
+        return self.results[key]
+
+    async def get(self, key, *args):
+        return await self.submit(key, *args)
+
+    async def _worker(self):
+        while True:
+            future, args = await self.queue.get()
+            start = time.monotonic()
+            try:
+                if asyncio.iscoroutinefunction(self.work):
+                    result = await self.work(*args)
+                else:
+                    result = await asyncio.to_thread(self.work, *args)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            finally:
+                self.calls += 1
+                self.busy_seconds += time.monotonic() - start
+
+    async def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+
+async def run_pipeline(topics_file="topics.md", output_file=OUTPUT_FILE, title=GUIDE_TITLE,
+                       diagrams_file=DIAGRAMS_FILE, latex_output=LATEX_OUTPUT, clean_output=CLEAN,
+                       diagram_workers=DEFAULT_DIAGRAM_WORKERS, latex_workers=DEFAULT_LATEX_WORKERS,
+                       manifests=False, manifest_workers=DEFAULT_MANIFEST_WORKERS, diagram_client=None,
+                       compile_budget=None, externalize=False, **scrape_options):
+    """
+    Runs scrape -> diagram -> LaTeX (-> manifest) in one process, per section.
+
+    generate_study_guide (with scrape_options) reports every section as it
+    is appended to the guide; the section is then queued for its diagram,
+    its LaTeX chunk(s) and, with manifests=True, its video manifest while
+    the next sections are still being scraped. Each stage has its own
+    worker count, so end-to-end time approaches the slowest stage rather
+    than the sum of all of them.
+
+    The outputs are then assembled exactly as the sequential scripts build
+    them from the finished guide (diagram_generator.main, md_to_latex_converter's
+    AI mode, gm/manifest_generator per section): the same parsing of the
+    finished file decides what is needed, and the work done along the way is
+    reused wherever its inputs match. Anything that doesn't match (e.g. the
+    chunk numbering after a dead-lettered section) is done at that point.
+
+    With compile_budget (seconds), the diagrams are compiled before
+    diagrams.json is written, and the ones that fail or go over budget are
+    regenerated or dropped (see diagram_validator.validate_diagrams).
+
+    With externalize=True, every diagram is pre-rendered to its cached PDF
+    (see diagram_externalizer.py) while the LaTeX chunks are still being
+    converted, and study_guide_CLEAN.tex includes the PDFs.
+
+    Both need pdflatex, which is checked for before anything is scraped.
+    """
+    if (compile_budget is not None or externalize) and shutil.which(PDFLATEX) is None:
+        raise FileNotFoundError(f"{PDFLATEX} was not found on PATH; compile_budget and externalize need it.")
+    started = time.monotonic()
+    topics = parse_topics(topics_file)
+    diagram_topics = parse_diagram_topics(topics_file)
+    diagram_client = diagram_client or DiagramClient()
+    converter = LatexConverter(api_key=os.getenv("GEMINI_API_KEY"))
+    gemini_api = GeminiAPI() if manifests else None
+
+    def ask_for_manifest(section_id, section_content):
+        return gemini_api.generate_content(manifest_prompt(section_id, section_content))
+
+    stages = {
+        "diagram": Stage("diagram", diagram_workers, diagram_client.generate),
+        "latex": Stage("latex", latex_workers, converter.convert_chunk),
+    }
+    if manifests:
+        stages["manifest"] = Stage("manifest", manifest_workers, ask_for_manifest)
+
+    # What md_to_latex_converter will see: the title chunk, then each section's chunks.
+    guide_parts = [f"# {title}\n\n"]
+    expected_chunks = len(clean_and_chunk_markdown(guide_parts[0])) + len(topics)
+    chunk_count = 0
+
+    def queue_chunks(markdown_text):
+        nonlocal chunk_count
+        for chunk in clean_and_chunk_markdown(markdown_text):
+            chunk_count += 1
+            stages["latex"].submit((chunk, chunk_count, expected_chunks), chunk, chunk_count, expected_chunks)
+
+    def on_section(section_id, block):
+        guide_parts.append(block)
+        queue_chunks(block)
+        sections = SectionIndex.from_bytes(block.encode("utf-8"), STUDY_GUIDE_PREFIX).read_all(strip_markers=True)
+        for key, section_content in sections.items():
+            topic_description = diagram_topics.get(key, "")
+            if topic_description:
+                stages["diagram"].submit((key, section_content, topic_description),
+                                         key, section_content, topic_description)
+        if manifests:
+            # The manifest CLI reads the section (and its H1 title) from the whole guide so far.
+            index = SectionIndex.from_bytes("".join(guide_parts).encode("utf-8"))
+            _, section_content = section_and_title(index, section_id)
+            if section_content:
+                stages["manifest"].submit((section_id, section_content), section_id, section_content)
+
+    try:
+        queue_chunks(guide_parts[0])
+        summary = await generate_study_guide(topics_file=topics_file, output_file=output_file, title=title,
+                                             on_section=on_section, **scrape_options)
+        scrape_seconds = time.monotonic() - started
+        if summary["status"] in ("stopped", "kept previous"):
+            print(f"\n⚠️ The study guide is not complete ({summary['status']}); skipping diagrams, LaTeX and manifests.")
+            return summary
+
+        print("\n--- Assembling outputs from the finished guide ---")
+        with open(output_file, "r", encoding="utf-8") as f:
+            chunks = clean_and_chunk_markdown(f.read())
+        sections = parse_markdown_sections(output_file)
+        diagram_ids = [section_id for section_id in sections if diagram_topics.get(section_id, "")]
+        for section_id in sections:
+            if not diagram_topics.get(section_id, ""):
+                print(f"No topic description found for section {section_id}")
+
+        async def latex_parts():
+            return await asyncio.gather(*(
+                stages["latex"].get((chunk, n, len(chunks)), chunk, n, len(chunks))
+                for n, chunk in enumerate(chunks, start=1)
+            ))
+
+        async def diagram_codes():
+            return await asyncio.gather(*(
+                stages["diagram"].get((section_id, sections[section_id], diagram_topics[section_id]),
+                                      section_id, sections[section_id], diagram_topics[section_id])
+                for section_id in diagram_ids
+            ))
+
+        async def write_manifests():
+            index = SectionIndex.load(output_file)
+            written = 0
+            for section_id in sections:
+                title_for_section, section_content = section_and_title(index, section_id)
+                if not section_content:
+                    continue
+                try:
+                    response_data = await stages["manifest"].get((section_id, section_content),
+                                                                 section_id, section_content)
+                except Exception as e:
+                    print(f"Error generating manifest for section {section_id}: {e}")
+                    continue
+                manifest = build_manifest(output_file, section_id, title_for_section, response_data)
+                path = manifest_output_path(output_file, section_id)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(manifest, f, indent=2)
+                written += 1
+            return written
+
+        latex_task = asyncio.ensure_future(latex_parts())
+        manifest_task = asyncio.ensure_future(write_manifests()) if manifests else None
+
+        diagrams = dict(zip(diagram_ids, await diagram_codes()))
+        if compile_budget is not None:
+            diagrams, compile_report = await validate_diagrams(
+                diagrams, sections, diagram_topics, budget_seconds=compile_budget, client=diagram_client,
+                pdf_dir=PDF_CACHE_DIR if externalize else None)
+            with open(COMPILE_REPORT_FILE, "w", encoding="utf-8") as f:
+                json.dump({"budget_seconds": compile_budget, "diagrams": compile_report}, f, indent=2)
+            print_report(compile_report, compile_budget)
+        write_diagrams(diagrams, diagrams_file)
+        print(f"✅ {len(diagrams)} diagram(s) saved to {diagrams_file}.")
+        # Diagrams validated above already have their PDFs; this only renders the rest.
+        externalize_task = asyncio.ensure_future(externalize_diagrams(diagrams)) if externalize else None
+
+        if externalize_task is not None:
+            await externalize_task
+        try:
+            final_latex = assemble_latex(await latex_task)
+        except Exception as e:
+            print(f"\n❌ An error occurred during the AI conversion process: {e}")
+        else:
+            for path in (latex_output, clean_output):
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(latex_output, "w", encoding="utf-8") as f:
+                f.write(final_latex)
+            print(f"✅ Full LaTeX document saved to '{latex_output}'.")
+            # post_process_latex inserts the diagrams from diagrams_file, written above.
+            with open(clean_output, "w", encoding="utf-8") as f:
+                f.write(post_process_latex(final_latex, tex_dir=os.path.dirname(clean_output),
+                                           diagrams_file=diagrams_file))
+            print(f"✅ Clean LaTeX document saved to '{clean_output}'.")
+
+        if manifest_task is not None:
+            print(f"✅ {await manifest_task} manifest(s) saved under manifests/.")
+    finally:
+        for stage in stages.values():
+            await stage.close()
+
+    seconds = time.monotonic() - started
+    print(f"\nPipeline finished in {seconds:.0f}s (scraping took {scrape_seconds:.0f}s).")
+    for stage in stages.values():
+        print(f"  {stage.name:<9}{stage.calls:>4} call(s), {stage.busy_seconds:>7.0f}s of work")
+    summary["pipeline_seconds"] = round(seconds, 1)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Scrape the study guide and generate its diagrams, LaTeX and manifests as sections arrive.")
+    parser.add_argument("--topics", default="topics.md")
+    parser.add_argument("--output", default=OUTPUT_FILE, help=f"Study guide Markdown (default: {OUTPUT_FILE}).")
+    parser.add_argument("--diagrams", default=DIAGRAMS_FILE)
+    parser.add_argument("--latex-output", default=LATEX_OUTPUT)
+    parser.add_argument("--clean-output", default=CLEAN)
+    parser.add_argument("--concurrency", type=int, default=1, help="NotebookLM tabs for the scrape stage.")
+    parser.add_argument("--diagram-workers", type=int, default=DEFAULT_DIAGRAM_WORKERS)
+    parser.add_argument("--rpm", type=float, default=DEFAULT_RPM, help="Diagram model requests per minute.")
+    parser.add_argument("--tpm", type=float, default=DEFAULT_TPM, help="Diagram model tokens per minute.")
+    parser.add_argument("--compile-budget", type=float, default=None,
+                        help="Compile each diagram first; regenerate or drop those slower than this many seconds.")
+    parser.add_argument("--externalize", action="store_true",
+                        help="Pre-render the diagrams to cached PDFs and include those instead of inline TikZ.")
+    parser.add_argument("--latex-workers", type=int, default=DEFAULT_LATEX_WORKERS)
+    parser.add_argument("--manifests", action="store_true", help="Also write a video manifest per section.")
+    parser.add_argument("--manifest-workers", type=int, default=DEFAULT_MANIFEST_WORKERS)
+    parser.add_argument("--refresh", action="store_true",
+                        help="Ignore the response and diagram caches (fresh results are still cached).")
+    parser.add_argument("--resume", action="store_true")
+    parser.add_argument("--primed", action="store_true")
+    parser.add_argument("--batch-chars", type=int, default=0)
+    parser.add_argument("--batch-sections", type=int, default=MAX_BATCH_SECTIONS)
+    parser.add_argument("--launch", action="store_true")
+    parser.add_argument("--headless", action="store_true")
+    args = parser.parse_args()
+    if (args.compile_budget is not None or args.externalize) and shutil.which(PDFLATEX) is None:
+        parser.error(f"{PDFLATEX} was not found on PATH; --compile-budget and --externalize need it.")
+
+    with DiagramCache() as diagram_cache:
+        asyncio.run(run_pipeline(
+            topics_file=args.topics,
+            output_file=args.output,
+            diagrams_file=args.diagrams,
+            latex_output=args.latex_output,
+            clean_output=args.clean_output,
+            diagram_workers=args.diagram_workers,
+            latex_workers=args.latex_workers,
+            manifests=args.manifests,
+            manifest_workers=args.manifest_workers,
+            diagram_client=DiagramClient(rpm=args.rpm, tpm=args.tpm, cache=diagram_cache, refresh=args.refresh),
+            compile_budget=args.compile_budget,
+            externalize=args.externalize,
+            concurrency=args.concurrency,
+            refresh=args.refresh,
+            resume=args.resume,
+            primed=args.primed,
+            batch_chars=args.batch_chars,
+            batch_sections=args.batch_sections,
+            launch=args.launch,
+            headless=args.headless,
+        ))
@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+# --- Configuration ---
+# Gemini 2.5 Flash, paid tier 1. The free tier is far lower (10 RPM, 250k TPM);
+# pass those with --rpm/--tpm when running on a free key.
+DEFAULT_RPM = 1000
+DEFAULT_TPM = 1_000_000
+CHARS_PER_TOKEN = 4  # Rough English/LaTeX average; only used before the API reports usage.
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class TokenBucket:
+    """
+    Async token bucket: holds up to `capacity` tokens and refills at
+    capacity / per_seconds. acquire() waits (first come, first served) until
+    the amount is available. A request larger than the bucket waits for a
+    full bucket rather than forever. The level may go negative when
+    settle() finds a call cost more than was taken up front.
+    """
+
+    def __init__(self, capacity: float, per_seconds: float = 60.0):
+        self.capacity = capacity
+        self.rate = capacity / per_seconds
+        self.level = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.level >= amount:
+                    self.level -= amount
+                    return
+                await asyncio.sleep((amount - self.level) / self.rate)
+
+    def settle(self, taken: float, actual: float) -> None:
+        """Corrects an up-front estimate once the real cost is known."""
+        self._refill()
+        self.level = min(self.capacity, self.level + taken - actual)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limits shared by every request
+    to one model, plus a shared pause: when the API answers 429, pause()
+    holds back all callers instead of letting each one hit the limit again.
+    """
+
+    def __init__(self, rpm: float = DEFAULT_RPM, tpm: float = DEFAULT_TPM):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._paused_until = 0.0
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        while (wait := self._paused_until - time.monotonic()) > 0:
+            await asyncio.sleep(wait)
+        await self.requests.acquire(1)
+        await self.tokens.acquire(estimated_tokens)
+
+    def settle(self, estimated_tokens: int, actual_tokens: int) -> None:
+        self.tokens.settle(estimated_tokens, actual_tokens)
@@ -0,0 +1,146 @@
+import weakref
+from collections import Counter
+from urllib.parse import urlsplit
+
+# --- Default rules ---
+# The scraper only reads the chat DOM, so anything purely visual or for tracking can go.
+DEFAULT_BLOCKED_TYPES = ("image", "media", "font")
+DEFAULT_BLOCKED_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+)
+# Hosts that are never blocked, whatever their resource type.
+DEFAULT_ALLOWED_DOMAINS = ("notebooklm.google.com",)
+
+# Blocked requests never transfer anything, so bytes saved are estimated from
+# typical transfer sizes per resource type.
+ESTIMATED_BYTES = {
+    "image": 25_000,
+    "media": 500_000,
+    "font": 40_000,
+    "stylesheet": 20_000,
+    "script": 60_000,
+}
+ESTIMATED_BYTES_OTHER = 5_000
+
+# DevTools Protocol names (Fetch.RequestPattern.resourceType) of Playwright's resource types.
+CDP_RESOURCE_TYPES = {
+    "document": "Document",
+    "stylesheet": "Stylesheet",
+    "image": "Image",
+    "media": "Media",
+    "font": "Font",
+    "script": "Script",
+    "xhr": "XHR",
+    "fetch": "Fetch",
+    "websocket": "WebSocket",
+    "other": "Other",
+}
+
+
+def parse_rule_list(value: str):
+    """Splits a comma-separated CLI value into a tuple of rules."""
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+
+def _host_matches(host: str, domains) -> bool:
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+class ResourceBlocker:
+    """
+    Opt-in request interception for the scraping browser.
+
+    Attach to a page (or a whole context) and it aborts requests whose resource
+    type or host matches the deny rules, unless the host is on the allow list.
+    Counts blocked requests and an estimate of the bytes they would have cost.
+
+    Interception goes through the DevTools Fetch domain with patterns built
+    from the deny rules, so only requests a rule could match (the blocked
+    types, the blocked domains) are paused and decided here. Everything else,
+    NotebookLM's scripts and stylesheets included, loads untouched and from
+    the HTTP cache. A catch-all page.route("**/*") would send every request
+    through the driver and make Playwright turn that cache off. Chromium only.
+    """
+
+    def __init__(self, blocked_types=DEFAULT_BLOCKED_TYPES, blocked_domains=DEFAULT_BLOCKED_DOMAINS,
+                 allowed_domains=DEFAULT_ALLOWED_DOMAINS, name: str = "browser"):
+        self.blocked_types = frozenset(blocked_types)
+        self.blocked_domains = tuple(blocked_domains)
+        self.allowed_domains = tuple(allowed_domains)
+        self.name = name
+        self.allowed_requests = 0
+        self.blocked_requests = 0
+        self.estimated_bytes_saved = 0
+        self.blocked_by_reason = Counter()
+        self._pages = weakref.WeakSet()
+
+    def block_reason(self, resource_type: str, url: str):
+        """Returns why a request should be blocked, or None to let it through."""
+        host = (urlsplit(url).hostname or "").lower()
+        if _host_matches(host, self.allowed_domains):
+            return None
+        if _host_matches(host, self.blocked_domains):
+            return f"domain:{host}"
+        if resource_type in self.blocked_types:
+            return f"type:{resource_type}"
+        return None
+
+    def fetch_patterns(self):
+        """Fetch.enable patterns that pause exactly the requests a deny rule could match."""
+        patterns = [{"urlPattern": "*", "resourceType": CDP_RESOURCE_TYPES[t]}
+                    for t in sorted(self.blocked_types) if t in CDP_RESOURCE_TYPES]
+        for domain in self.blocked_domains:
+            patterns.append({"urlPattern": f"*://{domain}/*"})
+            patterns.append({"urlPattern": f"*://*.{domain}/*"})
+        return patterns
+
+    async def attach(self, target):
+        """
+        Installs the blocker on a Playwright Page, or on every page of a
+        BrowserContext, including the ones opened later.
+        """
+        if hasattr(target, "pages"):
+            for page in target.pages:
+                await self._attach_page(page)
+            target.on("page", self._attach_page)
+            return
+        await self._attach_page(target)
+
+    async def _attach_page(self, page):
+        patterns = self.fetch_patterns()
+        if page in self._pages or not patterns:
+            return
+        self._pages.add(page)
+        session = await page.context.new_cdp_session(page)
+        session.on("Fetch.requestPaused", lambda event: self._on_request_paused(session, event))
+        await session.send("Fetch.enable", {"patterns": patterns})
+
+    async def _on_request_paused(self, session, event):
+        resource_type = event.get("resourceType", "Other").lower()
+        reason = self.block_reason(resource_type, event["request"]["url"])
+        try:
+            if reason is None:
+                # Paused by a broad pattern (e.g. an image on an allowed host): let it through.
+                self.allowed_requests += 1
+                await session.send("Fetch.continueRequest", {"requestId": event["requestId"]})
+                return
+            self.blocked_requests += 1
+            self.blocked_by_reason[reason] += 1
+            self.estimated_bytes_saved += ESTIMATED_BYTES.get(resource_type, ESTIMATED_BYTES_OTHER)
+            await session.send("Fetch.failRequest", {"requestId": event["requestId"], "errorReason": "BlockedByClient"})
+        except Exception:
+            pass  # The page went away while the request was paused.
+
+    def summary(self) -> str:
+        lines = [
+            f"Resource blocking ({self.name}): {self.blocked_requests} requests blocked "
+            f"({self.allowed_requests} inspected and let through), "
+            f"~{self.estimated_bytes_saved / 1024:.0f} KiB saved (est.)"
+        ]
+        for reason, count in self.blocked_by_reason.most_common():
+            lines.append(f"  {reason}: {count}")
+        return "\n".join(lines)
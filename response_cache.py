@@ -0,0 +1,107 @@
+import hashlib
+import os
+import sqlite3
+import time
+
+# --- Configuration ---
+CACHE_PATH = "response_cache.sqlite3"
+DEFAULT_TTL_SECONDS = 14 * 24 * 3600   # Entries older than two weeks are re-scraped.
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024   # Least recently used entries are evicted past this.
+
+
+def cache_key(notebook_url: str, prompt: str, template_version: str) -> str:
+    """Content address of a NotebookLM answer: notebook + exact prompt + template version."""
+    digest = hashlib.sha256()
+    for part in (notebook_url, template_version, prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """
+    Persistent SQLite cache of scraped NotebookLM responses.
+
+    Each entry carries its own expiry (per-entry TTL). A TTL of None never
+    expires; a TTL of 0 (or less) means the response is not cached at all.
+    After every write the cache is trimmed back under max_bytes, dropping the
+    least recently read entries first.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, ttl_seconds=DEFAULT_TTL_SECONDS, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self._conn.close()
+
+    def get(self, notebook_url: str, prompt: str, template_version: str):
+        """Returns the cached response, or None on a miss or an expired entry."""
+        key = cache_key(notebook_url, prompt, template_version)
+        row = self._conn.execute(
+            "SELECT response, expires_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        response, expires_at = row
+        now = time.time()
+        if expires_at is not None and expires_at <= now:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+            return None
+        self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        self._conn.commit()
+        return response
+
+    def put(self, notebook_url: str, prompt: str, template_version: str, response: str, ttl_seconds=None):
+        """Stores a response. ttl_seconds overrides the cache default for this entry; 0 stores nothing."""
+        key = cache_key(notebook_url, prompt, template_version)
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl is not None and ttl <= 0:
+            return
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        self._conn.execute(
+            "INSERT OR REPLACE INTO responses (key, response, size, created_at, expires_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, response, len(response.encode("utf-8")), now, expires_at, now),
+        )
+        self._conn.commit()
+        self.evict()
+
+    def evict(self):
+        """Drops expired entries, then least recently read ones until under max_bytes."""
+        self._conn.execute("DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > self.max_bytes:
+            rows = self._conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC").fetchall()
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                total -= size
+        self._conn.commit()
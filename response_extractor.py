@@ -0,0 +1,65 @@
+import re
+import html2text
+
+# --- DOM serialization ---
+# Nodes dropped while serializing a response: citation buttons (numbered and the
+# '...' expander) plus any UI chrome that can end up inside the message body.
+SKIP_SELECTORS = "button.citation-marker, button, mat-icon, script, style"
+
+# Runs inside the page on the .message-text-content node. Serializes a detached
+# clone once, so the live chat DOM is never mutated and only one innerHTML read
+# crosses the CDP boundary per response.
+SERIALIZE_RESPONSE_JS = """
+(node, skipSelectors) => {
+    const clone = node.cloneNode(true);
+    clone.querySelectorAll(skipSelectors).forEach(el => el.remove());
+    return clone.innerHTML;
+}
+"""
+
+# --- Cleanup rules (compiled once at import) ---
+# Mis-decoded UTF-8 that shows up in scraped text.
+MOJIBAKE_FIXES = (
+    ('â€¢', '•'),
+    ('â€¦', '…'),
+)
+
+# Markdown -> terminal text. Applied in order to the Markdown produced by html2text.
+TERMINAL_RULES = (
+    (re.compile(r"^[ \t]{0,3}#{1,6}[ \t]*", re.MULTILINE), ""),      # heading markers
+    (re.compile(r"^([ \t]*)[*+-][ \t]+", re.MULTILINE), r"\1• "),    # list markers -> bullets
+    (re.compile(r"(\*\*|__)(.+?)\1"), r"\2"),                        # bold
+    (re.compile(r"(?<![\w*])[*_](?!\s)(.+?)(?<!\s)[*_](?![\w*])"), r"\1"),  # italics
+    (re.compile(r"\n{3,}"), "\n\n"),                                 # blank-line runs
+)
+
+
+def fix_mojibake(text: str) -> str:
+    for find_str, replace_with in MOJIBAKE_FIXES:
+        text = text.replace(find_str, replace_with)
+    return text
+
+
+def html_to_markdown(html_content: str) -> str:
+    """Converts serialized response HTML to the Markdown written into the study guide."""
+    h = html2text.HTML2Text()
+    h.body_width = 0  # Don't wrap lines
+    return fix_mojibake(h.handle(html_content)).strip()
+
+
+def markdown_to_terminal_text(markdown_content: str) -> str:
+    """Strips Markdown syntax so the response reads cleanly in the console."""
+    text = markdown_content
+    for pattern, replacement in TERMINAL_RULES:
+        text = pattern.sub(replacement, text)
+    return text.strip()
+
+
+def extract_response(html_content: str):
+    """
+    Single extraction stage for a scraped response.
+    Takes the HTML from SERIALIZE_RESPONSE_JS (citations and chrome already
+    dropped) and returns (markdown, terminal_text) from one html2text parse.
+    """
+    markdown_content = html_to_markdown(html_content)
+    return markdown_content, markdown_to_terminal_text(markdown_content)
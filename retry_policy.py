@@ -0,0 +1,63 @@
+import asyncio
+import random
+
+# --- Configuration ---
+MAX_ATTEMPTS = 4            # Per section, not counting attempts lost to a browser outage.
+BACKOFF_BASE_SECONDS = 2.0
+BACKOFF_CAP_SECONDS = 60.0
+BREAKER_COOLDOWN_SECONDS = 15.0
+BREAKER_MAX_TRIPS = 6       # Consecutive outages before the run gives up.
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE_SECONDS, cap: float = BACKOFF_CAP_SECONDS) -> float:
+    """Exponential backoff with full jitter for the given 0-based attempt."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt + 1)))
+
+
+class CircuitBrokenError(Exception):
+    """The browser stayed unavailable through every breaker cooldown."""
+
+
+class CircuitBreaker:
+    """
+    Shared pause switch for all section workers.
+
+    A worker that finds the browser or tab gone trips the breaker; every worker
+    then waits in wait_until_closed() for the cooldown (doubling with each
+    consecutive trip) before trying again. A successful question resets it.
+    After max_trips consecutive outages the breaker stays broken and
+    wait_until_closed() raises CircuitBrokenError.
+    """
+
+    def __init__(self, cooldown: float = BREAKER_COOLDOWN_SECONDS, max_trips: int = BREAKER_MAX_TRIPS):
+        self.cooldown = cooldown
+        self.max_trips = max_trips
+        self.trips = 0
+        self.broken = False
+        self._closed = asyncio.Event()
+        self._closed.set()
+
+    @property
+    def is_open(self) -> bool:
+        return not self._closed.is_set()
+
+    def trip(self, reason) -> None:
+        if self.is_open or self.broken:
+            return  # Another worker already reported this outage.
+        self.trips += 1
+        if self.trips > self.max_trips:
+            self.broken = True
+            print(f"⛔ Browser still unavailable after {self.max_trips} cooldowns: {reason}")
+            return
+        delay = self.cooldown * 2 ** (self.trips - 1)
+        print(f"⏸ Browser unavailable ({reason}). Pausing all sections for {delay:.0f}s.")
+        self._closed.clear()
+        asyncio.get_running_loop().call_later(delay, self._closed.set)
+
+    def record_success(self) -> None:
+        self.trips = 0
+
+    async def wait_until_closed(self) -> None:
+        await self._closed.wait()
+        if self.broken:
+            raise CircuitBrokenError("Browser unavailable; giving up on the remaining sections.")
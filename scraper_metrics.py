@@ -0,0 +1,111 @@
+import json
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# --- Configuration ---
+METRICS_PATH = "scraper_metrics.jsonl"
+HISTORY_SIZE = 50        # Most recent questions considered when deriving timeouts.
+MIN_SAMPLES = 5          # Below this many observations the default timeout is used.
+TIMEOUT_PERCENTILE = 95
+TIMEOUT_HEADROOM = 2.0   # Timeout = percentile * headroom, clamped to the bounds below.
+
+# Phases of one question, in order. "prepare" covers chat rotation and the
+# chat preamble, when there are any.
+PHASES = ("connect", "prepare", "input_ready", "first_bubble", "stream_end", "settle", "extraction")
+
+# Phases that wait on the page. Values: (default, floor, ceiling) in ms.
+# The defaults are the old hard-coded timeouts and apply until there is enough history.
+TIMEOUT_BOUNDS_MS = {
+    "input_ready": (10000, 5000, 60000),
+    "first_bubble": (20000, 10000, 120000),
+    "stream_end": (60000, 30000, 600000),
+}
+
+
+def percentile(samples, pct):
+    """Linear-interpolated percentile of a non-empty list."""
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class PhaseTimer:
+    """Collects per-phase durations (ms) for a single question."""
+
+    def __init__(self):
+        self.durations = {}
+        self.failed_phase = None
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.failed_phase = name
+            raise
+        finally:
+            self.durations[name] = (time.perf_counter() - start) * 1000
+
+    @property
+    def total_ms(self):
+        return (time.perf_counter() - self._started) * 1000
+
+    def summary(self):
+        return " | ".join(f"{name} {self.durations[name] / 1000:.1f}s" for name in PHASES if name in self.durations)
+
+
+class ScraperMetrics:
+    """
+    Appends per-question phase timings to a JSONL file and derives page-wait
+    timeouts from the recent history in that file.
+
+    A phase that timed out is kept as a (censored) sample at the time it gave up,
+    so repeated timeouts push that phase's timeout up on the next question.
+    """
+
+    def __init__(self, path: str = METRICS_PATH, history_size: int = HISTORY_SIZE):
+        self.path = path
+        self.history = deque(maxlen=history_size)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        self.history.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue  # A torn last line from a killed run.
+
+    def record(self, timer: PhaseTimer, question: str, ok: bool, tab_index: int = 0, error=None):
+        entry = {
+            "ts": time.time(),
+            "tab": tab_index,
+            "question_chars": len(question),
+            "ok": ok,
+            "failed_phase": timer.failed_phase,
+            "error": error,
+            "total_ms": round(timer.total_ms, 1),
+            "phases": {name: round(ms, 1) for name, ms in timer.durations.items()},
+        }
+        self.history.append(entry)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def samples(self, phase: str):
+        return [entry["phases"][phase] for entry in self.history if phase in entry.get("phases", {})]
+
+    def timeout_for(self, phase: str) -> float:
+        """Timeout in ms for a page-wait phase, from recent observations."""
+        default, floor, ceiling = TIMEOUT_BOUNDS_MS[phase]
+        samples = self.samples(phase)
+        if len(samples) < MIN_SAMPLES:
+            return default
+        observed = percentile(samples, TIMEOUT_PERCENTILE) * TIMEOUT_HEADROOM
+        return max(floor, min(ceiling, observed))
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import os
+
+# --- Configuration ---
+JOURNAL_PATH = "study_guide_journal.jsonl"
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class SectionJournal:
+    """
+    Append-only JSONL record of the sections written to the study guide.
+
+    Each line holds a section's id, the hash of the prompt that produced it,
+    and where its block sits in the output file (byte offset, length and a
+    SHA-256 of the bytes). A resumed run reads the blocks back from the output
+    file, keeping only those whose prompt is unchanged and whose bytes still
+    match, instead of asking NotebookLM for them again.
+    """
+
+    def __init__(self, path: str = JOURNAL_PATH):
+        self.path = path
+
+    def entries(self):
+        """The latest entry per section id; a torn last line is ignored."""
+        latest = {}
+        if not os.path.exists(self.path):
+            return latest
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # A killed run can leave half a line behind.
+                latest[entry["id"]] = entry
+        return latest
+
+    def recover(self, output_path: str, prompt_hashes: dict) -> dict:
+        """
+        Returns {section id: block bytes} for journaled sections that can be
+        reused: same prompt hash as in prompt_hashes, and still intact in
+        output_path.
+        """
+        entries = self.entries()
+        if not entries or not os.path.exists(output_path):
+            return {}
+        recovered = {}
+        with open(output_path, "rb") as f:
+            for section_id, entry in entries.items():
+                if prompt_hashes.get(section_id) != entry["prompt_hash"]:
+                    continue
+                f.seek(entry["offset"])
+                block = f.read(entry["length"])
+                if len(block) == entry["length"] and _digest(block) == entry["sha256"]:
+                    recovered[section_id] = block
+        return recovered
+
+    def reset(self):
+        """Starts an empty journal (the output file is being rewritten)."""
+        open(self.path, "w", encoding="utf-8").close()
+
+    def record(self, section_id: str, prompt_hash: str, offset: int, block: bytes):
+        entry = {
+            "id": section_id,
+            "prompt_hash": prompt_hash,
+            "offset": offset,
+            "length": len(block),
+            "sha256": _digest(block),
+        }
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
@@ -1,9 +1,41 @@
 import re
+import os
+import json
+import argparse
 import asyncio
-from notebook_automator import query_notebook
+import time
+from contextlib import AsyncExitStack
+from network_capture import NOTEBOOKLM_STREAM_PATTERN, NetworkCapture
+from notebook_automator import (
+    NEW_CHAT_SELECTORS,
+    NOTEBOOK_URL,
+    PROFILE_DIR,
+    BrowserUnavailableError,
+    NotebookSession,
+    PersistentBrowser,
+    ScraperError,
+)
+from response_cache import DEFAULT_TTL_SECONDS, ResponseCache, cache_key
+from resource_blocker import (
+    DEFAULT_ALLOWED_DOMAINS,
+    DEFAULT_BLOCKED_DOMAINS,
+    DEFAULT_BLOCKED_TYPES,
+    ResourceBlocker,
+    parse_rule_list,
+)
+from retry_policy import MAX_ATTEMPTS, CircuitBreaker, CircuitBrokenError, backoff_delay
+from scraper_metrics import ScraperMetrics
+from section_journal import JOURNAL_PATH, SectionJournal
 
-# The master prompt template
-PROMPT_TEMPLATE = """
+OUTPUT_FILE = "final_study_guide.md"
+GUIDE_TITLE = "ECE 301 Quiz 1 Study Guide"
+DEAD_LETTER_FILE = "dead_letter_sections.json"
+
+# Bump whenever PROMPT_TEMPLATE changes in a way that should invalidate cached responses.
+PROMPT_TEMPLATE_VERSION = "1"
+
+# Instructions shared by the single-section and batched prompts
+PROMPT_INSTRUCTIONS = """
 Generate a structured, exam-focused textbook/study guide hybrid for ECE 301: Signals and Systems Midterm 1. Use only the provided lecture slides (M1–M6), homework + solutions (1–5), syllabus, the past exam (ECE301_Fall_2022_Exam_1.pdf), and Alan V. Oppenheim, Signals and Systems. Prioritize current semester lecture slides and homework over older sources.
 The study guide must combine textbook-level clarity with exam precision, optimized for last-minute review.
 
@@ -19,12 +51,51 @@ Formatting:
 Use bullet points and natural language explanations.
 Avoid summaries or introductions of the current subsection.
 Goal: Produce a technical, exam-oriented hybrid between an ECE signals textbook and an applied manual, precisely aligned with Midterm 1 coverage.
+"""
 
+# What each section adds to the instructions; sent on its own in a primed chat (--primed).
+SECTION_DELTA_TEMPLATE = """
 Continue with section {X}.
 Current section: 
 {Y}
 """
 
+# The master prompt template
+PROMPT_TEMPLATE = PROMPT_INSTRUCTIONS + SECTION_DELTA_TEMPLATE
+
+# Several short consecutive subsections in one round-trip (--batch-chars). The
+# answer is split back into sections on the delimiter lines; a batch whose
+# delimiters (or closing end marker) don't all come back is re-asked one
+# section at a time.
+BATCH_DELIMITER = "@@SECTION {id}@@"
+BATCH_END = "@@END@@"         # Closes a complete batched answer; without it the answer was cut off.
+MAX_BATCH_SECTIONS = 4        # Sections per batch, however short (--batch-sections).
+BATCH_DELTA_TEMPLATE = """
+Continue with sections {X}. Answer each one in full, exactly as if it had been asked on its own.
+Start each section's answer with a line containing only its delimiter, written exactly as given below (e.g. {example}), and write nothing before the first delimiter.
+After the last section, end your answer with a line containing only {end}.
+
+{Y}
+"""
+BATCH_PROMPT_TEMPLATE = PROMPT_INSTRUCTIONS + BATCH_DELTA_TEMPLATE
+
+# Sent as the first message of every fresh chat when --rotate-every is used,
+# so the new conversation knows what has already been covered.
+CONTEXT_PREAMBLE = """
+We are continuing the study guide "{title}" in a new chat, with the same sources and formatting rules as before.
+Sections already written: {covered}.
+Do not repeat material from those sections. Reply only with "Ready." and wait for the next section.
+"""
+
+# Opens every chat in a primed conversation (--primed): the standing
+# instructions go in once, and each section is then sent as a delta.
+PRIMING_REQUEST = """
+I will now send the subsections one message at a time ("Continue with section ..."). Apply every instruction above to each of them.
+Sections already written: {covered}.
+Do not repeat material from those sections. Reply only with "Ready." and wait for the next section.
+"""
+PRIMING_PREAMBLE = PROMPT_INSTRUCTIONS + PRIMING_REQUEST
+
 
 def parse_topics(filename="topics.md"):
     """
@@ -73,49 +144,548 @@ def parse_topics(filename="topics.md"):
 
 
 
-async def generate_study_guide():
-    """Main function to run the conversation and build the guide."""
-    print("Parsing topics from topics.md...")
-    topics = parse_topics()
-    full_study_guide = []
+def section_prompt(topic, primed=False, instructions=PROMPT_INSTRUCTIONS):
+    """
+    The single-section prompt. The full (unprimed) prompt is also the section's
+    cache and journal key, so both modes share cached answers.
+    The instructions are prepended after formatting, so braces in them (LaTeX) are kept as written.
+    """
+    delta = SECTION_DELTA_TEMPLATE.format(X=topic['id'], Y=topic['title'])
+    return delta if primed else instructions + delta
+
+
+def batch_prompt(batch, primed=False, instructions=PROMPT_INSTRUCTIONS):
+    """The combined prompt for a list of topics (see BATCH_PROMPT_TEMPLATE)."""
+    listing = "\n\n".join(f"{BATCH_DELIMITER.format(id=topic['id'])}\n{topic['title']}" for topic in batch)
+    delta = BATCH_DELTA_TEMPLATE.format(
+        X=", ".join(topic['id'] for topic in batch),
+        example=BATCH_DELIMITER.format(id=batch[0]['id']),
+        end=BATCH_END,
+        Y=listing,
+    )
+    return delta if primed else instructions + delta
+
+
+def plan_batches(topics, budget_chars, max_sections=MAX_BATCH_SECTIONS):
+    """
+    Groups consecutive topics into batches of at most max_sections whose
+    section text (the titles, not the shared instructions) adds up to at most
+    budget_chars. Returns lists of topic indices; budget_chars <= 0 (or a
+    topic too long to share a prompt) gives single-topic batches.
+    """
+    batches = []
+    current = []
+    current_chars = 0
+    for i, topic in enumerate(topics):
+        chars = len(topic['title'])
+        if current and (budget_chars <= 0 or len(current) >= max_sections or current_chars + chars > budget_chars):
+            batches.append(current)
+            current = []
+            current_chars = 0
+        current.append(i)
+        current_chars += chars
+    if current:
+        batches.append(current)
+    return batches
+
+
+def split_batched_response(response_md, section_ids):
+    """
+    Splits a batched answer on its delimiter lines. Returns the bodies in
+    section_ids order, or None unless every delimiter appears once, in order,
+    followed by a non-empty body, with nothing but whitespace before the
+    first one, and the answer closes with BATCH_END (so the last section
+    wasn't cut off).
+    """
+    delimiter = re.compile(r"^[ \t*_\\]*@@SECTION[ \t]+(\w+)[ \t]*@@[ \t*_\\]*$", flags=re.MULTILINE)
+    end_marker = re.compile(r"^[ \t*_\\]*" + re.escape(BATCH_END) + r"[ \t*_\\]*\s*\Z", flags=re.MULTILINE)
+    end_match = end_marker.search(response_md)
+    if end_match is None:
+        return None
+    response_md = response_md[:end_match.start()]
+    matches = list(delimiter.finditer(response_md))
+    if [m.group(1) for m in matches] != list(section_ids):
+        return None
+    if response_md[:matches[0].start()].strip():
+        return None  # Might be the start of the first section, written above its delimiter.
+    bodies = []
+    for m, following in zip(matches, matches[1:] + [None]):
+        end = following.start() if following else len(response_md)
+        body = response_md[m.end():end].strip()
+        if not body:
+            return None
+        bodies.append(body)
+    return bodies
+
+
+def format_section(section_id, response_md):
+    """Renders one scraped section exactly as it is appended to the final guide."""
+    # The 'title' contains the full description, which we don't need to repeat.
+    # We just write a simple header, the response, and the diagram marker.
+    return (
+        f"## Section {section_id}\n\n"
+        f"{response_md}"
+        f"\n\n%%DIAGRAM_MARKER_{section_id}%%\n\n"
+        "\n\n---\n\n"
+    )
+
+
+def parse_section_block(section_id, block):
+    """Inverse of format_section: the response markdown, or None if block isn't one."""
+    prefix, suffix = format_section(section_id, "\0").split("\0")
+    if not (block.startswith(prefix) and block.endswith(suffix)) or len(block) < len(prefix) + len(suffix):
+        return None
+    return block[len(prefix):len(block) - len(suffix)]
+
+
+def companion_paths(output_file):
+    """Journal and dead-letter paths for a guide (the historical names for OUTPUT_FILE)."""
+    if output_file == OUTPUT_FILE:
+        return JOURNAL_PATH, DEAD_LETTER_FILE
+    stem = os.path.splitext(output_file)[0]
+    return f"{stem}.journal.jsonl", f"{stem}.dead_letters.json"
+
+
+async def generate_study_guide(concurrency=1, refresh=False, cache_ttl=DEFAULT_TTL_SECONDS, max_attempts=MAX_ATTEMPTS,
+                               launch=False, profile_dir=PROFILE_DIR, headless=False, channel=None,
+                               block_rules=None, rotate_every=0, prune_dom=False, capture_pattern=None,
+                               capture_record_dir=None, batch_chars=0, batch_sections=MAX_BATCH_SECTIONS, resume=False, diff=False, primed=False,
+                               notebook_url=NOTEBOOK_URL, topics_file="topics.md", output_file=OUTPUT_FILE,
+                               instructions=PROMPT_INSTRUCTIONS, title=GUIDE_TITLE, browser=None, tab_indices=None,
+                               on_section=None):
+    """
+    Main function to run the conversation and build the guide.
+
+    The course is described by notebook_url, topics_file, output_file, the
+    standing prompt instructions and the guide title; the defaults are the
+    ECE 301 guide. Returns a summary dict (counts, dead letters, status,
+    seconds) for batch runs.
+
+    With concurrency > 1, sections are fanned out over that many NotebookLM tabs
+    (bounded by a semaphore). Responses can finish out of order, so they are
+    buffered and appended to the final file strictly in topic order.
+
+    Responses are looked up in the on-disk ResponseCache before NotebookLM is
+    asked; refresh=True skips the lookup but still stores the fresh answers,
+    and cache_ttl=0 turns the cache off (no lookups, nothing stored).
+
+    Failed questions are retried with jittered exponential backoff. A section
+    that fails max_attempts times goes to the dead-letter list (saved next to
+    the guide, see companion_paths) and the run carries on without it. A lost browser or tab
+    trips a shared circuit breaker that pauses every tab until it comes back.
+
+    With capture_pattern set, answers are read from the page's streamed answer
+    response matching that URL fragment (see NetworkCapture), falling back to
+    the DOM for any question where that yields nothing or something that
+    doesn't match the rendered answer. capture_record_dir keeps the raw
+    streamed bodies there.
+
+    batch_chars > 0 packs up to batch_sections consecutive sections, of at most
+    that many characters of section text together, into one prompt (see
+    plan_batches) and splits the answer on its delimiters; a batch that can't
+    be split is re-asked one section at a time.
+
+    Every section written to the guide is journaled (see SectionJournal).
+    resume=True reuses the journaled sections whose prompt is unchanged, so a
+    restarted run only asks for what is missing; the file is rewritten in
+    topic order either way, next to the old one, and swapped in once the
+    recovered sections are back in (before the cache or browser is opened).
+
+    diff=True is the incremental version for an edited topics.md: the journal
+    of the last run serves as its manifest, and only sections that were added
+    or whose id/title/template version changed are asked for. The unchanged
+    sections are carried over byte for byte and the new guide replaces the
+    old one only if every changed section succeeded.
+
+    launch=True starts a Chromium on profile_dir (optionally headless) instead
+    of attaching to a hand-started Chrome over CDP, for unattended runs.
+
+    block_rules (keyword arguments for ResourceBlocker) turns on request
+    blocking: per tab in CDP mode, for the whole launched browser otherwise.
+
+    rotate_every=K starts a fresh chat in a tab after K sections (by clearing
+    it, see NEW_CHAT_SELECTORS, which must be set) and opens it with
+    CONTEXT_PREAMBLE; prune_dom drops finished turns from the page. Both keep
+    late sections as fast as early ones.
+
+    primed=True sends the standing instructions once per chat (PRIMING_PREAMBLE,
+    on each tab's first chat and after every rotation) and then only the
+    per-section deltas, instead of repeating them in every prompt.
+
+    on_section(section_id, block) is called with each section's text right
+    after it is appended to the guide (so in topic order), letting later
+    stages start on it while the next sections are still being scraped.
+    """
+    started = time.monotonic()
+    print(f"Parsing topics from {topics_file}...")
+    topics = parse_topics(topics_file)
 
     print(f"Found {len(topics)} sections to generate.")
+    journal_path, dead_letter_file = companion_paths(output_file)
+    counts = {"asked": 0, "from_cache": 0}
+
+    def summary(status):
+        return {
+            "output": output_file,
+            "notebook_url": notebook_url,
+            "sections": len(topics),
+            "written": len(covered_ids),
+            "recovered": len(recovered),
+            "from_cache": counts["from_cache"],
+            "asked": counts["asked"],
+            "dead_letters": [d["id"] for d in dead_letters],
+            "status": status,
+            "seconds": round(time.monotonic() - started, 1),
+        }
+
+    # On --resume/--diff, sections already journaled (and still intact) are read
+    # back first, then rewritten below in topic order like freshly scraped ones.
+    journal = SectionJournal(journal_path)
+    prompt_hashes = {
+        topic['id']: cache_key(notebook_url, section_prompt(topic, instructions=instructions), PROMPT_TEMPLATE_VERSION)
+        for topic in topics
+    }
+    covered_ids = []
+    dead_letters = []
+    recovered = {}  # topic index -> response markdown
+    if resume or diff:
+        previous = journal.entries()
+        blocks = journal.recover(output_file, prompt_hashes)
+        for i, topic in enumerate(topics):
+            block = blocks.get(topic['id'])
+            response_md = parse_section_block(topic['id'], block.decode("utf-8")) if block else None
+            if response_md is not None:
+                recovered[i] = response_md
+        print(f"Resuming: {len(recovered)}/{len(topics)} sections recovered from {journal.path}.")
+
+    output_path = output_file
+    if diff:
+        added = [t['id'] for t in topics if t['id'] not in previous]
+        changed = [t['id'] for i, t in enumerate(topics) if t['id'] in previous and i not in recovered]
+        removed = [section_id for section_id in previous if section_id not in prompt_hashes]
+        print(f"Diff against the last run: {len(recovered)} unchanged, {len(changed)} changed "
+              f"({', '.join(changed) or '-'}), {len(added)} added ({', '.join(added) or '-'}), "
+              f"{len(removed)} removed ({', '.join(removed) or '-'}).")
+        if not (added or changed or removed):
+            print(f"✅ {output_file} is already up to date.")
+            covered_ids.extend(t['id'] for t in topics)
+            return summary("up to date")
+
+    concurrency = max(1, min(concurrency, len(topics)))
+    tab_indices = list(tab_indices or range(concurrency))[:concurrency]
+    concurrency = len(tab_indices)
+    semaphore = asyncio.Semaphore(concurrency)
+    idle_sessions = asyncio.Queue()
+    stop = asyncio.Event()
+    connect_lock = asyncio.Lock()
+    breaker = CircuitBreaker()
+    results = {}  # topic index -> response markdown (None for a dead-lettered section)
+    next_to_write = 0
+
+    def context_preamble():
+        covered = ", ".join(covered_ids) or "none yet"
+        if primed:
+            return instructions + PRIMING_REQUEST.format(covered=covered)
+        return CONTEXT_PREAMBLE.format(covered=covered, title=title)
+
+    def flush_ready_sections():
+        """Appends every finished section that is next in topic order, journaling each one."""
+        nonlocal next_to_write
+        with open(output_path, "ab") as f:
+            while next_to_write in results:
+                section_id = topics[next_to_write]['id']
+                response_md = results.pop(next_to_write)
+                if response_md is None:
+                    print(f"✗ Section {section_id} skipped (dead letter).")
+                else:
+                    block = format_section(section_id, response_md).encode("utf-8")
+                    offset = f.tell()
+                    f.write(block)
+                    f.flush()
+                    journal.record(section_id, prompt_hashes[section_id], offset, block)
+                    covered_ids.append(section_id)
+                    print(f"✓ Section {section_id} complete and saved.")
+                    if on_section is not None:
+                        on_section(section_id, block.decode("utf-8"))
+                next_to_write += 1
+
+    if resume or diff:
+        # The guide is rebuilt next to the old one, so nothing is lost if this
+        # run dies before the recovered sections are back in: --resume swaps it
+        # in as soon as they are, --diff only once every changed section is in.
+        output_path = output_file + ".tmp"
+        journal = SectionJournal(journal_path + ".tmp")
 
     # This will create a new, empty file at the start of the conversation
-    with open("final_study_guide.md", "w") as f:
-        f.write("# ECE 301 Quiz 1 Study Guide\n\n")
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(f"# {title}\n\n")
+    journal.reset()
+    # Written before the cache or the browser is opened, either of which can fail.
+    results.update(recovered)
+    flush_ready_sections()
+    if resume and not diff:
+        os.replace(output_path, output_file)
+        os.replace(journal.path, journal_path)
+        output_path = output_file
+        journal = SectionJournal(journal_path)
 
-    for i, topic in enumerate(topics):
+    async def scrape_with_retries(section_id, prompt):
+        """Asks on whichever tab is free; raises the last ScraperError once attempts run out."""
+        attempt = 0
+        while True:
+            await breaker.wait_until_closed()
+            retry_delay = None
+            session = await idle_sessions.get()
+            try:
+                # Attach tabs one at a time so each session claims a distinct tab.
+                async with connect_lock:
+                    await session.connect()
+                # Call the scraper (each session stays attached to its own tab between sections)
+                response_md = await session.ask(prompt)
+                breaker.record_success()
+                return response_md
+            except BrowserUnavailableError as e:
+                breaker.trip(e)  # Outages don't use up the section's attempts.
+            except ScraperError as e:
+                attempt += 1
+                if attempt >= max_attempts:
+                    raise
+                retry_delay = backoff_delay(attempt - 1)
+                print(f"Section {section_id} attempt {attempt}/{max_attempts} failed: {e}")
+                print(f"Retrying in {retry_delay:.1f}s...")
+            finally:
+                idle_sessions.put_nowait(session)
+            if retry_delay:
+                await asyncio.sleep(retry_delay)
+
+    def serve_from_cache(i):
+        """Fills results[i] from the response cache; returns False on a miss."""
+        if refresh or cache_ttl <= 0:
+            return False
+        topic = topics[i]
+        prompt = section_prompt(topic, instructions=instructions)
+        response_md = cache.get(notebook_url, prompt, PROMPT_TEMPLATE_VERSION)
+        if response_md is None:
+            return False
+        counts["from_cache"] += 1
+        print(f"↺ Section {topic['id']} served from the response cache.")
+        results[i] = response_md
+        flush_ready_sections()
+        return True
+
+    async def run_section(i):
+        topic = topics[i]
         section_id = topic['id']
         section_title = topic['title']
-
         print(f"--- Generating Section {section_id}: {section_title} ({i+1}/{len(topics)}) ---")
 
         # Format the prompt for the current section
-        prompt = PROMPT_TEMPLATE.format(X=section_id, Y=section_title)
+        prompt = section_prompt(topic, instructions=instructions)
+
+        try:
+            response_md = await scrape_with_retries(section_id, section_prompt(topic, primed, instructions))
+        except CircuitBrokenError as e:
+            print(f"An error occurred: {e}")
+            stop.set() # Stop handing out sections; the browser is gone
+            return
+        except ScraperError as e:
+            print(f"Section {section_id} failed {max_attempts} times, moving on: {e}")
+            dead_letters.append({"id": section_id, "attempts": max_attempts, "error": str(e)})
+            results[i] = None
+            flush_ready_sections()
+            return
+
+        cache.put(notebook_url, prompt, PROMPT_TEMPLATE_VERSION, response_md, ttl_seconds=cache_ttl)
+        counts["asked"] += 1
+        results[i] = response_md
+        flush_ready_sections()
 
-        # Call the scraper
-        response_md = await query_notebook(prompt)
+    async def run_batch(indices):
+        """
+        Asks for several sections in one prompt. Returns False if the answer
+        could not be split (or the batch failed), so the caller asks singly.
+        """
+        batch = [topics[i] for i in indices]
+        section_ids = [topic['id'] for topic in batch]
+        label = ", ".join(section_ids)
+        print(f"--- Generating Sections {label} in one prompt ---")
+        try:
+            response_md = await scrape_with_retries(label, batch_prompt(batch, primed, instructions))
+        except CircuitBrokenError as e:
+            print(f"An error occurred: {e}")
+            stop.set()
+            return True
+        except ScraperError as e:
+            print(f"Batch {label} failed {max_attempts} times; asking its sections one by one: {e}")
+            return False
 
-        if response_md.lower().startswith("error"):
-            print(f"An error occurred: {response_md}")
-            break # Stop if there's an error
+        bodies = split_batched_response(response_md, section_ids)
+        if bodies is None:
+            print(f"Batch {label} could not be split on its delimiters (missing, out of order, stray text "
+                  f"or no end marker); asking its sections one by one.")
+            return False
+        for i, topic, body in zip(indices, batch, bodies):
+            # Cached under the single-section prompt, so batched and unbatched runs share entries.
+            prompt = section_prompt(topic, instructions=instructions)
+            cache.put(notebook_url, prompt, PROMPT_TEMPLATE_VERSION, body, ttl_seconds=cache_ttl)
+            counts["asked"] += 1
+            results[i] = body
+        flush_ready_sections()
+        return True
 
-        # Append the response to the final file
-        with open("final_study_guide.md", "a", encoding="utf-8") as f:
-            # The 'title' now contains the full description, which we don't need to repeat.
-            # We will just write a simple header.
-            f.write(f"## Section {section_id}\n\n")
-            f.write(response_md)
-            # Add the diagram marker
-            f.write(f"\n\n%%DIAGRAM_MARKER_{section_id}%%\n\n")
-            f.write("\n\n---\n\n")
+    async def run_unit(indices):
+        async with semaphore:
+            if stop.is_set():
+                return
+            pending = [i for i in indices if not serve_from_cache(i)]
+            if len(pending) > 1 and await run_batch(pending):
+                return
+            for i in pending:
+                if stop.is_set():
+                    return
+                await run_section(i)
 
-        print(f"✓ Section {section_id} complete and saved.")
+    async with AsyncExitStack() as stack:
+        cache = stack.enter_context(ResponseCache())
+        # Sessions attach lazily, so a fully cached re-run never touches the browser.
+        # All tabs share one metrics log, so timeouts adapt to the whole run.
+        metrics = ScraperMetrics()
+        blockers = []
+
+        def make_blocker(name):
+            if block_rules is None:
+                return None
+            blockers.append(ResourceBlocker(name=name, **block_rules))
+            return blockers[-1]
+
+        # A browser passed in (batch runs) is shared with other guides and not ours to close.
+        if browser is None and launch:
+            browser = await stack.enter_async_context(PersistentBrowser(
+                notebook_url=notebook_url, profile_dir=profile_dir, headless=headless, channel=channel,
+                blocker=make_blocker("launched browser"),
+            ))
+        for tab_index in tab_indices:
+            session = await stack.enter_async_context(NotebookSession(
+                notebook_url=notebook_url, tab_index=tab_index, metrics=metrics, browser=browser,
+                blocker=None if browser is not None else make_blocker(f"tab #{tab_index + 1}"),
+                rotate_every=rotate_every, prune_dom=prune_dom,
+                chat_preamble=context_preamble, preamble_first_chat=primed,
+                network_capture=(NetworkCapture(capture_pattern, record_dir=capture_record_dir)
+                                 if capture_pattern else None),
+            ))
+            idle_sessions.put_nowait(session)
+
+        remaining = [i for i in range(len(topics)) if i not in recovered]
+        batches = plan_batches([topics[i] for i in remaining], batch_chars, batch_sections)
+        await asyncio.gather(*(run_unit([remaining[j] for j in batch]) for batch in batches))
+
+    for blocker in blockers:
+        print(blocker.summary())
+
+    if dead_letters:
+        with open(dead_letter_file, "w", encoding="utf-8") as f:
+            json.dump(dead_letters, f, indent=2)
+        print(f"\n⚠️ {len(dead_letters)} section(s) failed and were left out: "
+              f"{', '.join(d['id'] for d in dead_letters)} (details in {dead_letter_file}).")
+    elif os.path.exists(dead_letter_file):
+        os.remove(dead_letter_file)
+
+    if diff:
+        if next_to_write < len(topics) or dead_letters:
+            os.remove(output_path)
+            os.remove(journal.path)
+            print(f"\n\n⚠️ Not every changed section could be generated; {output_file} was left as it was.")
+            return summary("kept previous")
+        os.replace(output_path, output_file)
+        os.replace(journal.path, journal_path)
+
+    if next_to_write < len(topics):
+        print(f"\n\n⚠️ Stopped after {next_to_write}/{len(topics)} sections.")
+        print(f"Partial file: {output_file}")
+        return summary("stopped")
 
     print("\n\n✅ Study guide generation complete!")
-    print("Your file is ready: final_study_guide.md")
+    print(f"Your file is ready: {output_file}")
+    return summary("complete" if not dead_letters else "complete with dead letters")
 
 
 if __name__ == "__main__":
-    asyncio.run(generate_study_guide())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate the study guide section by section from NotebookLM.")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Number of NotebookLM tabs to generate sections in parallel (default: 1).")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Ignore cached responses and re-query NotebookLM for every section.")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL_SECONDS / 3600,
+                        help="Hours before a newly cached response expires; 0 disables the cache (default: 336).")
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS,
+                        help=f"Attempts per section before it is dead-lettered (default: {MAX_ATTEMPTS}).")
+    parser.add_argument("--launch", action="store_true",
+                        help="Launch and manage Chromium with a saved profile instead of attaching over CDP.")
+    parser.add_argument("--profile-dir", default=PROFILE_DIR,
+                        help=f"Browser profile directory for --launch (default: {PROFILE_DIR}).")
+    parser.add_argument("--headless", action="store_true",
+                        help="Run the launched browser headless (log in once with a headed run first).")
+    parser.add_argument("--channel", default=None,
+                        help="Browser channel for --launch, e.g. 'chrome' to use installed Google Chrome.")
+    parser.add_argument("--block-resources", action="store_true",
+                        help="Abort image/font/media and analytics requests in the scraping tabs.")
+    parser.add_argument("--block-types", default=",".join(DEFAULT_BLOCKED_TYPES),
+                        help="Comma-separated Playwright resource types to block (with --block-resources).")
+    parser.add_argument("--block-domains", default=",".join(DEFAULT_BLOCKED_DOMAINS),
+                        help="Comma-separated domains to block (with --block-resources).")
+    parser.add_argument("--allow-domains", default=",".join(DEFAULT_ALLOWED_DOMAINS),
+                        help="Comma-separated domains never blocked (with --block-resources).")
+    parser.add_argument("--rotate-every", type=int, default=0,
+                        help="Start a fresh chat in a tab after this many sections (default: 0, never). "
+                             "Needs NEW_CHAT_SELECTORS in notebook_automator.py.")
+    parser.add_argument("--prune-dom", action="store_true",
+                        help="Remove finished chat turns from the page after each section.")
+    parser.add_argument("--capture", choices=("dom", "network"), default="dom",
+                        help="Read answers from the rendered chat (dom) or from the streamed response (network).")
+    parser.add_argument("--capture-pattern", default=NOTEBOOKLM_STREAM_PATTERN,
+                        help="URL fragment of the streamed answer request for --capture network.")
+    parser.add_argument("--record-capture", metavar="DIR",
+                        help="With --capture network, also save every raw answer stream in DIR.")
+    parser.add_argument("--batch-chars", type=int, default=0,
+                        help="Pack consecutive sections with up to this many characters of section text "
+                             "(instructions not counted) into one prompt (default: 0, off).")
+    parser.add_argument("--batch-sections", type=int, default=MAX_BATCH_SECTIONS,
+                        help=f"Most sections packed into one prompt with --batch-chars (default: {MAX_BATCH_SECTIONS}).")
+    parser.add_argument("--resume", action="store_true",
+                        help="Keep the sections journaled by an earlier run and only generate the rest.")
+    parser.add_argument("--primed", action="store_true",
+                        help="Send the standing instructions once per chat, then only 'Continue with section' deltas.")
+    parser.add_argument("--diff", action="store_true",
+                        help="Regenerate only the sections added or changed in topics.md since the last run.")
+    args = parser.parse_args()
+    if args.rotate_every and not NEW_CHAT_SELECTORS:
+        parser.error("--rotate-every needs NEW_CHAT_SELECTORS (the clicks that clear the chat) in notebook_automator.py.")
+
+    block_rules = None
+    if args.block_resources:
+        block_rules = {
+            "blocked_types": parse_rule_list(args.block_types),
+            "blocked_domains": parse_rule_list(args.block_domains),
+            "allowed_domains": parse_rule_list(args.allow_domains),
+        }
+
+    asyncio.run(generate_study_guide(
+        concurrency=args.concurrency,
+        refresh=args.refresh,
+        cache_ttl=args.cache_ttl * 3600,
+        max_attempts=args.max_attempts,
+        launch=args.launch,
+        profile_dir=args.profile_dir,
+        headless=args.headless,
+        channel=args.channel,
+        block_rules=block_rules,
+        rotate_every=args.rotate_every,
+        capture_pattern=args.capture_pattern if args.capture == "network" else None,
+        capture_record_dir=args.record_capture,
+        prune_dom=args.prune_dom,
+        batch_chars=args.batch_chars,
+        batch_sections=args.batch_sections,
+        resume=args.resume,
+        diff=args.diff,
+        primed=args.primed,
+    ))